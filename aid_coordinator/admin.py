@@ -0,0 +1,42 @@
+from django.contrib import admin
+from django.utils.translation import gettext_lazy as _
+
+from aid_coordinator.models import LanguageUsage, SlowQuery
+from supply_demand.admin.base import ReadOnlyMixin
+
+
+@admin.register(LanguageUsage)
+class LanguageUsageAdmin(ReadOnlyMixin, admin.ModelAdmin):
+    list_display = ("day", "ip_prefix", "language", "requests")
+    list_filter = ("language",)
+    search_fields = ("ip_prefix",)
+    date_hierarchy = "day"
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(ReadOnlyMixin, admin.ModelAdmin):
+    list_display = ("when", "admin_duration", "call_site", "path", "database")
+    list_filter = ("database",)
+    date_hierarchy = "when"
+    ordering = ("-when",)
+    search_fields = (
+        "call_site",
+        "path",
+        "fingerprint",
+    )
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    @admin.display(description=_("duration"), ordering="duration")
+    def admin_duration(self, query: SlowQuery):
+        return f"{query.duration:.0f} ms"
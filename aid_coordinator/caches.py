@@ -0,0 +1,46 @@
+"""
+Cache profiles for CACHES. The local memory cache is per process, so with more than one worker process pick a cache
+they share in local_settings.py, so they also see each other's invalidations. For example:
+
+    from aid_coordinator.caches import file_cache
+
+    CACHES = {"default": file_cache("/var/tmp/aid_coordinator")}
+"""
+from pathlib import Path
+from typing import Union
+
+
+def locmem_cache(max_entries: int = 10000) -> dict:
+    """
+    In the memory of each process. Fast, but not shared between processes.
+    """
+    return {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "aid_coordinator",
+        "OPTIONS": {
+            "MAX_ENTRIES": max_entries,
+        },
+    }
+
+
+def file_cache(directory: Union[str, Path], max_entries: int = 10000) -> dict:
+    """
+    Files in a directory that all workers on the same server can write to.
+    """
+    return {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": str(directory),
+        "OPTIONS": {
+            "MAX_ENTRIES": max_entries,
+        },
+    }
+
+
+def redis_cache(location: str = "redis://127.0.0.1:6379") -> dict:
+    """
+    A Redis server, shared by all workers on all servers. Needs the redis package.
+    """
+    return {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": location,
+    }
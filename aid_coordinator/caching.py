@@ -0,0 +1,173 @@
+"""
+Cached data that expires when the models it's calculated from change. Every model has a version in the cache, and
+the keys of cached data include the versions of the models it depends on. The versions of the models passed to
+track_models() are changed by the signals of saving and deleting objects. Other models keep their version, so data
+that depends on them only expires with its timeout.
+
+Only the models of cached data are tracked, at the end of the models module that defines them: receivers of
+the delete signals stop Django from deleting a queryset with a single query, and make it load and signal every row.
+Updates and bulk creates don't send signals at all, so data that can be changed like that is cached for a short
+time, or the code that does it calls bump_versions().
+"""
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Iterable, Tuple, Type, TypeVar
+
+from django.core.cache import cache
+from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.http import HttpRequest
+from django.utils.translation import get_language
+
+from aid_coordinator.replica import pinned_to_primary
+
+T = TypeVar("T")
+
+# Anonymous API responses, short because the bulk changes of imports and admin actions don't expire them
+API_CACHE_TIMEOUT = 60
+
+MISSING = object()
+
+
+class CacheStats:
+    """
+    Hits and misses by the name of the cached data, shown by /metrics.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts: Dict[Tuple[str, bool], int] = {}
+
+    def add(self, name: str, hit: bool):
+        with self.lock:
+            self.counts[(name, hit)] = self.counts.get((name, hit), 0) + 1
+
+    def get_counts(self) -> Dict[str, Tuple[int, int]]:
+        """
+        The number of hits and misses of each name.
+        """
+        with self.lock:
+            counts = dict(self.counts)
+        names = sorted({name for name, _hit in counts})
+        return {name: (counts.get((name, True), 0), counts.get((name, False), 0)) for name in names}
+
+
+stats = CacheStats()
+
+
+def get_version_key(model: Type[models.Model]) -> str:
+    return f"model-version:{model._meta.label_lower}"
+
+
+def get_versions(model_classes: Iterable[Type[models.Model]]) -> str:
+    """
+    The current versions of these models, with one cache lookup.
+    """
+    keys = sorted({get_version_key(model) for model in model_classes})
+    versions = cache.get_many(keys)
+
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+
+    return ".".join(str(versions[key]) for key in keys)
+
+
+def bump_versions(*model_classes: Type[models.Model]):
+    """
+    Expire the cached data that depends on these models.
+    """
+    cache.set_many({get_version_key(model): time.time_ns() for model in model_classes}, timeout=None)
+
+
+def bump_version_of_sender(sender, **kwargs):
+    bump_versions(sender)
+
+
+def bump_version_of_relation(sender, action: str, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_versions(sender)
+
+
+def track_models(*model_classes: Type[models.Model]):
+    """
+    Expire the cached data that depends on these models when their objects are saved or deleted. For many-to-many
+    relations pass the through model, like Contact.groups.through.
+    """
+    for model in model_classes:
+        dispatch_uid = f"caching:{model._meta.label_lower}"
+        post_save.connect(bump_version_of_sender, sender=model, dispatch_uid=dispatch_uid)
+        post_delete.connect(bump_version_of_sender, sender=model, dispatch_uid=dispatch_uid)
+        m2m_changed.connect(bump_version_of_relation, sender=model, dispatch_uid=dispatch_uid)
+
+
+def get_cache_key(name: str, key: str, model_classes: Iterable[Type[models.Model]]) -> str:
+    return f"{name}:{get_versions(model_classes)}:{hashlib.md5(key.encode()).hexdigest()}"
+
+
+def cached(
+    name: str,
+    key: str,
+    compute: Callable[[], T],
+    model_classes: Iterable[Type[models.Model]],
+    timeout: int = 3600,
+) -> T:
+    """
+    The cached result of compute(), calculated again when one of the models changed.
+    """
+    key = get_cache_key(name, key, model_classes)
+    value = cache.get(key, MISSING)
+    stats.add(name, value is not MISSING)
+
+    if value is MISSING:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+class AnonymousCacheMixin:
+    """
+    Viewset mixin that caches the JSON responses to anonymous GET requests until one of the models in cache_models
+    changes. Browsable API pages aren't cached, they contain a CSRF token. Misses are read from the default database,
+    also in views that read from the replica.
+    """
+
+    cache_models: Tuple[Type[models.Model], ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        track_models(*cls.cache_models)
+
+    def dispatch(self, request: HttpRequest, *args, **kwargs):
+        if (
+            request.method != "GET"
+            or "HTTP_AUTHORIZATION" in request.META
+            or request.user.is_authenticated
+            or not self.cache_models
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        name = f"api:{type(self).__name__}"
+        # The whole URL, the responses contain absolute URLs with the scheme and host of the request
+        key = get_cache_key(
+            name,
+            f"{request.build_absolute_uri()}|{request.META.get('HTTP_ACCEPT', '')}|{get_language()}",
+            self.cache_models,
+        )
+
+        response = cache.get(key)
+        stats.add(name, response is not None)
+        if response is not None:
+            return response
+
+        # The key has the current versions, so a replica that is behind would cache old data under them
+        with pinned_to_primary():
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code == 200 and getattr(response, "accepted_renderer", None) is not None:
+                if response.accepted_renderer.format == "json":
+                    response.render()
+                    cache.set(key, response, API_CACHE_TIMEOUT)
+
+        return response
@@ -0,0 +1,51 @@
+"""
+Database profiles for DATABASES. Pick one in local_settings.py, for example:
+
+    from aid_coordinator.db import mysql_database
+
+    DATABASES = {"default": mysql_database("aid_coordinator", "aid", "secret", "db.example.org")}
+"""
+from pathlib import Path
+from typing import Union
+
+
+def sqlite_database(name: Union[str, Path]) -> dict:
+    """
+    SQLite with write-ahead logging, so readers and a writer don't block each other, and transactions that wait
+    for the write lock instead of failing with "database is locked".
+    """
+    return {
+        "ENGINE": "aid_coordinator.db.sqlite3",
+        "NAME": name,
+        "CONN_MAX_AGE": 60,
+        "OPTIONS": {
+            "transaction_mode": "IMMEDIATE",
+            "pragmas": {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",
+                "busy_timeout": 20000,
+            },
+        },
+    }
+
+
+def mysql_database(name: str, user: str, password: str, host: str = "", port: Union[str, int] = "") -> dict:
+    """
+    MySQL or MariaDB with persistent connections that are checked before they are reused.
+    """
+    return {
+        "ENGINE": "django.db.backends.mysql",
+        "NAME": name,
+        "USER": user,
+        "PASSWORD": password,
+        "HOST": host,
+        "PORT": port,
+        "CONN_MAX_AGE": 600,
+        # Only used from Django 4.1, until then connections are closed when they give an error
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "charset": "utf8mb4",
+            "isolation_level": "read committed",
+            "init_command": "SET sql_mode = 'STRICT_TRANS_TABLES', innodb_lock_wait_timeout = 20",
+        },
+    }
@@ -0,0 +1,107 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+IN_LIST = re.compile(r"IN \((?:\?, )*\?\)")
+WHITESPACE = re.compile(r"\s+")
+
+# "table"."column" or `table`.`column` compared with something, in a WHERE or ON clause
+COMPARED_COLUMN = re.compile(r"[\"`]?(\w+)[\"`]?\.[\"`](\w+)[\"`] (?:=|<|>|IN\b|IS\b|LIKE\b)")
+ORDER_BY = re.compile(r"\bORDER BY (.+?)(?: LIMIT \d+| OFFSET \d+|\)|$)")
+ORDER_COLUMN = re.compile(r"[\"`]?(\w+)[\"`]?\.[\"`](\w+)[\"`]")
+# Django names tables in subqueries and repeated joins U0, T3...
+TABLE_ALIAS = re.compile(r"\b(?:FROM|JOIN) [\"`](\w+)[\"`] (?:AS )?([A-Z]\d+)\b")
+
+
+@dataclass
+class QueryPlan:
+    lines: List[str] = field(default_factory=list)
+    # Tables read in full, and whether the result needs to be sorted without an index
+    full_scans: List[str] = field(default_factory=list)
+    sorts: bool = False
+
+    @property
+    def problems(self) -> List[str]:
+        problems = [f"full scan of {table}" for table in self.full_scans]
+        if self.sorts:
+            problems.append("sort without an index")
+        return problems
+
+
+def fingerprint(sql: str) -> str:
+    """
+    The SQL with all literal values and placeholders replaced by ?, so the same query with other parameters looks
+    the same.
+    """
+    sql = STRING.sub("?", sql).replace("%s", "?")
+    sql = NUMBER.sub("?", sql)
+    sql = IN_LIST.sub("IN (...)", sql)
+    return WHITESPACE.sub(" ", sql).strip()
+
+
+def explain(connection: BaseDatabaseWrapper, sql: str, params: Optional[Sequence] = None) -> QueryPlan:
+    """
+    The query plan of a SELECT on SQLite or MySQL.
+    """
+    plan = QueryPlan()
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            for _id, parent, _unused, detail in cursor.fetchall():
+                plan.lines.append(detail)
+
+                # "SCAN table" reads every row, "SCAN table USING (COVERING) INDEX" at least reads them in order
+                words = detail.split()
+                if words[0] == "SCAN" and "USING" not in words and words[1] not in ("subquery", "CONSTANT"):
+                    plan.full_scans.append(words[1])
+                if detail.startswith("USE TEMP B-TREE FOR") and "DISTINCT" not in detail:
+                    plan.sorts = True
+
+        elif connection.vendor == "mysql":
+            cursor.execute(f"EXPLAIN {sql}", params)
+            columns = [column[0] for column in cursor.description]
+            for row in cursor.fetchall():
+                row = dict(zip(columns, row))
+                plan.lines.append(
+                    f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row['Extra'] or ''}"
+                )
+                if row["type"] == "ALL":
+                    plan.full_scans.append(row["table"])
+                if "filesort" in (row["Extra"] or "") or "temporary" in (row["Extra"] or ""):
+                    plan.sorts = True
+
+        else:
+            raise NotImplementedError(f"Can't explain queries on {connection.vendor}")
+
+    return plan
+
+
+def suggest_index(sql: str, plan: QueryPlan) -> List[List[str]]:
+    """
+    A rough guess of the indexes that would help: the compared columns of each fully scanned table, and the
+    ORDER BY columns of queries that have to sort. Check the plan again after adding one.
+    """
+    aliases = {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+
+    suggestions = []
+    for table in plan.full_scans:
+        columns = []
+        for compared_table, column in COMPARED_COLUMN.findall(sql):
+            if compared_table == table and column not in columns:
+                columns.append(column)
+        if columns:
+            suggestions.append([aliases.get(table, table)] + columns)
+
+    if plan.sorts:
+        order_by = ORDER_BY.search(sql)
+        if order_by:
+            columns = ORDER_COLUMN.findall(order_by.group(1))
+            if columns and len({table for table, _column in columns}) == 1:
+                table = columns[0][0]
+                suggestions.append([aliases.get(table, table)] + [column for _table, column in columns])
+
+    return suggestions
@@ -0,0 +1,53 @@
+"""
+Log queries that take longer than SLOW_QUERY_SECONDS, with the code that ran them and for some of them the query
+plan. The logger's handler, SlowQueryHandler, stores them in SlowQuery from a background thread.
+"""
+import logging
+import random
+from typing import Optional, Sequence
+
+from django.conf import settings
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+from aid_coordinator.db.explain import explain, fingerprint
+from aid_coordinator.db.tracing import get_call_site
+
+logger = logging.getLogger("aid_coordinator.slow_queries")
+
+
+def is_slow(duration: float) -> bool:
+    return settings.SLOW_QUERY_SECONDS is not None and duration >= settings.SLOW_QUERY_SECONDS
+
+
+def get_plan(connection: BaseDatabaseWrapper, sql: str, params: Optional[Sequence]) -> str:
+    if sql.lstrip()[:6].upper() != "SELECT" or random.random() >= settings.SLOW_QUERY_EXPLAIN_RATE:
+        return ""
+
+    try:
+        return "\n".join(explain(connection, sql, params).lines)
+    except Exception as e:
+        # Like a query that can't be explained, or a transaction that's broken by now
+        return f"Can't explain: {e}"
+
+
+def log_slow_query(connection: BaseDatabaseWrapper, sql: str, params, many: bool, duration: float, path: str = ""):
+    """
+    Called by an execute wrapper after a slow query. Queries run here, like EXPLAIN, go through the execute wrappers
+    of the connection too.
+    """
+    call_site = get_call_site()
+    plan = "" if many else get_plan(connection, sql, params)
+    logger.warning(
+        "%.0f ms at %s: %s",
+        duration * 1000,
+        call_site,
+        sql,
+        extra={
+            "duration": duration,
+            "database": connection.alias,
+            "path": path,
+            "call_site": call_site,
+            "fingerprint": fingerprint(sql),
+            "plan": plan,
+        },
+    )
@@ -0,0 +1,25 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Django's SQLite backend with two extra OPTIONS: pragmas to execute on every new connection, and the
+    transaction_mode to start transactions with (DEFERRED, IMMEDIATE or EXCLUSIVE).
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop("pragmas", {})
+        self.transaction_mode = params.pop("transaction_mode", "DEFERRED").upper()
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        # A deferred transaction that reads before it writes can't wait for another writer, SQLite makes it fail
+        # immediately with "database is locked". Taking the write lock at the start makes it wait instead.
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
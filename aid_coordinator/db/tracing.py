@@ -0,0 +1,78 @@
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType
+from typing import Iterable, List
+
+from django.conf import settings
+
+# Frames in these directories are where a query is executed, not where it's caused
+IGNORED_DIRECTORIES = (Path(__file__).parent,)
+
+# Django code that runs queries for others
+ORM_DIRECTORIES = ("/django/db/", "/django/test/", "/django/utils/functional.py")
+
+# Middleware and view mixins that wrap everything, so they'd be the call site of queries from templates
+IGNORED_FUNCTIONS = {"__call__", "dispatch"}
+
+
+@dataclass
+class RecordedQuery:
+    sql: str
+    call_site: str
+
+
+def get_call_site(ignored_files: Iterable[str] = ()) -> str:
+    """
+    The innermost line of our own code on the stack, like "supply_demand/admin/admin.py:123 in
+    OfferAdmin.get_queryset".
+    """
+    base_dir = str(settings.BASE_DIR)
+    ignored = tuple(str(directory) for directory in IGNORED_DIRECTORIES) + tuple(ignored_files)
+    ignored += (str(settings.BASE_DIR / "manage.py"),)
+
+    # Without a line of our own, the first one outside the ORM, like the admin's template tags
+    fallback = None
+
+    frame = sys._getframe(1)
+    while frame:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(base_dir)
+            and not filename.startswith(ignored)
+            and "site-packages" not in filename
+            and frame.f_code.co_name not in IGNORED_FUNCTIONS
+        ):
+            return f"{Path(filename).relative_to(base_dir)}:{frame.f_lineno} in {get_function_name(frame)}"
+
+        if fallback is None and "site-packages" in filename and not any(part in filename for part in ORM_DIRECTORIES):
+            fallback = f"{filename.split('site-packages/')[-1]}:{frame.f_lineno} in {get_function_name(frame)}"
+        frame = frame.f_back
+
+    return fallback or "unknown"
+
+
+def get_function_name(frame: FrameType) -> str:
+    # With the class of methods, so a ModelAdmin or viewset method says which one, also for inherited methods
+    obj = frame.f_locals.get("self")
+    if obj is None:
+        return frame.f_code.co_name
+    return f"{type(obj).__name__}.{frame.f_code.co_name}"
+
+
+class QueryRecorder:
+    """
+    An execute wrapper that records each query with the place in our code that caused it:
+
+        with connection.execute_wrapper(recorder):
+            ...
+    """
+
+    def __init__(self, ignored_files: Iterable[str] = ()):
+        # Like the code that makes the requests, which would otherwise be the call site of queries from templates
+        self.ignored_files = tuple(ignored_files)
+        self.queries: List[RecordedQuery] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(RecordedQuery(sql=sql, call_site=get_call_site(self.ignored_files)))
+        return execute(sql, params, many, context)
@@ -0,0 +1,144 @@
+import csv
+import tempfile
+from typing import Iterable, Iterator, List, Optional
+
+from django.core.exceptions import PermissionDenied
+from django.db.models import QuerySet
+from django.http import HttpRequest, StreamingHttpResponse
+from import_export.formats import base_formats
+from import_export.signals import post_export
+
+from aid_coordinator.replica import read_from_replica
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    An object that implements just the write method of the file-like interface.
+    """
+
+    # noinspection PyMethodMayBeStatic
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows: Iterable[List[str]]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_xlsx(rows: Iterable[List[str]]) -> Iterator[bytes]:
+    from openpyxl import Workbook
+
+    # A write-only workbook keeps rows on disk instead of in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for row in rows:
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while chunk := output.read(64 * 1024):
+            yield chunk
+
+
+class StreamingExportMixin:
+    """
+    Resource mixin that reads the export columns straight from the database with values_list() instead of
+    walking the foreign keys of each object.
+    """
+
+    def get_export_paths(self) -> Optional[List[str]]:
+        paths = []
+        for field in self.get_export_fields():
+            # Fields that need Python code to get their value can't be streamed
+            if not field.attribute or hasattr(self, f"dehydrate_{self.get_field_name(field)}"):
+                return None
+            paths.append(field.attribute)
+
+        return paths
+
+    def iter_export_rows(self, queryset: QuerySet) -> Iterator[List[str]]:
+        fields = self.get_export_fields()
+        paths = self.get_export_paths()
+
+        yield self.get_export_headers()
+
+        values = queryset.prefetch_related(None).values_list(*paths)
+        for row in values.iterator(chunk_size=CHUNK_SIZE):
+            yield ["" if value is None else field.widget.render(value) for field, value in zip(fields, row)]
+
+
+class StreamingExportAdminMixin:
+    """
+    Stream CSV and XLSX exports to the client, other formats are still built in memory by django-import-export.
+    """
+
+    streaming_formats = (base_formats.CSV, base_formats.XLSX)
+
+    def get_streaming_export_response(self, request: HttpRequest, queryset: QuerySet, file_format):
+        if not isinstance(file_format, self.streaming_formats):
+            return None
+
+        resource = self.get_export_resource_class()(**self.get_export_resource_kwargs(request))
+        if not isinstance(resource, StreamingExportMixin) or resource.get_export_paths() is None:
+            return None
+
+        # The rows are read while the response is sent, after the view (and read_from_replica) has finished
+        rows = resource.iter_export_rows(queryset.using(queryset.db))
+        if isinstance(file_format, base_formats.XLSX):
+            content = stream_xlsx(rows)
+        else:
+            content = stream_csv(rows)
+
+        response = StreamingHttpResponse(content, content_type=file_format.get_content_type())
+        response["Content-Disposition"] = 'attachment; filename="%s"' % (
+            self.get_export_filename(request, queryset, file_format),
+        )
+        return response
+
+    def export_action(self, request: HttpRequest, *args, **kwargs):
+        with read_from_replica():
+            return self.export_action_from_replica(request, *args, **kwargs)
+
+    def export_action_from_replica(self, request: HttpRequest, *args, **kwargs):
+        if request.method == "POST" and self.has_export_permission(request):
+            formats = self.get_export_formats()
+            form = self.get_export_form()(formats, request.POST)
+            if form.is_valid():
+                file_format = formats[int(form.cleaned_data["file_format"])]()
+                queryset = self.get_export_queryset(request)
+                response = self.get_streaming_export_response(request, queryset, file_format)
+                if response is not None:
+                    post_export.send(sender=None, model=self.model)
+                    return response
+
+        return super().export_action(request, *args, **kwargs)
+
+    def export_admin_action(self, request: HttpRequest, queryset: QuerySet):
+        export_format = request.POST.get("file_format")
+        if export_format:
+            if not self.has_export_permission(request):
+                raise PermissionDenied
+
+            file_format = self.get_export_formats()[int(export_format)]()
+            with read_from_replica():
+                response = self.get_streaming_export_response(request, queryset, file_format)
+            if response is not None:
+                return response
+
+        with read_from_replica():
+            return super().export_admin_action(request, queryset)
+
+    def get_actions(self, request: HttpRequest):
+        actions = super().get_actions(request)
+
+        # django-import-export registers its own function, so replace it with ours
+        if "export_admin_action" in actions:
+            func, name, description = actions["export_admin_action"]
+            actions["export_admin_action"] = (type(self).export_admin_action, name, description)
+
+        return actions
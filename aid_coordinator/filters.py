@@ -1,4 +1,13 @@
+from functools import partial
+
 from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.utils.translation import get_language
+
+from aid_coordinator.caching import cached
+
+# Short, because bulk changes like imports and changes of models that aren't tracked don't expire the choices
+FILTER_CHOICES_CACHE_TIMEOUT = 5 * 60
 
 
 class InputFilter(admin.SimpleListFilter):
@@ -21,3 +30,40 @@ class InputFilter(admin.SimpleListFilter):
         Return the filtered queryset.
         """
         raise NotImplementedError("subclasses of ListFilter must provide a queryset() method")
+
+
+class CachedChoicesMixin:
+    """
+    List filter mixin that caches the choices until one of the tracked models between the admin's model and the field
+    changes, instead of querying them for every changelist.
+    """
+
+    def get_cached_choices(self, model_admin, scope: str, compute):
+        model = model_admin.model
+        model_classes = {model} | {
+            field.related_model for field in get_fields_from_path(model, self.field_path) if field.is_relation
+        }
+        # The scope is the SQL of the choices that depend on what the user can see
+        key = f"{model._meta.label}|{self.field_path}|{type(self).__name__}|{get_language()}|{scope}"
+        return cached("filter-choices", key, compute, model_classes, FILTER_CHOICES_CACHE_TIMEOUT)
+
+
+class CachedRelatedFieldListFilter(CachedChoicesMixin, admin.RelatedFieldListFilter):
+    def field_choices(self, field, request, model_admin):
+        return self.get_cached_choices(model_admin, "", partial(super().field_choices, field, request, model_admin))
+
+
+class CachedRelatedOnlyFieldListFilter(CachedChoicesMixin, admin.RelatedOnlyFieldListFilter):
+    def field_choices(self, field, request, model_admin):
+        return self.get_cached_choices(
+            model_admin,
+            str(model_admin.get_queryset(request).query),
+            partial(super().field_choices, field, request, model_admin),
+        )
+
+
+class CachedAllValuesFieldListFilter(CachedChoicesMixin, admin.AllValuesFieldListFilter):
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        queryset = self.lookup_choices
+        self.lookup_choices = self.get_cached_choices(model_admin, str(queryset.query), lambda: list(queryset))
@@ -0,0 +1,209 @@
+import ipaddress
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from logging.handlers import RotatingFileHandler
+from typing import List, Optional
+
+from django.db import connections
+from django.utils import timezone
+
+# Put in the queue to make the background thread write what it has and stop
+STOP = object()
+
+
+class BufferedHandler(logging.Handler):
+    """
+    Hands log records to a background thread, so logging never waits for a disk or database. The thread handles
+    the records in batches, every flush_interval seconds or as soon as buffer_size records are waiting.
+    """
+
+    def __init__(self, flush_interval: float = 5.0, buffer_size: int = 1000):
+        super().__init__()
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.queue = queue.SimpleQueue()
+        self.thread: Optional[threading.Thread] = None
+        self.pid = None
+
+    def start(self):
+        # Threads don't survive a fork, so every (gunicorn) worker process starts its own
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.queue = queue.SimpleQueue()
+                self.thread = threading.Thread(target=self.run, name=type(self).__name__, daemon=True)
+                self.thread.start()
+
+    def emit(self, record: logging.LogRecord):
+        if self.pid != os.getpid():
+            self.start()
+        self.queue.put(record)
+
+    def run(self):
+        buffer = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                record = None
+
+            if record is not None and record is not STOP:
+                buffer.append(record)
+
+            if record is STOP or len(buffer) >= self.buffer_size or time.monotonic() >= deadline:
+                if buffer:
+                    try:
+                        self.write(buffer)
+                    except Exception:
+                        self.handleError(buffer[-1])
+                buffer = []
+                deadline = time.monotonic() + self.flush_interval
+
+            if record is STOP:
+                return
+
+    def write(self, records: List[logging.LogRecord]):
+        raise NotImplementedError
+
+    def close(self):
+        # Called by logging.shutdown() when the process exits
+        if self.thread and self.pid == os.getpid() and self.thread.is_alive():
+            self.queue.put(STOP)
+            self.thread.join(timeout=self.flush_interval + 5)
+        super().close()
+
+
+class BufferedRotatingFileHandler(BufferedHandler):
+    """
+    Writes batches of records to a file that is rotated when it reaches max_bytes. Several processes can share the
+    file: when one of them rotates it, the others notice and continue in the new file.
+    """
+
+    def __init__(self, filename, max_bytes: int = 0, backup_count: int = 0, encoding: str = "utf-8", **kwargs):
+        super().__init__(**kwargs)
+        self.target = RotatingFileHandler(
+            filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding=encoding,
+            delay=True,
+        )
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def reopen_if_moved(self):
+        target = self.target
+        if target.stream is None:
+            return
+
+        try:
+            moved = os.stat(target.baseFilename).st_ino != os.fstat(target.stream.fileno()).st_ino
+        except FileNotFoundError:
+            moved = True
+
+        if moved:
+            target.stream.close()
+            target.stream = None
+
+    def write(self, records: List[logging.LogRecord]):
+        text = "".join(self.format(record) + self.target.terminator for record in records)
+
+        with self.target.lock:
+            self.reopen_if_moved()
+
+            target = self.target
+            if target.stream is None:
+                target.stream = target._open()
+
+            position = target.stream.tell()
+            if target.maxBytes and position and position + len(text) >= target.maxBytes:
+                target.doRollover()
+                if target.stream is None:
+                    target.stream = target._open()
+
+            target.stream.write(text)
+            target.stream.flush()
+
+    def close(self):
+        super().close()
+        self.target.close()
+
+
+class LanguageCountHandler(BufferedHandler):
+    """
+    Counts the records by day, language and the network of the IP address in LanguageUsage. Records need ip and
+    language attributes, which can be passed as extra to the logger.
+    """
+
+    def __init__(self, ipv4_prefix: int = 24, ipv6_prefix: int = 48, **kwargs):
+        kwargs.setdefault("flush_interval", 60.0)
+        kwargs.setdefault("buffer_size", 10000)
+        super().__init__(**kwargs)
+        self.ipv4_prefix = ipv4_prefix
+        self.ipv6_prefix = ipv6_prefix
+
+    def get_ip_prefix(self, ip: str) -> str:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return "unknown"
+
+        prefix = self.ipv4_prefix if address.version == 4 else self.ipv6_prefix
+        return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+    def write(self, records: List[logging.LogRecord]):
+        from aid_coordinator.models import LanguageUsage
+
+        counts = Counter(
+            (
+                timezone.localdate(datetime.fromtimestamp(record.created, dt_timezone.utc)),
+                self.get_ip_prefix(getattr(record, "ip", "")),
+                getattr(record, "language", "unset"),
+            )
+            for record in records
+        )
+
+        try:
+            LanguageUsage.objects.add_counts(counts)
+        finally:
+            # This thread has its own database connection, which Django won't close for us
+            connections.close_all()
+
+
+class SlowQueryHandler(BufferedHandler):
+    """
+    Stores the records of aid_coordinator.db.slow_queries in SlowQuery, keeping the newest keep of them.
+    """
+
+    def __init__(self, keep: int = 10000, **kwargs):
+        super().__init__(**kwargs)
+        self.keep = keep
+
+    def write(self, records: List[logging.LogRecord]):
+        from aid_coordinator.models import SlowQuery
+
+        queries = [
+            SlowQuery(
+                when=datetime.fromtimestamp(record.created, dt_timezone.utc),
+                duration=getattr(record, "duration", 0) * 1000,
+                database=getattr(record, "database", ""),
+                path=getattr(record, "path", "")[:255],
+                call_site=getattr(record, "call_site", "")[:255],
+                fingerprint=getattr(record, "fingerprint", record.getMessage()),
+                plan=getattr(record, "plan", ""),
+            )
+            for record in records
+        ]
+
+        try:
+            SlowQuery.objects.add(queries, keep=self.keep)
+        finally:
+            connections.close_all()
@@ -0,0 +1,94 @@
+import time
+from typing import Dict, List
+
+from django.core.management import BaseCommand, CommandError, CommandParser
+from django.db import connections
+from django.utils.translation import gettext as _
+
+from aid_coordinator.db.explain import QueryPlan, explain, fingerprint, suggest_index
+from aid_coordinator.workload import WORKLOAD_URLS, run_workload
+from contacts.models import Contact
+
+
+class QueryStats:
+    def __init__(self, sql: str, using: str):
+        self.sql = sql
+        self.using = using
+        self.steps: List[str] = []
+        self.count = 0
+        self.duration = 0.0
+        self.plan = QueryPlan()
+
+
+class Command(BaseCommand):
+    help = _("Run the most used pages and reports, and show the queries that read tables in full or sort rows")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--user", help=_("superuser to request the pages as (default: the first one)"))
+        parser.add_argument("--url", action="append", help=_("request this URL instead of the standard pages"))
+        parser.add_argument("--repeat", type=int, default=3, help=_("time each query this many times"))
+        parser.add_argument(
+            "--min-duration",
+            type=float,
+            default=1.0,
+            help=_("only show queries that take at least this many milliseconds"),
+        )
+        parser.add_argument("--all", action="store_true", help=_("also show queries without problems"))
+
+    def handle(self, *args, **options):
+        users = Contact.objects.filter(is_superuser=True, is_active=True).order_by("pk")
+        if options["user"]:
+            users = users.filter(username=options["user"])
+        user = users.first()
+        if not user:
+            raise CommandError(_("No superuser to request the pages as"))
+
+        queries: Dict[str, QueryStats] = {}
+        for step in run_workload(user, urls=options["url"] or WORKLOAD_URLS):
+            self.stdout.write(f"{step.name}: {step.status}, {len(step.queries)} queries, {step.duration * 1000:.0f} ms")
+            for query in step.queries:
+                sql = query["sql"]
+                if not sql.lstrip().upper().startswith("SELECT"):
+                    continue
+
+                stats = queries.setdefault(fingerprint(sql), QueryStats(sql, query["using"]))
+                stats.count += 1
+                if step.name not in stats.steps:
+                    stats.steps.append(step.name)
+
+        for stats in queries.values():
+            connection = connections[stats.using]
+            stats.plan = explain(connection, stats.sql)
+
+            # Best of a few runs, against the same (warm) cache as the pages get
+            durations = []
+            with connection.cursor() as cursor:
+                for _repeat in range(max(options["repeat"], 1)):
+                    start = time.perf_counter()
+                    cursor.execute(stats.sql)
+                    cursor.fetchall()
+                    durations.append(time.perf_counter() - start)
+            stats.duration = min(durations)
+
+        self.stdout.write("")
+        total = 0.0
+        for stats in sorted(queries.values(), key=lambda stats: stats.duration * stats.count, reverse=True):
+            total += stats.duration * stats.count
+            if stats.duration * 1000 < options["min_duration"] or not (stats.plan.problems or options["all"]):
+                continue
+
+            self.stdout.write(
+                self.style.WARNING(f"{stats.duration * 1000:.1f} ms × {stats.count}: ")
+                + ", ".join(stats.plan.problems or ["no problems"])
+            )
+            self.stdout.write(f"  in {', '.join(stats.steps)}")
+            self.stdout.write(f"  {stats.sql[:500]}")
+            for line in stats.plan.lines:
+                self.stdout.write(f"    {line}")
+            for table, *columns in suggest_index(stats.sql, stats.plan):
+                self.stdout.write(self.style.SUCCESS(f"  consider an index on {table} ({', '.join(columns)})"))
+            self.stdout.write("")
+
+        self.stdout.write(
+            _("{count} distinct queries, {total:.0f} ms in total").format(count=len(queries), total=total * 1000)
+        )
@@ -0,0 +1,108 @@
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management import BaseCommand, CommandParser
+from django.db import OperationalError, connections, transaction
+from django.utils.translation import gettext as _
+
+from aid_coordinator.db import sqlite_database
+
+TABLE = "benchmark_contention"
+
+
+class Command(BaseCommand):
+    help = _("Compare write contention of stock and tuned SQLite, and optionally of configured databases")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--workers", type=int, default=8, help=_("concurrent connections"))
+        parser.add_argument("--transactions", type=int, default=200, help=_("transactions per connection"))
+        parser.add_argument("--rows", type=int, default=10, help=_("rows to update, fewer means more contention"))
+        parser.add_argument(
+            "--database",
+            action="append",
+            default=[],
+            help=_("also benchmark this configured database, in a temporary table named %s") % TABLE,
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            profiles = {
+                "sqlite (stock)": {"ENGINE": "django.db.backends.sqlite3", "NAME": Path(directory) / "stock.db"},
+                "sqlite (tuned)": sqlite_database(Path(directory) / "tuned.db"),
+            }
+            for alias, settings_dict in profiles.items():
+                connections.settings[alias] = settings_dict
+
+            try:
+                for alias in list(profiles) + options["database"]:
+                    self.benchmark(alias, options["workers"], options["transactions"], options["rows"])
+            finally:
+                for alias in profiles:
+                    connections[alias].close()
+                    del connections.settings[alias]
+
+    def benchmark(self, alias: str, workers: int, transactions: int, rows: int):
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)")
+            for row in range(rows):
+                cursor.execute(f"INSERT INTO {TABLE} (id, value) VALUES (%s, 0)", [row])
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def work(number: int):
+            own_latencies, own_errors = [], []
+            try:
+                for i in range(transactions):
+                    start = time.perf_counter()
+                    try:
+                        # Read before writing, like most of the admin does
+                        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                            cursor.execute(f"SELECT SUM(value) FROM {TABLE}")
+                            cursor.fetchone()
+                            cursor.execute(
+                                f"UPDATE {TABLE} SET value = value + 1 WHERE id = %s",
+                                [(number + i) % rows],
+                            )
+                        own_latencies.append(time.perf_counter() - start)
+                    except OperationalError as e:
+                        own_errors.append(str(e))
+            finally:
+                connections[alias].close()
+                with lock:
+                    latencies.extend(own_latencies)
+                    errors.extend(own_errors)
+
+        threads = [threading.Thread(target=work, args=(number,)) for number in range(workers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT SUM(value) FROM {TABLE}")
+            (total,) = cursor.fetchone()
+            cursor.execute(f"DROP TABLE {TABLE}")
+
+        if latencies:
+            latencies.sort()
+            median = statistics.median(latencies) * 1000
+            p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+        else:
+            median = p95 = 0
+
+        self.stdout.write(
+            f"{alias}: {len(latencies)} committed, {len(errors)} failed, {len(latencies) / duration:.0f} per second, "
+            f"median {median:.1f} ms, p95 {p95:.1f} ms"
+        )
+        if total != len(latencies):
+            self.stderr.write(f"{alias}: {total} updates in the table, expected {len(latencies)}")
+        for error in sorted(set(errors)):
+            self.stderr.write(f"{alias}: {errors.count(error)}x {error}")
@@ -0,0 +1,128 @@
+import json
+import platform
+import statistics
+import tempfile
+from io import StringIO
+from pathlib import Path
+from typing import Dict
+
+import django
+from django.core.management import BaseCommand, CommandError, CommandParser, call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from aid_coordinator.caches import locmem_cache
+from aid_coordinator.workload import run_workload
+from contacts.models import Contact
+
+
+class Command(BaseCommand):
+    help = _(
+        "Time the main admin pages, API routes, exports and reports on synthetic data of different sizes, in a "
+        "temporary database"
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            "--scale",
+            type=int,
+            action="append",
+            help=_("number of offered and requested items, can be given more than once (default: 1000 and 10000)"),
+        )
+        parser.add_argument("--repeat", type=int, default=3, help=_("run everything this many times per scale"))
+        parser.add_argument("--output", type=Path, help=_("write the results to this JSON file"))
+        parser.add_argument("--compare", type=Path, help=_("compare with the results in this JSON file"))
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            try:
+                baseline = json.loads(options["compare"].read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(_("Can't read {path}: {error}").format(path=options["compare"], error=e))
+
+        results = {
+            "created": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connections[DEFAULT_DB_ALIAS].vendor,
+            "scales": {},
+        }
+        for scale in options["scale"] or [1000, 10000]:
+            self.stdout.write(self.style.MIGRATE_HEADING(_("{scale} items").format(scale=scale)))
+            results["scales"][str(scale)] = self.benchmark(scale, max(options["repeat"], 1))
+
+            if baseline:
+                self.compare(baseline["scales"].get(str(scale), {}), results["scales"][str(scale)])
+
+        if options["output"]:
+            options["output"].write_text(json.dumps(results, indent=2))
+            self.stdout.write(_("Results written to {path}").format(path=options["output"]))
+
+    def benchmark(self, scale: int, repeat: int) -> Dict:
+        connection = connections[DEFAULT_DB_ALIAS]
+        old_name = connection.settings_dict["NAME"]
+
+        with tempfile.TemporaryDirectory() as directory:
+            # A file rather than the in-memory test database, to include the disk like production does
+            if connection.vendor == "sqlite":
+                connection.settings_dict["TEST"]["NAME"] = str(Path(directory) / "benchmark.sqlite3")
+
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                # Everything in the temporary database, also what would be read from a replica, and a cache of its own
+                with override_settings(DATABASE_ROUTERS=[], CACHES={"default": locmem_cache()}):
+                    return self.run_steps(scale, repeat)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                connection.settings_dict["TEST"]["NAME"] = None
+
+    def run_steps(self, scale: int, repeat: int) -> Dict:
+        output = StringIO()
+        call_command("seed_synthetic", items=scale, force=True, stdout=output)
+        self.stdout.write(output.getvalue().splitlines()[-1])
+        user = Contact.objects.create_superuser(username="benchmark", email="benchmark@example.org", password=None)
+
+        # The first run fills caches, like the ones of the manifests
+        list(run_workload(user))
+
+        runs = {}
+        for _run in range(repeat):
+            for step in run_workload(user):
+                runs.setdefault(step.name, []).append(step)
+
+        steps = {}
+        for name, measurements in runs.items():
+            durations = [step.duration * 1000 for step in measurements]
+            last = measurements[-1]
+            steps[name] = {
+                "status": last.status,
+                "queries": len(last.queries),
+                "bytes": last.size,
+                "min_ms": round(min(durations), 1),
+                "median_ms": round(statistics.median(durations), 1),
+            }
+            self.stdout.write(
+                f"  {name}: {last.status}, {len(last.queries)} queries, "
+                f"{steps[name]['median_ms']:.0f} ms (min {steps[name]['min_ms']:.0f} ms)"
+            )
+
+        return {"steps": steps}
+
+    def compare(self, baseline: Dict, results: Dict):
+        self.stdout.write(_("Compared with the baseline:"))
+        for name, step in results["steps"].items():
+            before = baseline.get("steps", {}).get(name)
+            if not before:
+                continue
+
+            change = step["median_ms"] / before["median_ms"] - 1 if before["median_ms"] else 0
+            line = (
+                f"  {name}: {before['median_ms']:.0f} → {step['median_ms']:.0f} ms ({change:+.0%}), "
+                f"{before['queries']} → {step['queries']} queries"
+            )
+            if change > 0.2 or step["queries"] > before["queries"]:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
@@ -0,0 +1,67 @@
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management import BaseCommand, CommandError, CommandParser, call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+from django.utils.translation import gettext as _
+
+from aid_coordinator.db import sqlite_database
+from aid_coordinator.query_counts import QUERY_COUNT_SETTINGS, compare_query_counts
+
+
+@contextmanager
+def temporary_sqlite_database():
+    """
+    Point the default database at an empty SQLite file, whatever the settings say.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        original = connections.settings[DEFAULT_DB_ALIAS]
+        connections[DEFAULT_DB_ALIAS].close()
+        connections.settings[DEFAULT_DB_ALIAS] = connections.configure_settings(
+            {DEFAULT_DB_ALIAS: sqlite_database(Path(directory) / "queries.sqlite3")}
+        )[DEFAULT_DB_ALIAS]
+        del connections[DEFAULT_DB_ALIAS]
+        try:
+            yield
+        finally:
+            connections[DEFAULT_DB_ALIAS].close()
+            connections.settings[DEFAULT_DB_ALIAS] = original
+            del connections[DEFAULT_DB_ALIAS]
+
+
+class Command(BaseCommand):
+    help = _(
+        "Request every admin changelist and change page and every API route with a little and with more data, in "
+        "a temporary SQLite database, and fail if the number of queries grows with the number of rows. The tests "
+        "in aid_coordinator.tests do the same"
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--small", type=int, default=30, help=_("synthetic items for the first run"))
+        parser.add_argument("--large", type=int, default=120, help=_("synthetic items for the second run"))
+        parser.add_argument("--verbose-counts", action="store_true", help=_("show the query count of every page"))
+
+    def handle(self, *args, **options):
+        if options["large"] <= options["small"]:
+            raise CommandError(_("--large has to be larger than --small"))
+
+        with temporary_sqlite_database(), override_settings(**QUERY_COUNT_SETTINGS):
+            call_command("migrate", verbosity=0)
+            pages = compare_query_counts(options["small"], options["large"], ignored_files=[__file__])
+
+        failures = 0
+        for page in pages:
+            if page.skipped:
+                self.stdout.write(_("{name}: skipped, the object was deleted by the second run").format(name=page.name))
+            elif not page.ok:
+                failures += 1
+                self.stdout.write(self.style.ERROR(page.describe()))
+            elif options["verbose_counts"]:
+                self.stdout.write(page.describe())
+
+        if failures:
+            raise CommandError(_("{count} of {total} pages failed").format(count=failures, total=len(pages)))
+        message = _("The query counts of {total} pages are stable").format(total=len(pages))
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,290 @@
+import random
+import time
+from datetime import timedelta
+from typing import Callable, List
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.management import BaseCommand, CommandError, CommandParser
+from django.db import models, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from aid_coordinator.caching import bump_versions
+from contacts.models import Contact, Organisation, OrgType
+from logistics.models import Claim, Location, Shipment, ShipmentEvent, ShipmentEventType, StockBalance, StockMovement
+from supply_demand.models import (
+    Change,
+    ChangeAction,
+    ChangeType,
+    ItemType,
+    Offer,
+    OfferItem,
+    Request,
+    RequestItem,
+    link_equipment,
+)
+
+CITIES = (
+    "Kyiv Kharkiv Odesa Dnipro Lviv Zaporizhzhia Vinnytsia Poltava Chernihiv Sumy Mykolaiv Kherson Amsterdam "
+    "Berlin Warsaw Prague Vienna Frankfurt Brussels Paris Stockholm Copenhagen"
+).split()
+FIRST_NAMES = (
+    "Olena Andriy Iryna Oleksandr Natalia Dmytro Tetiana Serhiy Kateryna Mykola Anna Jan Eva Pieter Sophie Lukas "
+    "Marta Tomasz Ingrid Lars Claire Marco"
+).split()
+LAST_NAMES = (
+    "Shevchenko Kovalenko Bondarenko Tkachenko Kravchenko Melnyk Oliynyk Boyko de Vries Jansen Müller Schmidt "
+    "Nowak Kowalski Novák Dubois Rossi Andersson Nielsen Hansen"
+).split()
+ORGANISATION_WORDS = "Telecom Networks Online Net Connect Link Fiber Data IX Systems Hosting Broadband".split()
+EQUIPMENT = {
+    "Cisco": ("Catalyst 2960-X", "Catalyst 3850", "ASR 1001-X", "ASR 9001", "Nexus 3064", "ISR 4331"),
+    "Juniper": ("EX2300-24T", "EX4300-48T", "MX204", "MX480", "QFX5100-48S", "SRX300"),
+    "Arista": ("7050SX-64", "7280SR-48C6", "7010T-48", "7160-32CQ"),
+    "Nokia": ("7750 SR-1", "7250 IXR-e", "7210 SAS-Sx"),
+    "MikroTik": ("CCR1036-8G-2S+", "CRS326-24G-2S+", "RB4011", "CCR2004-16G-2S+"),
+    "Ubiquiti": ("EdgeRouter 4", "UniFi Switch 24", "airFiber 60", "UISP Switch"),
+    "HPE": ("ProLiant DL360 Gen9", "ProLiant DL380 Gen10", "Aruba 2930F"),
+    "Dell": ("PowerEdge R630", "PowerEdge R740", "PowerSwitch S5248F"),
+    "": ("SFP+ 10G LR optics", "QSFP28 100G LR4 optics", "Fibre patch cable LC-LC 3m", "Rack 42U", "UPS 3kVA"),
+}
+
+
+def next_pk(model) -> int:
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = _("Fill the database with synthetic contacts, offers, requests, claims, shipments and changes")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=10000,
+            help=_("number of offered and of requested items, the rest is scaled to it (default: 10000)"),
+        )
+        parser.add_argument("--seed", type=int, default=0, help=_("random seed, the same seed gives the same data"))
+        parser.add_argument("--days", type=int, default=365, help=_("spread the changes over this many days"))
+        parser.add_argument("--batch-size", type=int, default=5000, help=_("objects per INSERT"))
+        parser.add_argument("--force", action="store_true", help=_("also run when DEBUG is off"))
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError(_("This adds a lot of fake data, use --force to run it without DEBUG"))
+
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        items = options["items"]
+        start = time.perf_counter()
+        with transaction.atomic():
+            self.seed(items, max(options["days"], 1))
+
+        # Bulk creates don't send the signals that expire cached data
+        bump_versions(
+            Organisation,
+            Contact,
+            Contact.groups.through,
+            Offer,
+            Request,
+            OfferItem,
+            RequestItem,
+            Shipment,
+            ShipmentEvent,
+            Claim,
+            StockMovement,
+            StockBalance,
+            Change,
+        )
+        self.stdout.write(f"Created {items} synthetic items in {time.perf_counter() - start:.1f} s")
+
+    def create(self, model, count: int, make: Callable[[int, int], models.Model]) -> List[int]:
+        """
+        Create count objects with make(pk, number). The primary keys are chosen here, because bulk_create only
+        returns them on some databases.
+        """
+        first = next_pk(model)
+        pks = list(range(first, first + count))
+
+        batch = []
+        for number, pk in enumerate(pks):
+            batch.append(make(pk, number))
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch)
+
+        self.stdout.write(f"  {count} {model._meta.verbose_name_plural}")
+        return pks
+
+    def seed(self, items: int, days: int):
+        rnd = self.random
+        types = list(ItemType.objects.order_by("pk")) or [ItemType.objects.create(name="Hardware")]
+        locations = list(Location.objects.values_list("pk", flat=True)) or [None]
+        donors = Group.objects.get_or_create(name="Donors")[0]
+        requesters = Group.objects.get_or_create(name="Requesters")[0]
+        equipment = [(brand, model) for brand, models_ in EQUIPMENT.items() for model in models_]
+        now = timezone.now()
+
+        organisation_ids = self.create(
+            Organisation,
+            max(items // 50, 10),
+            lambda pk, n: Organisation(
+                pk=pk,
+                name=f"{rnd.choice(CITIES)} {rnd.choice(ORGANISATION_WORDS)} {pk}",
+                type=rnd.choice(OrgType.values),
+                listed=rnd.random() < 0.7,
+            ),
+        )
+
+        contact_ids = self.create(
+            Contact,
+            max(items // 20, 20),
+            lambda pk, n: Contact(
+                pk=pk,
+                username=f"synthetic-{pk}",
+                email=f"synthetic-{pk}@example.org",
+                first_name=rnd.choice(FIRST_NAMES),
+                last_name=rnd.choice(LAST_NAMES),
+                organisation_id=rnd.choice(organisation_ids) if rnd.random() < 0.9 else None,
+                listed=rnd.random() < 0.5,
+            ),
+        )
+
+        # Half of the contacts donate, the other half requests
+        memberships = [
+            Contact.groups.through(contact_id=pk, group_id=(donors if number % 2 else requesters).pk)
+            for number, pk in enumerate(contact_ids)
+        ]
+        Contact.groups.through.objects.bulk_create(memberships, batch_size=self.batch_size)
+        donor_ids, requester_ids = contact_ids[1::2], contact_ids[::2]
+
+        offer_ids = self.create(
+            Offer,
+            max(items // 10, 1),
+            lambda pk, n: Offer(
+                pk=pk,
+                contact_id=rnd.choice(donor_ids),
+                description=f"Equipment from {rnd.choice(CITIES)}",
+                location=f"{rnd.choice(CITIES)}, warehouse {rnd.randint(1, 20)}",
+            ),
+        )
+        request_ids = self.create(
+            Request,
+            max(items // 10, 1),
+            lambda pk, n: Request(
+                pk=pk,
+                contact_id=rnd.choice(requester_ids),
+                goal=f"Restore the network in {rnd.choice(CITIES)}",
+            ),
+        )
+
+        def make_offered_item(pk: int, number: int) -> OfferItem:
+            brand, model = rnd.choice(equipment)
+            item = OfferItem(
+                pk=pk,
+                offer_id=offer_ids[number * len(offer_ids) // items],
+                type=rnd.choice(types),
+                brand=brand,
+                model=model,
+                amount=rnd.randint(1, 50),
+                rejected=rnd.random() < 0.05,
+                received=rnd.random() < 0.3,
+            )
+            item.update_normalized_key()
+            return item
+
+        offered_item_ids = self.create(OfferItem, items, make_offered_item)
+
+        previous = {"request_id": None}
+
+        def make_requested_item(pk: int, number: int) -> RequestItem:
+            brand, model = rnd.choice(equipment)
+            request_id = request_ids[number * len(request_ids) // items]
+
+            # Some items are alternatives for the one before them, which can be an alternative itself
+            is_alternative = previous["request_id"] == request_id and rnd.random() < 0.2
+            previous["request_id"] = request_id
+
+            item = RequestItem(
+                pk=pk,
+                request_id=request_id,
+                type=rnd.choice(types),
+                brand=brand,
+                model=model,
+                amount=rnd.randint(1, 20),
+                alternative_for_id=pk - 1 if is_alternative else None,
+            )
+            item.update_normalized_key()
+            return item
+
+        requested_item_ids = self.create(RequestItem, items, make_requested_item)
+
+        link_equipment(OfferItem.objects.filter(pk__gte=offered_item_ids[0]))
+        link_equipment(RequestItem.objects.filter(pk__gte=requested_item_ids[0]))
+
+        shipment_ids = self.create(
+            Shipment,
+            max(items // 100, 1),
+            lambda pk, n: Shipment(
+                pk=pk,
+                name=f"Synthetic shipment {pk}",
+                when=(now - timedelta(days=rnd.randrange(days))).date(),
+            ),
+        )
+        self.create(
+            ShipmentEvent,
+            len(shipment_ids),
+            lambda pk, n: ShipmentEvent(
+                pk=pk,
+                shipment_id=shipment_ids[n],
+                when=now - timedelta(days=rnd.randrange(days)),
+                type=rnd.choice(ShipmentEventType.values),
+                location_id=rnd.choice(locations),
+            ),
+        )
+        Shipment.objects.filter(pk__gte=shipment_ids[0]).refresh_from_events()
+
+        claim_ids = self.create(
+            Claim,
+            items // 2,
+            lambda pk, n: Claim(
+                pk=pk,
+                offered_item_id=rnd.choice(offered_item_ids),
+                requested_item_id=rnd.choice(requested_item_ids),
+                amount=rnd.randint(1, 5),
+                shipment_id=rnd.choice(shipment_ids) if rnd.random() < 0.6 else None,
+                current_location_id=rnd.choice(locations),
+            ),
+        )
+        StockMovement.objects.sync_claims(claim_ids)
+        StockBalance.objects.rebuild()
+
+        def make_change(pk: int, number: int) -> Change:
+            brand, model = rnd.choice(equipment)
+            change_type = rnd.choice(ChangeType.values)
+            action = rnd.choice(ChangeAction.values)
+            line = f"{rnd.randint(1, 50)}x {brand} {model}".replace("  ", " ")
+            return Change(
+                pk=pk,
+                who_id=rnd.choice(donor_ids if change_type == ChangeType.OFFER else requester_ids),
+                action=action,
+                type=change_type,
+                what=f"Synthetic {ChangeType(change_type).label.lower()} {number}",
+                before="" if action == ChangeAction.ADD else line,
+                after="" if action == ChangeAction.DELETE else f"{line}\n{rnd.choice(CITIES)}",
+            )
+
+        change_ids = self.create(Change, items, make_change)
+
+        # when is set on creation, so spread the changes over the days afterwards, oldest first
+        per_day = len(change_ids) // days + 1
+        for day in range(days):
+            first = change_ids[0] + day * per_day
+            Change.objects.filter(pk__gte=first, pk__lt=first + per_day).update(
+                when=now - timedelta(days=days - day - 1, seconds=rnd.randrange(86400))
+            )
@@ -0,0 +1,43 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError, CommandParser
+from django.utils.translation import gettext as _
+
+from aid_coordinator.replica import REPLICA
+
+
+class Command(BaseCommand):
+    help = _("Copy the default SQLite database to the replica, for trying out a read replica locally")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--interval", type=float, help=_("keep copying every this many seconds"))
+
+    def handle(self, *args, **options):
+        if REPLICA not in settings.DATABASES:
+            raise CommandError(_("There is no replica database configured"))
+
+        source, target = settings.DATABASES["default"], settings.DATABASES[REPLICA]
+        if "sqlite3" not in source["ENGINE"] or "sqlite3" not in target["ENGINE"]:
+            raise CommandError(_("Only SQLite databases can be copied, use database replication for anything else"))
+
+        while True:
+            start = time.perf_counter()
+            self.copy(source["NAME"], target["NAME"])
+            self.stdout.write(f"Copied {source['NAME']} to {target['NAME']} in {time.perf_counter() - start:.2f} s")
+
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    @staticmethod
+    def copy(source_name, target_name):
+        # The backup API copies a consistent snapshot, and readers of the replica just wait until it's done
+        source = sqlite3.connect(source_name)
+        target = sqlite3.connect(target_name, timeout=20)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
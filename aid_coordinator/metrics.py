@@ -0,0 +1,254 @@
+"""
+Always-on request instrumentation: the number of queries and the database time of each request, latency histograms
+per route, and a /metrics endpoint in the Prometheus text format, which also has the hit ratios of the caches. The
+numbers are kept per process, so with several workers each one is scraped, or summed, separately.
+"""
+import copy
+import ipaddress
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+
+from aid_coordinator import caching
+from aid_coordinator.db.slow_queries import is_slow, log_slow_query
+
+# Upper bounds in seconds, like the defaults of the Prometheus client libraries
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Requests that didn't match a URL pattern, so scanners can't add a series per URL they try
+UNMATCHED_ROUTE = "unmatched"
+
+
+class QueryTimer:
+    """
+    An execute wrapper that counts the queries and adds up the time they take, and logs the slow ones.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.count = 0
+        self.duration = 0.0
+        # While a slow query is logged, which can run an EXPLAIN that shouldn't be counted
+        self.logging = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.logging:
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.duration += duration
+            self.count += 1
+
+            if is_slow(duration):
+                self.logging = True
+                try:
+                    log_slow_query(context["connection"], sql, params, many, duration, self.path)
+                finally:
+                    self.logging = False
+
+
+@contextmanager
+def timing_queries(timer: QueryTimer):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        yield
+
+
+class RouteStats:
+    def __init__(self):
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.db_duration = 0.0
+        self.statuses: Dict[int, int] = {}
+
+    def add(self, duration: float, queries: int, db_duration: float, status: int):
+        for number, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                self.buckets[number] += 1
+                break
+        self.count += 1
+        self.duration += duration
+        self.queries += queries
+        self.db_duration += db_duration
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def copy(self) -> "RouteStats":
+        stats = copy.copy(self)
+        stats.buckets = list(self.buckets)
+        stats.statuses = dict(self.statuses)
+        return stats
+
+
+class Registry:
+    """
+    The statistics of all requests in this process, by route and method.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.started = time.time()
+
+    def add(self, route: str, method: str, duration: float, queries: int, db_duration: float, status: int):
+        with self.lock:
+            stats = self.routes.get((route, method))
+            if stats is None:
+                stats = self.routes[(route, method)] = RouteStats()
+            stats.add(duration, queries, db_duration, status)
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+
+    def render(self) -> str:
+        with self.lock:
+            # A copy, so the text is built without holding up requests
+            routes = {key: stats.copy() for key, stats in self.routes.items()}
+
+        text = "".join(render_metrics(sorted(routes.items()), self.started))
+        return text + "".join(render_cache_metrics(caching.stats.get_counts()))
+
+
+registry = Registry()
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics(routes: List[Tuple[Tuple[str, str], RouteStats]], started: float) -> Iterator[str]:
+    def labels(route: str, method: str, **extra) -> str:
+        pairs = {"route": route, "method": method, **extra}
+        return ",".join(f'{name}="{escape_label(str(value))}"' for name, value in pairs.items())
+
+    yield "# HELP aid_process_start_time_seconds When the statistics of this process started.\n"
+    yield "# TYPE aid_process_start_time_seconds gauge\n"
+    yield f"aid_process_start_time_seconds {started:.3f}\n"
+
+    yield "# HELP aid_request_duration_seconds How long requests took, until the response was returned.\n"
+    yield "# TYPE aid_request_duration_seconds histogram\n"
+    for (route, method), stats in routes:
+        cumulative = 0
+        for bound, bucket in zip(DURATION_BUCKETS, stats.buckets):
+            cumulative += bucket
+            yield f"aid_request_duration_seconds_bucket{{{labels(route, method, le=bound)}}} {cumulative}\n"
+        yield f'aid_request_duration_seconds_bucket{{{labels(route, method, le="+Inf")}}} {stats.count}\n'
+        yield f"aid_request_duration_seconds_sum{{{labels(route, method)}}} {stats.duration:.6f}\n"
+        yield f"aid_request_duration_seconds_count{{{labels(route, method)}}} {stats.count}\n"
+
+    yield "# HELP aid_request_queries_total Database queries run by requests.\n"
+    yield "# TYPE aid_request_queries_total counter\n"
+    for (route, method), stats in routes:
+        yield f"aid_request_queries_total{{{labels(route, method)}}} {stats.queries}\n"
+
+    yield "# HELP aid_request_db_seconds_total Time requests spent waiting for the database.\n"
+    yield "# TYPE aid_request_db_seconds_total counter\n"
+    for (route, method), stats in routes:
+        yield f"aid_request_db_seconds_total{{{labels(route, method)}}} {stats.db_duration:.6f}\n"
+
+    yield "# HELP aid_responses_total Responses by status code.\n"
+    yield "# TYPE aid_responses_total counter\n"
+    for (route, method), stats in routes:
+        for status, count in sorted(stats.statuses.items()):
+            yield f"aid_responses_total{{{labels(route, method, status=status)}}} {count}\n"
+
+
+def render_cache_metrics(counts: Dict[str, Tuple[int, int]]) -> Iterator[str]:
+    yield "# HELP aid_cache_requests_total Lookups of cached data by name, hits and misses.\n"
+    yield "# TYPE aid_cache_requests_total counter\n"
+    for name, (hits, misses) in counts.items():
+        yield f'aid_cache_requests_total{{cache="{escape_label(name)}",result="hit"}} {hits}\n'
+        yield f'aid_cache_requests_total{{cache="{escape_label(name)}",result="miss"}} {misses}\n'
+
+    yield "# HELP aid_cache_hit_ratio The part of the lookups of cached data that were hits, since the start.\n"
+    yield "# TYPE aid_cache_hit_ratio gauge\n"
+    for name, (hits, misses) in counts.items():
+        yield f'aid_cache_hit_ratio{{cache="{escape_label(name)}"}} {hits / (hits + misses):.4f}\n'
+
+
+def get_route(request: HttpRequest) -> str:
+    # The URL pattern, like "api/offered_items/<pk>/", instead of the URL itself to keep the number of series small
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNMATCHED_ROUTE
+    return match.route or match.view_name or UNMATCHED_ROUTE
+
+
+def may_see_timings(request: HttpRequest) -> bool:
+    # Every contact is staff, so the timings are only for superusers
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_authenticated and user.is_superuser)
+
+
+class MetricsMiddleware:
+    """
+    Count the queries and the database time of each request, log the slow queries, add the totals to the statistics
+    of its route, and tell superusers in a Server-Timing header, which browsers show in the network tab of their
+    developer tools. Streaming responses, like the exports, are counted once their content has been sent, but their
+    Server-Timing header only covers the time until it started.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest):
+        timer = QueryTimer(request.path)
+        start = time.perf_counter()
+        with timing_queries(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        if response.streaming:
+            # Exports run most of their queries while the content is sent
+            response.streaming_content = self.stream(response.streaming_content, request, response, timer, start)
+        else:
+            self.record(request, response, timer, duration)
+
+        if may_see_timings(request):
+            response["Server-Timing"] = (
+                f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries", '
+                f"app;dur={(duration - timer.duration) * 1000:.1f}, "
+                f"total;dur={duration * 1000:.1f}"
+            )
+
+        return response
+
+    def stream(self, content: Iterator[bytes], request: HttpRequest, response, timer: QueryTimer, start: float):
+        try:
+            with timing_queries(timer):
+                yield from content
+        finally:
+            self.record(request, response, timer, time.perf_counter() - start)
+
+    @staticmethod
+    def record(request: HttpRequest, response, timer: QueryTimer, duration: float):
+        registry.add(get_route(request), request.method, duration, timer.count, timer.duration, response.status_code)
+
+
+def may_see_metrics(request: HttpRequest) -> bool:
+    if may_see_timings(request):
+        return True
+
+    try:
+        remote_addr = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(remote_addr in ipaddress.ip_network(network) for network in settings.METRICS_ALLOWED_IPS)
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    if not may_see_metrics(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,15 +1,32 @@
+import gzip
+import logging
+from typing import Iterable, Iterator, Set
+
 from django.conf import settings
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
-from django.utils.timezone import now
+from django.utils.text import compress_sequence
 
+try:
+    import brotli
+except ImportError:
+    # Only gzip then
+    brotli = None
 
-class LogLocaleMiddleware(MiddlewareMixin):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+logger = logging.getLogger("aid_coordinator.locale")
+
+# Content types worth compressing, images and spreadsheets are compressed already
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
 
-        self.log = open(settings.BASE_DIR / "language.log", "a")
 
+class LogLocaleMiddleware(MiddlewareMixin):
     def process_request(self, request: HttpRequest):
         if "REMOTE_ADDR" in request.META:
             ip = request.META["REMOTE_ADDR"]
@@ -21,5 +38,79 @@ class LogLocaleMiddleware(MiddlewareMixin):
         else:
             lang = "unset"
 
-        self.log.write(f"{now()} {ip} {lang}\n")
-        self.log.flush()
+        # The handlers in LOGGING write this to language.log and LanguageUsage from a background thread
+        logger.info("%s %s", ip, lang, extra={"ip": ip, "language": lang})
+
+
+def get_accepted_encodings(request: HttpRequest) -> Set[str]:
+    encodings = set()
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        encoding, _, parameters = part.strip().partition(";")
+        if encoding and parameters.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            encodings.add(encoding.strip().lower())
+    return encodings
+
+
+def compress_sequence_brotli(sequence: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli when it's installed and the browser accepts it, and with gzip otherwise. Like
+    Django's GZipMiddleware, but responses smaller than COMPRESSION_MIN_SIZE aren't compressed, the few bytes saved
+    aren't worth the time, and neither are content types that are compressed already.
+    """
+
+    def process_response(self, request: HttpRequest, response: HttpResponse):
+        if response.has_header("Content-Encoding") or not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        accepted = get_accepted_encodings(request)
+        if brotli is not None and "br" in accepted:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            return response
+
+        if response.streaming:
+            if encoding == "br":
+                response.streaming_content = compress_sequence_brotli(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content)
+            del response["Content-Length"]
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+
+            if encoding == "br":
+                compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            else:
+                compressed = gzip.compress(response.content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+            if len(compressed) >= len(response.content):
+                return response
+
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # The compressed response is different from the uncompressed one with the same ETag
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+
+        response["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def is_compressible(response: HttpResponse) -> bool:
+        content_type = response.get("Content-Type", "").lower()
+        return response.status_code != 206 and content_type.startswith(COMPRESSIBLE_TYPES)
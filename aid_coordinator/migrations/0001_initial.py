@@ -0,0 +1,37 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("contacts", "0020_move_language_usage"),
+    ]
+
+    operations = [
+        # The table was created by the contacts app, which renamed it for this one
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="LanguageUsage",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID"),
+                        ),
+                        ("day", models.DateField(verbose_name="day")),
+                        ("ip_prefix", models.CharField(max_length=50, verbose_name="IP prefix")),
+                        ("language", models.CharField(max_length=10, verbose_name="language")),
+                        ("requests", models.PositiveBigIntegerField(default=0, verbose_name="requests")),
+                    ],
+                    options={
+                        "verbose_name": "language usage",
+                        "verbose_name_plural": "language usage",
+                        "ordering": ("-day", "ip_prefix", "language"),
+                        "unique_together": {("day", "ip_prefix", "language")},
+                    },
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.0.10 on 2026-10-19 00:09
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aid_coordinator', '0001_initial'),
+        ('contacts', '0021_move_slow_query'),
+    ]
+
+    operations = [
+        # The table was created by the contacts app, which renamed it for this one
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='SlowQuery',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('when', models.DateTimeField(default=django.utils.timezone.now, verbose_name='when')),
+                        ('duration', models.FloatField(verbose_name='duration (ms)')),
+                        ('database', models.CharField(max_length=50, verbose_name='database')),
+                        ('path', models.CharField(blank=True, max_length=255, verbose_name='path')),
+                        ('call_site', models.CharField(max_length=255, verbose_name='call site')),
+                        ('fingerprint', models.TextField(verbose_name='query')),
+                        ('plan', models.TextField(blank=True, verbose_name='query plan')),
+                    ],
+                    options={
+                        'verbose_name': 'slow query',
+                        'verbose_name_plural': 'slow queries',
+                        'ordering': ('-when',),
+                    },
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='slowquery',
+            index=models.Index(fields=['when'], name='aid_coordin_when_1ca531_idx'),
+        ),
+    ]
@@ -0,0 +1,103 @@
+from datetime import date
+from typing import Dict, List, Tuple
+
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+# (day, IP prefix, language)
+LanguageUsageKey = Tuple[date, str, str]
+
+
+class LanguageUsageManager(models.Manager):
+    def add_counts(self, counts: Dict[LanguageUsageKey, int]):
+        """
+        Add the number of requests to the counters of each day, IP prefix and language.
+        """
+        try:
+            self._add_counts(counts)
+        except IntegrityError:
+            # Another process created one of the same counters at the same time, now it exists
+            self._add_counts(counts)
+
+    def _add_counts(self, counts: Dict[LanguageUsageKey, int]):
+        with transaction.atomic():
+            candidates = self.select_for_update().filter(
+                day__in={key[0] for key in counts},
+                ip_prefix__in={key[1] for key in counts},
+            )
+            usages = {(usage.day, usage.ip_prefix, usage.language): usage for usage in candidates}
+
+            to_create, to_update = [], []
+            for key, count in counts.items():
+                usage = usages.get(key)
+                if usage is None:
+                    day, ip_prefix, language = key
+                    to_create.append(LanguageUsage(day=day, ip_prefix=ip_prefix, language=language, requests=count))
+                else:
+                    usage.requests += count
+                    to_update.append(usage)
+
+            self.bulk_create(to_create)
+            self.bulk_update(to_update, ["requests"])
+
+
+class LanguageUsage(models.Model):
+    """
+    The number of requests per day in each language, by the network they came from.
+    """
+
+    day = models.DateField(verbose_name=_("day"))
+    ip_prefix = models.CharField(verbose_name=_("IP prefix"), max_length=50)
+    language = models.CharField(verbose_name=_("language"), max_length=10)
+    requests = models.PositiveBigIntegerField(verbose_name=_("requests"), default=0)
+
+    objects = LanguageUsageManager()
+
+    class Meta:
+        unique_together = (("day", "ip_prefix", "language"),)
+        ordering = ("-day", "ip_prefix", "language")
+        verbose_name = _("language usage")
+        verbose_name_plural = _("language usage")
+
+    def __str__(self):
+        return f"{self.requests} requests in {self.language} from {self.ip_prefix} on {self.day}"
+
+
+class SlowQueryManager(models.Manager):
+    def add(self, queries: List["SlowQuery"], keep: int):
+        """
+        Store the queries and delete the oldest ones beyond the newest keep, so the table works like a ring buffer.
+        """
+        self.bulk_create(queries)
+
+        oldest_kept = self.order_by("-pk").values_list("pk", flat=True)[max(keep, 1) - 1 : max(keep, 1)]
+        if oldest_kept:
+            self.filter(pk__lt=oldest_kept[0]).delete()
+
+
+class SlowQuery(models.Model):
+    """
+    A query that took longer than SLOW_QUERY_SECONDS, with the code that ran it. Written by SlowQueryHandler.
+    """
+
+    when = models.DateTimeField(verbose_name=_("when"), default=timezone.now)
+    duration = models.FloatField(verbose_name=_("duration (ms)"))
+    database = models.CharField(verbose_name=_("database"), max_length=50)
+    path = models.CharField(verbose_name=_("path"), max_length=255, blank=True)
+    call_site = models.CharField(verbose_name=_("call site"), max_length=255)
+    fingerprint = models.TextField(verbose_name=_("query"))
+    plan = models.TextField(verbose_name=_("query plan"), blank=True)
+
+    objects = SlowQueryManager()
+
+    class Meta:
+        ordering = ("-when",)
+        verbose_name = _("slow query")
+        verbose_name_plural = _("slow queries")
+        indexes = [
+            models.Index(fields=["when"]),
+        ]
+
+    def __str__(self):
+        return f"{self.duration:.0f} ms at {self.call_site}"
@@ -0,0 +1,206 @@
+"""
+Request every admin changelist and change page and every API route with a little and with more data, and find the
+queries that run more often when there are more rows, which are usually N+1 queries. Used by QueryCountTests and
+the check_query_counts command.
+"""
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from io import StringIO
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.contrib import admin
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Model
+from django.urls import NoReverseMatch, reverse
+
+import aid_coordinator.workload
+from aid_coordinator.caches import locmem_cache
+from aid_coordinator.db.explain import fingerprint
+from aid_coordinator.db.tracing import QueryRecorder, RecordedQuery
+from aid_coordinator.workload import get_client
+from contacts.models import Contact
+
+# For override_settings(): a cache of its own, so nothing from the test database ends up in a shared cache, and
+# static files that don't need collectstatic
+QUERY_COUNT_SETTINGS = {
+    "DATABASE_ROUTERS": [],
+    "CACHES": {"default": locmem_cache()},
+    "STATICFILES_STORAGE": "django.contrib.staticfiles.storage.StaticFilesStorage",
+}
+
+# Their handlers write to the database from a background thread, which can happen after the test database is gone
+BACKGROUND_LOGGERS = ("aid_coordinator.locale", "aid_coordinator.slow_queries")
+
+# (name, URL, the object of a change or detail page)
+PageUrl = Tuple[str, str, Optional[Model]]
+
+# (SQL fingerprint, call site), the number of times with a little data, the number of times with more data
+QueryGrowth = Tuple[Tuple[str, str], int, int]
+
+
+@dataclass
+class PageQueries:
+    name: str
+    small_status: int = 0
+    large_status: int = 0
+    small_queries: List[RecordedQuery] = field(default_factory=list)
+    large_queries: List[RecordedQuery] = field(default_factory=list)
+    error: str = ""
+    # The object of the page was deleted by the second run
+    skipped: bool = False
+
+    @property
+    def growth(self) -> List[QueryGrowth]:
+        return get_growth(self.small_queries, self.large_queries)
+
+    @property
+    def ok(self) -> bool:
+        return self.skipped or (self.small_status == 200 and self.large_status == 200 and not self.growth)
+
+    def describe(self) -> str:
+        lines = [f"{self.name}: {len(self.small_queries)} → {len(self.large_queries)} queries"]
+        if self.small_status != 200 or self.large_status != 200:
+            lines[0] += f", status {self.small_status} and {self.large_status}"
+        if self.error:
+            lines.append(f"  {self.error}")
+        for (sql, call_site), small_count, large_count in self.growth:
+            lines.append(f"  {small_count} → {large_count}× at {call_site}")
+            lines.append(f"    {sql[:300]}")
+        return "\n".join(lines)
+
+
+def seed(items: int):
+    call_command("seed_synthetic", items=items, seed=items, force=True, stdout=StringIO())
+
+
+def get_urls() -> List[PageUrl]:
+    # Imported here, loading the URLs imports all the admins and API views
+    from aid_coordinator.urls import router
+
+    urls = []
+    for model in admin.site._registry:
+        info = (model._meta.app_label, model._meta.model_name)
+        urls.append((f"{model.__name__} changelist", reverse("admin:%s_%s_changelist" % info), None))
+
+        # The same object in both runs, which gets more related rows in the second one
+        obj = model._default_manager.order_by("pk").first()
+        if obj:
+            urls.append((f"{model.__name__} change", reverse("admin:%s_%s_change" % info, args=[obj.pk]), obj))
+
+    for prefix, viewset, basename in router.registry:
+        urls.append((f"/api/{prefix}/", reverse(f"{basename}-list"), None))
+
+        obj = viewset.queryset.order_by("pk").first() if viewset.queryset is not None else None
+        if obj:
+            try:
+                urls.append((f"/api/{prefix}/<pk>/", reverse(f"{basename}-detail", args=[obj.pk]), obj))
+            except NoReverseMatch:
+                pass
+
+    return urls
+
+
+def measure(
+    user: Contact,
+    urls: List[PageUrl],
+    ignored_files: Iterable[str] = (),
+) -> Dict[str, Optional[Tuple[int, List[RecordedQuery], str]]]:
+    """
+    The status, the queries and the error, if any, of the second request of each page. None for pages of objects
+    that don't exist anymore. The call sites of the queries skip ignored_files, like the code that runs this.
+    """
+    ignored_files = [__file__, aid_coordinator.workload.__file__, *ignored_files]
+    client = get_client(user)
+    results = {}
+    for name, url, obj in urls:
+        # Rebuilding the stock balances replaces them
+        if obj is not None and not type(obj)._default_manager.filter(pk=obj.pk).exists():
+            results[name] = None
+            continue
+
+        # Once to fill the caches
+        client.get(url)
+
+        recorder = QueryRecorder(ignored_files)
+        error = ""
+        with connections[DEFAULT_DB_ALIAS].execute_wrapper(recorder):
+            try:
+                response = client.get(url)
+                status = response.status_code
+                if response.streaming:
+                    b"".join(response.streaming_content)
+            except Exception as e:
+                status = 500
+                error = repr(e)
+
+        results[name] = (status, recorder.queries, error)
+    return results
+
+
+def get_growth(small_queries: List[RecordedQuery], large_queries: List[RecordedQuery]) -> List[QueryGrowth]:
+    """
+    The queries that run more often with more rows, by SQL and call site. Queries that only run once are left out:
+    a page can need a query more when there's more data, like the date hierarchy when there's more than one date.
+    """
+
+    def count(queries) -> Counter:
+        return Counter((fingerprint(query.sql), query.call_site) for query in queries)
+
+    small_counts, large_counts = count(small_queries), count(large_queries)
+    return [
+        (key, small_counts[key], large_count)
+        for key, large_count in large_counts.most_common()
+        if large_count > max(small_counts[key], 1)
+    ]
+
+
+@contextmanager
+def background_loggers_disabled():
+    loggers = [logging.getLogger(name) for name in BACKGROUND_LOGGERS]
+    disabled = [logger.disabled for logger in loggers]
+    for logger in loggers:
+        logger.disabled = True
+    try:
+        yield
+    finally:
+        for logger, was_disabled in zip(loggers, disabled):
+            logger.disabled = was_disabled
+
+
+def compare_query_counts(small: int = 30, large: int = 120, ignored_files: Iterable[str] = ()) -> List[PageQueries]:
+    """
+    Request every page with small synthetic items in the database, and again after adding more up to large. The
+    database should be empty, like a test database, and the settings should include QUERY_COUNT_SETTINGS.
+    """
+    user = Contact.objects.create_superuser(username="query-counts", email="", password=None)
+
+    with background_loggers_disabled():
+        seed(small)
+        urls = get_urls()
+        small_results = measure(user, urls, ignored_files)
+
+        seed(large - small)
+        large_results = measure(user, urls, ignored_files)
+
+    pages = []
+    for name, _url, _obj in urls:
+        small_status, small_queries, small_error = small_results[name]
+        if large_results[name] is None:
+            pages.append(PageQueries(name=name, skipped=True))
+            continue
+
+        large_status, large_queries, large_error = large_results[name]
+        pages.append(
+            PageQueries(
+                name=name,
+                small_status=small_status,
+                large_status=large_status,
+                small_queries=small_queries,
+                large_queries=large_queries,
+                error=small_error or large_error,
+            )
+        )
+    return pages
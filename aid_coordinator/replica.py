@@ -0,0 +1,121 @@
+"""
+Send reads that can be a little out of date, like the public API, exports and reports, to an optional database
+with the alias "replica". Everything else, and everything for a browser that just changed something, uses the
+default database.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpRequest
+
+REPLICA = "replica"
+
+# Set on responses to requests that wrote something, so the next requests of that browser see the changes
+STICKY_COOKIE = "primary_db"
+
+_use_replica = ContextVar("use_replica", default=False)
+_pinned = ContextVar("pinned_to_primary", default=False)
+_writes = ContextVar("replica_writes", default=None)
+
+
+class WriteTracker:
+    wrote = False
+
+
+def has_replica() -> bool:
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def read_from_replica(enabled: bool = True):
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def pinned_to_primary():
+    """
+    Read from the default database, also in views that read from the replica, for data that is cached until the
+    models change and mustn't be older than their versions.
+    """
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def get_read_database() -> str:
+    if _use_replica.get() and not _pinned.get() and has_replica():
+        return REPLICA
+    return DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return get_read_database()
+
+    def db_for_write(self, model, **hints):
+        tracker: Optional[WriteTracker] = _writes.get()
+        if tracker:
+            tracker.wrote = True
+
+        # Also for objects that were read from the replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases have the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its tables from the default database
+        if db == REPLICA:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Keep a browser on the default database for a few seconds after it wrote something, so it sees its own changes
+    even when the replica is behind.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest):
+        tracker = WriteTracker()
+        pinned_token = _pinned.set(STICKY_COOKIE in request.COOKIES)
+        writes_token = _writes.set(tracker)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned.reset(pinned_token)
+            _writes.reset(writes_token)
+
+        if tracker.wrote and has_replica():
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    View mixin that reads from the replica for GET, HEAD and OPTIONS requests.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with read_from_replica(request.method in ("GET", "HEAD", "OPTIONS")):
+            return super().dispatch(request, *args, **kwargs)
@@ -14,6 +14,9 @@ from pathlib import Path
 
 from django.utils.translation import gettext_lazy as _
 
+from aid_coordinator.caches import locmem_cache
+from aid_coordinator.db import sqlite_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,6 +40,10 @@ ALLOWED_HOSTS = [
 
 DEFAULT_FROM_EMAIL = "ukraine@nogalliance.org"
 
+# Outgoing email is queued and sent by the send_queued_email command, retried after 1, 2, 4... minutes
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+EMAIL_OUTBOX_RETRY_DELAY = 60
+
 INTERNAL_IPS = [
     "2001:9e0:8804:7700::/56",
     "82.139.77.145",
@@ -53,6 +60,7 @@ INSTALLED_APPS = [
     "supply_demand.apps.SupplyDemandConfig",
     "contacts.apps.ContactsConfig",
     "logistics.apps.LogisticsConfig",
+    "aid_coordinator.apps.AidCoordinatorConfig",
     "debug_toolbar",
     "rest_framework",
     "django_filters",
@@ -64,10 +72,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "xff.middleware.XForwardedForMiddleware",
+    "aid_coordinator.metrics.MetricsMiddleware",
+    "aid_coordinator.middleware.CompressionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "aid_coordinator.middleware.LogLocaleMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "aid_coordinator.replica.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -76,6 +87,9 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Besides superusers, these addresses can read /metrics, like a Prometheus server on the same host
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1", *INTERNAL_IPS]
+
 XFF_TRUSTED_PROXY_DEPTH = 1
 XFF_STRICT = True
 
@@ -107,12 +121,22 @@ WSGI_APPLICATION = "aid_coordinator.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
-
+# See aid_coordinator.db for the MySQL profile
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": sqlite_database(BASE_DIR / "db.sqlite3"),
+}
+
+# The API, exports and reports read from a database with the alias "replica" if there is one. To try it locally,
+# add a copy of the SQLite database that the sync_replica command keeps up to date:
+#   DATABASES["replica"] = sqlite_database(BASE_DIR / "replica.sqlite3")
+DATABASE_ROUTERS = ["aid_coordinator.replica.ReplicaRouter"]
+
+# How long a browser keeps reading from the default database after it changed something
+REPLICA_STICKY_SECONDS = 30
+
+# Per process, see aid_coordinator.caches for caches that workers can share
+CACHES = {
+    "default": locmem_cache(),
 }
 
 # Password validation
@@ -153,13 +177,77 @@ LANGUAGES = [
 STATIC_URL = "static/"
 STATIC_ROOT = BASE_DIR / "static"
 
+# collectstatic adds a hash of the contents to the names, and writes gzip and (with brotli installed) brotli versions
+STATICFILES_STORAGE = "aid_coordinator.storage.CompressedManifestStaticFilesStorage"
+
+# How long browsers can keep static files with a hash in their name
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+# Responses are compressed by CompressionMiddleware from this size, with brotli if installed and gzip otherwise
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_GZIP_LEVEL = 6
+
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Organisation logos are resized to fit in squares of these sizes, in each of these formats
+LOGO_SIZES = {
+    "small": 120,
+    "medium": 320,
+    "large": 640,
+}
+LOGO_FORMATS = ("webp", "png")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Queries of requests that take at least this many seconds are logged with their call site, None to turn it off.
+# Some of them, the fraction in SLOW_QUERY_EXPLAIN_RATE, with their query plan. See the SlowQuery admin.
+SLOW_QUERY_SECONDS = 0.2
+SLOW_QUERY_EXPLAIN_RATE = 0.1
+
+# The language of each request is logged by LogLocaleMiddleware, and written in the background
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "locale": {
+            "format": "{asctime} {message}",
+            "style": "{",
+        },
+    },
+    "handlers": {
+        "locale_file": {
+            "class": "aid_coordinator.log_handlers.BufferedRotatingFileHandler",
+            "formatter": "locale",
+            "filename": BASE_DIR / "language.log",
+            "max_bytes": 100 * 1024 * 1024,
+            "backup_count": 10,
+        },
+        "locale_counts": {
+            "class": "aid_coordinator.log_handlers.LanguageCountHandler",
+        },
+        "slow_queries": {
+            "class": "aid_coordinator.log_handlers.SlowQueryHandler",
+            "keep": 10000,
+        },
+    },
+    "loggers": {
+        "aid_coordinator.locale": {
+            "handlers": ["locale_file", "locale_counts"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "aid_coordinator.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
 DEBUG_TOOLBAR_CONFIG = {
     "SHOW_TOOLBAR_CALLBACK": "aid_coordinator.debug_toolbar.show_toolbar",
 }
@@ -184,6 +272,51 @@ IMPORT_EXPORT_SKIP_ADMIN_LOG = True
 IMPORT_EXPORT_IMPORT_PERMISSION_CODE = "add"
 IMPORT_EXPORT_EXPORT_PERMISSION_CODE = "view"
 
+# Pallets and boxes that shipments can be packed on, sizes in cm and weights in kg
+PACKING_PROFILES = {
+    "euro_pallet": {
+        "name": _("Euro pallet"),
+        "width": 120,
+        "depth": 80,
+        "height": 160,
+        "max_weight": 1000,
+    },
+    "industrial_pallet": {
+        "name": _("Industrial pallet"),
+        "width": 120,
+        "depth": 100,
+        "height": 160,
+        "max_weight": 1200,
+    },
+    "moving_box": {
+        "name": _("Moving box"),
+        "width": 60,
+        "depth": 40,
+        "height": 40,
+        "max_weight": 25,
+    },
+}
+
+# Limits for the shipments proposed by the consolidation optimizer, in kg and m³ (the load of a 12 tonne truck)
+SHIPMENT_MAX_WEIGHT = 5000
+SHIPMENT_MAX_VOLUME = 40
+
+# What the consolidation optimizer assumes for an item without equipment data, in kg and m³ (a boxed 2U server)
+SHIPMENT_UNKNOWN_ITEM_WEIGHT = 25
+SHIPMENT_UNKNOWN_ITEM_VOLUME = 0.1
+
+# Other names that donors and requesters use for brands, to match their items with the equipment data
+EQUIPMENT_BRAND_ALIASES = {
+    "Cisco Systems": "Cisco",
+    "Juniper Networks": "Juniper",
+    "Arista Networks": "Arista",
+    "Extreme Networks": "Extreme",
+    "Ubiquiti Networks": "Ubiquiti",
+    "UBNT": "Ubiquiti",
+    "Dell EMC": "Dell",
+    "Hewlett Packard Enterprise": "HPE",
+}
+
 REGISTRATION_OPEN = True
 ACCOUNT_ACTIVATION_DAYS = 3650
 
@@ -0,0 +1,69 @@
+"""
+Static files with the hash of their contents in their names, so they can be cached forever, and compressed versions
+next to them, written once by collectstatic instead of for every request.
+"""
+import gzip
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    # Only gzip then
+    brotli = None
+
+# Formats that aren't compressed already
+COMPRESSIBLE_EXTENSIONS = {
+    ".css",
+    ".js",
+    ".mjs",
+    ".map",
+    ".json",
+    ".svg",
+    ".txt",
+    ".html",
+    ".xml",
+    ".ico",
+    ".ttf",
+    ".otf",
+    ".eot",
+}
+
+# Smaller files fit in a packet anyway
+MIN_COMPRESS_SIZE = 256
+
+
+def compress_file(path: Path):
+    """
+    Write path.gz and path.br, if brotli is installed, unless they don't make the file smaller.
+    """
+    data = path.read_bytes()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return
+
+    variants = {".gz": lambda: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = lambda: brotli.compress(data, quality=11)
+
+    for suffix, compress in variants.items():
+        target = path.with_name(path.name + suffix)
+        # Hashed names change with the contents, so an existing file is up to date
+        if target.exists():
+            continue
+
+        compressed = compress()
+        if len(compressed) < len(data) * 0.95:
+            target.write_bytes(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+
+        if dry_run:
+            return
+
+        for hashed_name in set(self.hashed_files.values()):
+            if Path(hashed_name).suffix.lower() in COMPRESSIBLE_EXTENSIONS:
+                compress_file(Path(self.path(hashed_name)))
@@ -0,0 +1,17 @@
+from django.test import TestCase, override_settings
+
+from aid_coordinator.query_counts import QUERY_COUNT_SETTINGS, compare_query_counts
+
+
+@override_settings(**QUERY_COUNT_SETTINGS)
+class QueryCountTests(TestCase):
+    """
+    Every admin page and API route runs the same queries with more data, so there are no N+1 queries.
+    """
+
+    def test_query_counts_are_stable(self):
+        for page in compare_query_counts(small=30, large=120, ignored_files=[__file__]):
+            with self.subTest(page.name):
+                if page.skipped:
+                    continue
+                self.assertTrue(page.ok, page.describe())
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.views import PasswordResetView
 from django.urls import include, path
@@ -6,9 +7,11 @@ from django.views.generic import RedirectView
 from django_registration.backends.activation.views import RegistrationView
 from rest_framework import routers
 
-from aid_coordinator.views import ClaimAutocompleteView
+from aid_coordinator.metrics import metrics_view
+from aid_coordinator.views import ClaimAutocompleteView, serve_static
 from contacts.api import DonorOrganisationViewSet, PersonalDonorViewSet
 from contacts.forms import ContactRegistrationForm
+from logistics.api import ShipmentEventViewSet, ShipmentManifestViewSet
 from logistics.views import RequestView
 from supply_demand.api import OfferItemViewSet, RequestItemViewSet
 
@@ -23,6 +26,8 @@ router.register(r"personal_donors", PersonalDonorViewSet)
 router.register(r"donor_organisations", DonorOrganisationViewSet)
 router.register(r"offered_items", OfferItemViewSet)
 router.register(r"requested_items", RequestItemViewSet)
+router.register(r"shipment_manifests", ShipmentManifestViewSet)
+router.register(r"shipment_events", ShipmentEventViewSet)
 
 urlpatterns = [
     path(
@@ -45,6 +50,9 @@ urlpatterns = [
     ),
     path("admin/", admin.site.urls),
     path("api/", include(router.urls)),
+    path("metrics", metrics_view, name="metrics"),
+    # For when the web server in front doesn't serve the static files itself
+    path(settings.STATIC_URL.lstrip("/") + "<path:path>", serve_static, name="static"),
     path("i18n/", include("django.conf.urls.i18n")),
     path("__debug__/", include("debug_toolbar.urls")),
     path('', RedirectView.as_view(url='/admin/'), name='go-to-admin'),
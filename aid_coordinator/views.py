@@ -1,9 +1,28 @@
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.admin.views.autocomplete import AutocompleteJsonView
-from django.views.generic import FormView
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpRequest, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.generic import FormView, TemplateView
+from django.views.static import was_modified_since
 
+from aid_coordinator.middleware import get_accepted_encodings
 from supply_demand.models import OfferItem
 
+# Like "admin/css/base.5af66c1b1797.css", made by collectstatic
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.\w+$")
+
+# The files collectstatic compressed, best first
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
 
 class ClaimAutocompleteView(AutocompleteJsonView):
     def serialize_result(self, obj, to_field_name):
@@ -30,7 +49,7 @@ class ClaimAutocompleteView(AutocompleteJsonView):
             return super().serialize_result(obj, to_field_name)
 
 
-class AdminFormView(FormView):
+class AdminContextMixin:
     admin_model = None
 
     def get_context_data(self, **kwargs):
@@ -44,3 +63,51 @@ class AdminFormView(FormView):
         data.setdefault("opts", self.admin_model._meta)
 
         return data
+
+
+class AdminFormView(AdminContextMixin, FormView):
+    pass
+
+
+class AdminTemplateView(AdminContextMixin, TemplateView):
+    pass
+
+
+def serve_static(request: HttpRequest, path: str):
+    """
+    Static files from STATIC_ROOT, compressed by collectstatic if the browser accepts that. Files with the hash of
+    their contents in their name never change, so browsers can keep them for a year without asking again.
+    """
+    path = posixpath.normpath(path).lstrip("/")
+    try:
+        full_path = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404()
+    if not full_path.is_file():
+        raise Http404()
+
+    stat = full_path.stat()
+    if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    content_type = mimetypes.guess_type(full_path.name)[0] or "application/octet-stream"
+
+    accepted = get_accepted_encodings(request)
+    encoding, file_path = None, full_path
+    for candidate, suffix in PRECOMPRESSED:
+        compressed_path = full_path.with_name(full_path.name + suffix)
+        if candidate in accepted and compressed_path.is_file():
+            encoding, file_path = candidate, compressed_path
+            break
+
+    response = FileResponse(file_path.open("rb"), content_type=content_type, filename=full_path.name)
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+
+    if HASHED_NAME.search(path):
+        response["Cache-Control"] = f"public, max-age={settings.STATIC_MAX_AGE}, immutable"
+    else:
+        response["Cache-Control"] = "public, max-age=3600"
+    return response
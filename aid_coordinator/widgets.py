@@ -1,7 +1,31 @@
 from django.contrib.admin.widgets import AutocompleteSelect
 from django.urls import reverse
+from import_export.widgets import ForeignKeyWidget
 
 
 class ClaimAutocompleteSelect(AutocompleteSelect):
     def get_url(self):
         return reverse("autocomplete_claim")
+
+
+class CachedForeignKeyWidget(ForeignKeyWidget):
+    """
+    A ForeignKeyWidget that loads all related objects with one query on first use, instead of one query per row.
+    """
+
+    def __init__(self, model, field="pk", *args, **kwargs):
+        super().__init__(model, field, *args, **kwargs)
+        self.objects = None
+
+    def clean(self, value, row=None, *args, **kwargs):
+        if not value:
+            return None
+
+        if self.objects is None:
+            queryset = self.get_queryset(value, row, *args, **kwargs)
+            self.objects = {str(getattr(obj, self.field)): obj for obj in queryset}
+
+        try:
+            return self.objects[str(value)]
+        except KeyError:
+            raise ValueError(f"{self.model._meta.verbose_name} {value!r} does not exist")
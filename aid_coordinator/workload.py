@@ -0,0 +1,122 @@
+"""
+The pages, API routes and reports that are used most, for measuring the database queries they run.
+"""
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from io import StringIO
+from typing import Dict, Iterable, Iterator, List
+
+from django.conf import settings
+from django.contrib.auth.models import AbstractBaseUser
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from supply_demand.models import OfferItem
+
+# Placeholders like {offered_item} are filled in by get_url_arguments()
+WORKLOAD_URLS = (
+    "/admin/supply_demand/offer/",
+    "/admin/supply_demand/offer/?location=kyiv",
+    "/admin/supply_demand/offeritem/",
+    "/admin/supply_demand/request/",
+    "/admin/supply_demand/requestitem/",
+    "/admin/supply_demand/change/",
+    "/admin/logistics/claim/",
+    "/admin/logistics/shipment/",
+    "/admin/contacts/contact/",
+    "/admin/contacts/organisation/",
+    "/admin/request/{offered_item}/",
+    "/api/personal_donors/",
+    "/api/donor_organisations/",
+    "/api/offered_items/",
+    "/api/requested_items/",
+)
+
+# Exported as CSV, the first export format
+WORKLOAD_EXPORTS = (
+    "/admin/supply_demand/offeritem/export/",
+    "/admin/supply_demand/requestitem/export/",
+    "/admin/logistics/claim/export/",
+)
+
+WORKLOAD_COMMANDS = (("show_changes",),)
+
+
+@dataclass
+class WorkloadStep:
+    name: str
+    duration: float
+    status: int = 0
+    size: int = 0
+    queries: List[Dict[str, str]] = field(default_factory=list)
+
+
+def get_client(user: AbstractBaseUser) -> Client:
+    # Requests have to look like they came through the proxy in front of the site
+    host = next((host for host in settings.ALLOWED_HOSTS if host != "*"), "localhost").lstrip(".")
+    client = Client(HTTP_HOST=host, HTTP_X_FORWARDED_FOR="127.0.0.1")
+    client.force_login(user)
+    return client
+
+
+def get_url_arguments() -> Dict[str, int]:
+    # An item with claims, if there is one
+    offered_item = OfferItem.objects.filter(claim__isnull=False).order_by("pk").values_list("pk", flat=True).first()
+    return {"offered_item": offered_item or 0}
+
+
+def read_response(response: HttpResponse) -> int:
+    # Streaming responses only run their queries while they're read
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def run_workload(
+    user: AbstractBaseUser,
+    urls: Iterable[str] = WORKLOAD_URLS,
+    exports: Iterable[str] = WORKLOAD_EXPORTS,
+    commands: Iterable[tuple] = WORKLOAD_COMMANDS,
+) -> Iterator[WorkloadStep]:
+    """
+    Request the URLs and exports as this user and run the management commands, and capture the queries of each.
+    """
+    client = get_client(user)
+    arguments = get_url_arguments()
+
+    def capture(name: str, function) -> WorkloadStep:
+        with ExitStack() as stack:
+            contexts = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+            start = time.perf_counter()
+            status, size = function()
+            step = WorkloadStep(name=name, duration=time.perf_counter() - start, status=status, size=size)
+
+        for context in contexts:
+            step.queries.extend(dict(query, using=context.connection.alias) for query in context.captured_queries)
+        return step
+
+    def get(url: str):
+        response = client.get(url)
+        return response.status_code, read_response(response)
+
+    def export(url: str):
+        response = client.post(url, {"file_format": "0"})
+        return response.status_code, read_response(response)
+
+    def run_command(command: tuple):
+        stdout = StringIO()
+        call_command(*command, stdout=stdout)
+        return 0, len(stdout.getvalue())
+
+    for url in urls:
+        yield capture(url, lambda: get(url.format(**arguments)))
+
+    for url in exports:
+        yield capture(f"{url} (CSV)", lambda: export(url))
+
+    for command in commands:
+        yield capture(" ".join(command), lambda: run_command(command))
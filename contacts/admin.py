@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib import admin, messages
+from django.contrib.admin import helpers
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.tokens import default_token_generator
 from django.db import models
@@ -7,7 +8,9 @@ from django.db.models import Case, F, Q, Value as V, When
 from django.db.models.functions import Concat
 from django.http import HttpRequest, HttpResponseRedirect
 from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
 from django.urls import path, reverse
+from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.html import format_html, format_html_join
 from django.utils.http import urlsafe_base64_encode
@@ -15,8 +18,13 @@ from django.utils.translation import gettext_lazy as _
 
 from contacts.filters import RequestedOrganisationFilter
 from contacts.forms import AddContactForm, ContactForm
-from contacts.models import Contact, Organisation
-from contacts.views import EmailView
+from contacts.matching import get_pending_contacts, normalize_name, suggest_organisations
+from contacts.models import Contact, Organisation, OutgoingEmail, OutgoingEmailStatus
+from contacts.views import DuplicateOrganisationsView, EmailView, store_email_selection
+from supply_demand.admin.base import ReadOnlyMixin
+
+# Each contact is a field in the form, and Django limits the number of fields in a request
+MAX_LINK_CONTACTS = 400
 
 
 @admin.register(Contact)
@@ -155,7 +163,7 @@ class ContactAdmin(UserAdmin):
         models.ManyToManyField: {"widget": forms.CheckboxSelectMultiple},
     }
 
-    actions = ("send_welcome_email", "send_custom_email")
+    actions = ("send_welcome_email", "send_custom_email", "link_organisations")
 
     def get_urls(self):
         return [path("email/", self.admin_site.admin_view(EmailView.as_view()))] + super().get_urls()
@@ -164,10 +172,15 @@ class ContactAdmin(UserAdmin):
     def has_mail_permission(self, request):
         return request.user.is_superuser
 
+    # noinspection PyMethodMayBeStatic
+    def has_link_permission(self, request):
+        return request.user.is_superuser
+
     @admin.action(description=_("Send welcome email"), permissions=["mail"])
     def send_welcome_email(self, request: HttpRequest, queryset: Contact.objects):
         queryset = queryset.prefetch_related("groups")
         queryset = queryset.select_related("organisation")
+        emails = []
         for contact in queryset:
             if contact.is_superuser:
                 self.message_user(
@@ -206,15 +219,74 @@ class ContactAdmin(UserAdmin):
                 },
                 request,
             )
-            contact.email_user("Your keepukraineconnected.org account", message)
+            emails.append(
+                OutgoingEmail(subject="Your keepukraineconnected.org account", body=message, to=[contact.email])
+            )
 
-            self.message_user(request, f"Sent welcome message to {contact}")
+            self.message_user(request, f"Queued welcome message to {contact}")
+
+        OutgoingEmail.objects.queue_many(emails)
 
     # noinspection PyUnusedLocal
     @admin.action(description=_("Send custom email"), permissions=["mail"])
     def send_custom_email(self, request: HttpRequest, queryset: Contact.objects):
-        selected = queryset.values_list("pk", flat=True)
-        return HttpResponseRedirect("email/?contacts=%s" % (",".join(str(pk) for pk in selected),))
+        key = store_email_selection(request, queryset.values_list("pk", flat=True))
+        return HttpResponseRedirect(f"email/?selection={key}")
+
+    @admin.action(description=_("Link to matching organisations"), permissions=["link"])
+    def link_organisations(self, request: HttpRequest, queryset: Contact.objects):
+        contacts = get_pending_contacts(queryset)
+
+        if request.POST.get("post"):
+            links = {}
+            skipped = []
+            for contact in contacts:
+                organisation_id = request.POST.get(f"organisation_{contact.pk}")
+                if not organisation_id:
+                    continue
+                try:
+                    links.setdefault(int(organisation_id), []).append(contact.pk)
+                except ValueError:
+                    skipped.append(contact)
+
+            count = 0
+            for organisation_id in Organisation.objects.filter(pk__in=links).values_list("pk", flat=True):
+                count += Contact.objects.filter(pk__in=links[organisation_id]).update(organisation_id=organisation_id)
+
+            self.message_user(request, _("Linked {count} contacts to an organisation").format(count=count))
+            if skipped:
+                self.message_user(
+                    request,
+                    _("Skipped contacts with an invalid organisation: {contacts}").format(
+                        contacts=", ".join(str(contact) for contact in skipped)
+                    ),
+                    level=messages.WARNING,
+                )
+            return None
+
+        if not contacts:
+            self.message_user(request, _("All selected contacts are linked to the organisation they requested"))
+            return None
+
+        if len(contacts) > MAX_LINK_CONTACTS:
+            self.message_user(
+                request,
+                _("Showing the first {count} of {total} contacts").format(count=MAX_LINK_CONTACTS, total=len(contacts)),
+                level=messages.WARNING,
+            )
+            contacts = contacts[:MAX_LINK_CONTACTS]
+
+        suggestions = suggest_organisations(contacts)
+        context = {
+            **self.admin_site.each_context(request),
+            "title": _("Link to matching organisations"),
+            "opts": self.model._meta,
+            "rows": [(contact, suggestions[contact.pk]) for contact in contacts],
+            "selected": request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            "select_across": request.POST.get("select_across", "0"),
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, "admin/link_organisations.html", context)
 
     @admin.display(description=_("groups"))
     def admin_groups(self, contact: Contact):
@@ -226,7 +298,7 @@ class ContactAdmin(UserAdmin):
     @admin.display(description=_("organisation"), ordering="organisation_sort")
     def admin_organisation(self, contact: Contact):
         if contact.organisation_id and contact.requested_organisation:
-            if contact.organisation.name == contact.requested_organisation:
+            if normalize_name(contact.organisation.name) == normalize_name(contact.requested_organisation):
                 return contact.organisation
             else:
                 return format_html("⚠️ {org}", org=contact.organisation)
@@ -315,6 +387,15 @@ class OrganisationAdmin(admin.ModelAdmin):
     search_fields = ("name",)
     ordering = ("name",)
 
+    def get_urls(self):
+        return [
+            path(
+                "duplicates/",
+                self.admin_site.admin_view(DuplicateOrganisationsView.as_view()),
+                name="contacts_organisation_duplicates",
+            )
+        ] + super().get_urls()
+
     @admin.display(description=_("website"))
     def admin_website(self, organisation: Organisation):
         return format_html('<a href="{url}" target="_blank">{url}</a>', url=organisation.website)
@@ -328,3 +409,35 @@ class OrganisationAdmin(admin.ModelAdmin):
             return queryset.filter(id=request.user.organisation_id)
 
         return queryset.none()
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(ReadOnlyMixin, admin.ModelAdmin):
+    list_display = ("created", "subject", "admin_to", "status", "attempts", "next_attempt", "sent")
+    list_filter = ("status",)
+    search_fields = ("subject", "to")
+    date_hierarchy = "created"
+    actions = ("retry",)
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    # noinspection PyMethodMayBeStatic
+    def has_retry_permission(self, request):
+        return request.user.is_superuser
+
+    @admin.display(description=_("to"))
+    def admin_to(self, email: OutgoingEmail):
+        return ", ".join(email.to)
+
+    @admin.action(description=_("Retry sending now"), permissions=["retry"])
+    def retry(self, request: HttpRequest, queryset: OutgoingEmail.objects):
+        count = queryset.exclude(status=OutgoingEmailStatus.SENT).update(
+            status=OutgoingEmailStatus.QUEUED,
+            attempts=0,
+            next_attempt=timezone.now(),
+        )
+        self.message_user(request, f"Queued {count} emails again")
@@ -1,6 +1,10 @@
-from rest_framework.serializers import HyperlinkedModelSerializer
+from django.contrib.auth.models import Group
+from rest_framework.serializers import HyperlinkedModelSerializer, SerializerMethodField
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from aid_coordinator.caching import AnonymousCacheMixin
+from aid_coordinator.replica import ReplicaReadMixin
+from contacts.logos import get_logo_variant_urls
 from contacts.models import Contact, Organisation
 
 
@@ -12,21 +16,28 @@ class ContactSerializer(HyperlinkedModelSerializer):
 
 
 class OrganisationSerializer(HyperlinkedModelSerializer):
+    logo_variants = SerializerMethodField()
+
     class Meta:
         model = Organisation
-        fields = ["name", "logo", "website"]
+        fields = ["name", "logo", "logo_variants", "website"]
+
+    def get_logo_variants(self, organisation: Organisation):
+        return get_logo_variant_urls(organisation, self.context.get("request"))
 
 
 # ViewSets define the view behavior.
-class DonorOrganisationViewSet(ReadOnlyModelViewSet):
+class DonorOrganisationViewSet(AnonymousCacheMixin, ReplicaReadMixin, ReadOnlyModelViewSet):
     queryset = Organisation.objects.filter(listed=True, contacts__groups__name__icontains="donor").distinct()
+    cache_models = (Organisation, Contact, Contact.groups.through, Group)
     serializer_class = OrganisationSerializer
     filterset_fields = ["name"]
     search_fields = ["name"]
 
 
-class PersonalDonorViewSet(ReadOnlyModelViewSet):
+class PersonalDonorViewSet(AnonymousCacheMixin, ReplicaReadMixin, ReadOnlyModelViewSet):
     queryset = Contact.objects.filter(listed=True, groups__name__icontains="donor")
+    cache_models = (Contact, Contact.groups.through, Group)
     serializer_class = ContactSerializer
     filterset_fields = ["first_name", "last_name"]
     search_fields = ["fist_name", "last_name"]
@@ -1,11 +1,11 @@
 from django import forms
 from django.contrib.auth.forms import UserChangeForm
 from django.contrib.auth.models import Group
-from django.core.mail import mail_admins
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 from django_registration.forms import RegistrationForm, RegistrationFormCaseInsensitive
 
-from contacts.models import Contact
+from contacts.models import Contact, OutgoingEmail
 
 email_text = """Hello {{ contact.first_name }},
 
@@ -100,6 +100,7 @@ class ContactRegistrationForm(RegistrationFormCaseInsensitive):
             "password2",
         ]
 
+    @transaction.atomic
     def save(self, commit=True):
         account_type = self.cleaned_data.get("account_type")
         if account_type == "donor":
@@ -117,7 +118,7 @@ class ContactRegistrationForm(RegistrationFormCaseInsensitive):
             user.groups.add(group)
 
         # Notify admins
-        mail_admins(
+        OutgoingEmail.objects.mail_admins(
             subject=f"New {account_type} user self-registered: {user.username}",
             message=f"Self-registration details\n"
             f"=========================\n"
@@ -130,7 +131,6 @@ class ContactRegistrationForm(RegistrationFormCaseInsensitive):
             f"Account type:  {account_type}\n"
             f"Description:\n"
             f"{self.cleaned_data.get('description')}",
-            fail_silently=True,
         )
 
         return user
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image, UnidentifiedImageError
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from aid_coordinator.caching import bump_versions
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_PATH = "logos/variants"
+
+
+def get_logo_hash(logo) -> str:
+    digest = hashlib.sha256()
+    logo.open("rb")
+    try:
+        for chunk in logo.chunks():
+            digest.update(chunk)
+    finally:
+        logo.close()
+    return digest.hexdigest()
+
+
+def get_variant_name(logo_hash: str, max_size: int, image_format: str) -> str:
+    # The size is part of the name, so changing LOGO_SIZES doesn't reuse variants of the old size
+    return f"{VARIANTS_PATH}/{logo_hash[:2]}/{logo_hash}/{max_size}.{image_format}"
+
+
+def generate_logo_variants(logo, logo_hash: str) -> dict:
+    """
+    Resize the logo to each of the LOGO_SIZES in each of the LOGO_FORMATS. Variants are stored by the hash of the
+    original, so they are only generated once for the same image. Returns the width, height and file of each size.
+    """
+    logo.open("rb")
+    try:
+        with Image.open(logo) as image:
+            image.load()
+    finally:
+        logo.close()
+
+    image = image.convert("RGBA")
+    variants = {}
+    for size, max_size in settings.LOGO_SIZES.items():
+        resized = image.copy()
+        # Never makes images bigger
+        resized.thumbnail((max_size, max_size), Image.LANCZOS)
+
+        variant = {"width": resized.width, "height": resized.height}
+        for image_format in settings.LOGO_FORMATS:
+            name = get_variant_name(logo_hash, max_size, image_format)
+            if not default_storage.exists(name):
+                content = BytesIO()
+                resized.save(content, format=image_format.upper(), optimize=True)
+                default_storage.save(name, ContentFile(content.getvalue()))
+            variant[image_format] = name
+
+        variants[size] = variant
+
+    return variants
+
+
+def update_logo_variants(organisation, force: bool = False) -> bool:
+    """
+    Update the variants of the logo of the organisation if the image has changed. Returns whether it has.
+    """
+    if not organisation.logo:
+        logo_hash, variants = "", {}
+    else:
+        logo_hash = get_logo_hash(organisation.logo)
+        if logo_hash == organisation.logo_hash and not force:
+            return False
+
+        try:
+            variants = generate_logo_variants(organisation.logo, logo_hash)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+            logger.warning("Can't resize the logo of %s: %s", organisation, e)
+            variants = {}
+
+    if logo_hash == organisation.logo_hash and variants == organisation.logo_variants:
+        return False
+
+    organisation.logo_hash = logo_hash
+    organisation.logo_variants = variants
+    type(organisation).objects.filter(pk=organisation.pk).update(logo_hash=logo_hash, logo_variants=variants)
+    # Saving the organisation expired the cached API responses before the variants were there
+    bump_versions(type(organisation))
+    return True
+
+
+def get_logo_variant_urls(organisation, request=None) -> Optional[dict]:
+    if not organisation.logo_variants:
+        return None
+
+    def get_url(name: str) -> str:
+        url = default_storage.url(name)
+        return request.build_absolute_uri(url) if request else url
+
+    return {
+        size: {
+            key: get_url(value) if key in settings.LOGO_FORMATS else value
+            for key, value in variant.items()
+        }
+        for size, variant in organisation.logo_variants.items()
+    }
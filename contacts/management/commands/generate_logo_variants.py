@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand, CommandParser
+from django.utils.translation import gettext as _
+
+from contacts.logos import update_logo_variants
+from contacts.models import Organisation
+
+
+class Command(BaseCommand):
+    help = _("Generate the resized variants of all organisation logos")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--force", action="store_true", help=_("also regenerate logos that haven't changed"))
+
+    def handle(self, *args, **options):
+        updated = 0
+        organisations = Organisation.objects.exclude(logo="").exclude(logo__isnull=True).order_by("pk")
+        for organisation in organisations.iterator():
+            if update_logo_variants(organisation, force=options["force"]):
+                updated += 1
+                self.stdout.write(f"Updated {organisation}")
+
+        self.stdout.write(self.style.SUCCESS(f"Updated the logo variants of {updated} organisations"))
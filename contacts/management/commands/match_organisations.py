@@ -0,0 +1,48 @@
+import time
+
+from django.core.management import BaseCommand, CommandParser
+from django.utils.translation import gettext as _
+
+from aid_coordinator.replica import read_from_replica
+from contacts.matching import DEFAULT_THRESHOLD, OrganisationIndex, get_pending_contacts, suggest_organisations
+
+
+class Command(BaseCommand):
+    help = _("Suggest organisations for contacts that requested one, and list organisations with similar names")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help=_("minimum similarity"))
+        parser.add_argument("--duplicates", action="store_true", help=_("list organisations with similar names"))
+
+    def handle(self, *args, **options):
+        with read_from_replica():
+            self.match_organisations(options)
+
+    def match_organisations(self, options: dict):
+        start = time.perf_counter()
+        index = OrganisationIndex.build()
+        self.stdout.write(f"Indexed {len(index.names)} organisations in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        if options["duplicates"]:
+            start = time.perf_counter()
+            clusters = index.find_duplicates(options["threshold"])
+            for cluster in clusters:
+                self.stdout.write(" | ".join(f"{index.names[pk]} [{pk}]" for pk in cluster))
+            self.stdout.write(
+                f"{len(clusters)} groups of similar organisations, found in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+            return
+
+        start = time.perf_counter()
+        contacts = get_pending_contacts()
+        suggestions = suggest_organisations(contacts, index, threshold=options["threshold"])
+        for contact in contacts:
+            matches = ", ".join(
+                f"{match.name} [{match.organisation_id}] {match.score:.0%}" for match in suggestions[contact.pk]
+            )
+            self.stdout.write(f"{contact.username}: {contact.requested_organisation} → {matches or '-'}")
+        self.stdout.write(
+            f"{len(contacts)} contacts without their requested organisation, matched in "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms"
+        )
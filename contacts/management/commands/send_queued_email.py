@@ -0,0 +1,30 @@
+import time
+
+from django.core.management import BaseCommand, CommandParser
+from django.utils.translation import gettext as _
+
+from contacts.outbox import send_queued_email
+
+
+class Command(BaseCommand):
+    help = _("Send the emails waiting in the outbox")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--batch-size", type=int, default=100, help=_("emails to send per connection"))
+        parser.add_argument("--max-attempts", type=int, help=_("give up on an email after this many attempts"))
+        parser.add_argument("--backend", help=_("email backend to use instead of EMAIL_BACKEND"))
+        parser.add_argument("--loop", action="store_true", help=_("keep running and check for new emails"))
+        parser.add_argument("--sleep", type=float, default=10, help=_("seconds to wait when the outbox is empty"))
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_email(options["batch_size"], options["max_attempts"], options["backend"])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed")
+
+            if not options["loop"]:
+                break
+
+            # Keep going while there is a full batch, otherwise wait for new emails
+            if sent + failed < options["batch_size"]:
+                time.sleep(options["sleep"])
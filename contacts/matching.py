@@ -0,0 +1,220 @@
+import math
+import re
+import unicodedata
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from aid_coordinator.caching import cached
+from contacts.models import Contact, Organisation
+
+# Minimum similarity (shared trigrams / all trigrams of both names) to call two names a match
+DEFAULT_THRESHOLD = 0.5
+
+# Finding duplicates compares all organisations, which takes seconds with tens of thousands of them
+DUPLICATES_CACHE_TIMEOUT = 24 * 60 * 60
+
+IGNORED_CHARACTERS = re.compile(r"[.'’`]")
+SEPARATORS = re.compile(r"[\W_]+")
+
+# Words that are left out when comparing names
+LEGAL_FORMS = set(
+    "ab ag as asbl bv co company corp corporation ev gmbh inc kft llc ltd limited nv oy plc sa sarl sas spa sro srl "
+    "tov vzw тов".split()
+)
+
+# Words too common in this line of work to tell organisations apart, unless there's nothing else in the name.
+# The kind of organisation is already in Organisation.type.
+GENERIC_WORDS = set(
+    "and association communications connect data digital exchange foundation group institute internet isp it ix "
+    "net network networks of online services solutions stichting systems technologies tech telecom "
+    "telecommunications the university".split()
+)
+
+
+@dataclass
+class OrganisationMatch:
+    organisation_id: int
+    name: str
+    score: float
+    # Similarity including the generic words, to choose between otherwise equal matches
+    tiebreaker: float = 0.0
+
+
+def normalize_name(name: str) -> str:
+    """
+    Lower case without accents, punctuation or legal forms, so "Stichting Foo B.V." and "stichting foo" are equal.
+    """
+    name = unicodedata.normalize("NFKD", name or "").casefold()
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = IGNORED_CHARACTERS.sub("", name)
+    words = [word for word in SEPARATORS.split(name) if word and word not in LEGAL_FORMS]
+    return " ".join(words)
+
+
+def get_trigrams(name: str) -> Set[str]:
+    """
+    The trigrams of a normalized name, like PostgreSQL's pg_trgm but without the generic words.
+    """
+    words = name.split()
+    name = " ".join(word for word in words if word not in GENERIC_WORDS) or name
+    if not name:
+        return set()
+
+    # Padded, so the start of a name counts more than the middle
+    padded = f"  {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class OrganisationIndex:
+    """
+    An inverted index from trigrams to organisations. A lookup only compares the name with the organisations that
+    share one of its rarest trigrams, instead of with all of them.
+    """
+
+    def __init__(self, organisations: Iterable[Tuple[int, str]]):
+        self.names: Dict[int, str] = {}
+        self.normalized_names: Dict[int, str] = {}
+        self.trigrams: Dict[int, Set[str]] = {}
+        self.postings: Dict[str, List[int]] = {}
+
+        for pk, name in organisations:
+            normalized_name = normalize_name(name)
+            trigrams = get_trigrams(normalized_name)
+            self.names[pk] = name
+            self.normalized_names[pk] = normalized_name
+            self.trigrams[pk] = trigrams
+            for trigram in trigrams:
+                self.postings.setdefault(trigram, []).append(pk)
+
+    @classmethod
+    def build(cls, queryset=None) -> "OrganisationIndex":
+        queryset = Organisation.objects.all() if queryset is None else queryset
+        return cls(queryset.order_by().values_list("pk", "name").iterator())
+
+    def search(
+        self,
+        name: str,
+        limit: Optional[int] = 3,
+        threshold: float = DEFAULT_THRESHOLD,
+    ) -> List[OrganisationMatch]:
+        normalized_name = normalize_name(name)
+        trigrams = get_trigrams(normalized_name)
+        if not trigrams:
+            return []
+
+        # A match has at least `required` of the trigrams, so it always has one of the len - required + 1 rarest
+        # ones. Only looking those up finds every match, while skipping the long lists of common trigrams.
+        required = math.ceil(threshold * len(trigrams))
+        prefix = sorted(trigrams, key=lambda trigram: len(self.postings.get(trigram, ())))
+        candidates = set()
+        for trigram in prefix[: len(trigrams) - required + 1]:
+            candidates.update(self.postings.get(trigram, ()))
+
+        matches = []
+        for pk in candidates:
+            other = self.trigrams[pk]
+            # Much longer or shorter names can't be similar enough
+            if not threshold * len(trigrams) <= len(other) <= len(trigrams) / threshold:
+                continue
+
+            common = len(trigrams & other)
+            score = common / (len(trigrams) + len(other) - common)
+            if score >= threshold:
+                matches.append(OrganisationMatch(organisation_id=pk, name=self.names[pk], score=score))
+
+        for match in matches:
+            other_name = self.normalized_names[match.organisation_id]
+            match.tiebreaker = SequenceMatcher(None, normalized_name, other_name).ratio()
+        matches.sort(key=lambda match: (-match.score, -match.tiebreaker, match.name))
+        return matches[:limit] if limit else matches
+
+    def find_duplicates(self, threshold: float = DEFAULT_THRESHOLD) -> List[List[int]]:
+        """
+        Groups of organisations with similar names, each sorted by ID, largest groups first.
+        """
+        parents: Dict[int, int] = {}
+
+        def find(pk: int) -> int:
+            root = pk
+            while parents.get(root, root) != root:
+                root = parents[root]
+            while pk != root:
+                parents[pk], pk = root, parents[pk]
+            return root
+
+        # Compare every name with the names before it through a second index that only holds their rarest
+        # trigrams. Two names that match always share one of those, when they're sorted the same way.
+        def rarity(trigram: str):
+            return len(self.postings[trigram]), trigram
+
+        prefixes: Dict[str, List[int]] = {}
+        for pk, trigrams in sorted(self.trigrams.items(), key=lambda item: len(item[1])):
+            if not trigrams:
+                continue
+
+            prefix = sorted(trigrams, key=rarity)[: len(trigrams) - math.ceil(threshold * len(trigrams)) + 1]
+            candidates = {other for trigram in prefix for other in prefixes.get(trigram, ())}
+
+            for other in candidates:
+                other_trigrams = self.trigrams[other]
+                # Names are handled shortest first, and much shorter names can't be similar enough
+                if len(other_trigrams) < threshold * len(trigrams):
+                    continue
+
+                common = len(trigrams & other_trigrams)
+                if common / (len(trigrams) + len(other_trigrams) - common) >= threshold:
+                    parents[find(other)] = find(pk)
+
+            for trigram in prefix:
+                prefixes.setdefault(trigram, []).append(pk)
+
+        groups: Dict[int, List[int]] = {}
+        for pk in set(parents) | set(parents.values()):
+            groups.setdefault(find(pk), []).append(pk)
+
+        clusters = [sorted(members) for members in groups.values()]
+        clusters.sort(key=lambda members: (-len(members), members[0]))
+        return clusters
+
+
+def find_duplicate_organisations(threshold: float = DEFAULT_THRESHOLD) -> List[List[int]]:
+    """
+    The groups of organisations with similar names, cached until an organisation changes.
+    """
+    return cached(
+        "duplicate-organisations",
+        f"{threshold:g}",
+        lambda: OrganisationIndex.build().find_duplicates(threshold),
+        [Organisation],
+        DUPLICATES_CACHE_TIMEOUT,
+    )
+
+
+def get_pending_contacts(queryset=None):
+    """
+    Contacts that requested an organisation they haven't been linked to.
+    """
+    queryset = Contact.objects.all() if queryset is None else queryset
+    return [
+        contact
+        for contact in queryset.exclude(requested_organisation="").select_related("organisation")
+        if not contact.organisation_id
+        or normalize_name(contact.organisation.name) != normalize_name(contact.requested_organisation)
+    ]
+
+
+def suggest_organisations(
+    contacts: List[Contact],
+    index: Optional[OrganisationIndex] = None,
+    limit: int = 3,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> Dict[int, List[OrganisationMatch]]:
+    """
+    The organisations that best match the requested organisation of each contact, by contact ID.
+    """
+    index = index or OrganisationIndex.build()
+    return {
+        contact.pk: index.search(contact.requested_organisation, limit=limit, threshold=threshold)
+        for contact in contacts
+    }
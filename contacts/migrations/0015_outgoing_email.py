@@ -0,0 +1,39 @@
+# Generated by Django 4.0.10 on 2026-10-18 22:59
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0014_alter_contact_allow_publicity_alter_contact_listed_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('from_email', models.CharField(max_length=254, verbose_name='from')),
+                ('to', models.JSONField(default=list, verbose_name='to')),
+                ('subject', models.CharField(max_length=255, verbose_name='subject')),
+                ('body', models.TextField(verbose_name='body')),
+                ('status', models.PositiveSmallIntegerField(choices=[(0, 'Queued'), (10, 'Sent'), (20, 'Failed')], default=0, verbose_name='status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='attempts')),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now, verbose_name='next attempt')),
+                ('sent', models.DateTimeField(blank=True, null=True, verbose_name='sent')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+            ],
+            options={
+                'verbose_name': 'outgoing email',
+                'verbose_name_plural': 'outgoing emails',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outgoingemail',
+            index=models.Index(fields=['status', 'next_attempt'], name='contacts_ou_status_e7e12c_idx'),
+        ),
+    ]
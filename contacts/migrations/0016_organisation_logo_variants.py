@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-18 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0015_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organisation',
+            name='logo_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='logo hash'),
+        ),
+        migrations.AddField(
+            model_name='organisation',
+            name='logo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='logo variants'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.10 on 2026-10-18 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0017_language_usage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='organisation',
+            index=models.Index(fields=['name'], name='contacts_or_name_9941e0_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.0.10 on 2026-10-18 23:45
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0018_organisation_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('when', models.DateTimeField(default=django.utils.timezone.now, verbose_name='when')),
+                ('duration', models.FloatField(verbose_name='duration (ms)')),
+                ('database', models.CharField(max_length=50, verbose_name='database')),
+                ('path', models.CharField(blank=True, max_length=255, verbose_name='path')),
+                ('call_site', models.CharField(max_length=255, verbose_name='call site')),
+                ('fingerprint', models.TextField(verbose_name='query')),
+                ('plan', models.TextField(blank=True, verbose_name='query plan')),
+            ],
+            options={
+                'verbose_name': 'slow query',
+                'verbose_name_plural': 'slow queries',
+                'ordering': ('-when',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='slowquery',
+            index=models.Index(fields=['when'], name='contacts_sl_when_a0f9db_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    LanguageUsage moved to aid_coordinator, which takes over the table with its data.
+    """
+
+    dependencies = [
+        ("contacts", "0019_slow_query"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.AlterModelTable(name="LanguageUsage", table="aid_coordinator_languageusage"),
+            ],
+            state_operations=[
+                migrations.DeleteModel(name="LanguageUsage"),
+            ],
+        ),
+    ]
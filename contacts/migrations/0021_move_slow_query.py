@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    SlowQuery moved to aid_coordinator, which takes over the table with its data and adds the index again.
+    """
+
+    dependencies = [
+        ("contacts", "0020_move_language_usage"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RemoveIndex(model_name="slowquery", name="contacts_sl_when_a0f9db_idx"),
+                migrations.AlterModelTable(name="SlowQuery", table="aid_coordinator_slowquery"),
+            ],
+            state_operations=[
+                migrations.DeleteModel(name="SlowQuery"),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-19 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0021_move_slow_query'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='html_body',
+            field=models.TextField(blank=True, verbose_name='HTML body'),
+        ),
+    ]
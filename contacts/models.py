@@ -1,10 +1,17 @@
 import warnings
 from functools import cached_property
+from typing import List, Optional
 
-from django.contrib.auth.models import AbstractUser, UserManager
-from django.db import models
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser, Group, UserManager
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from aid_coordinator.caching import track_models
+from contacts.logos import update_logo_variants
+
 
 class OrgType(models.IntegerChoices):
     OTHER = 0, _("Other")
@@ -40,15 +47,31 @@ class Organisation(models.Model):
     )
     website = models.URLField(verbose_name=_("website"), blank=True)
     logo = models.ImageField(verbose_name=_("logo"), blank=True)
+    logo_hash = models.CharField(verbose_name=_("logo hash"), max_length=64, blank=True, editable=False)
+    logo_variants = models.JSONField(verbose_name=_("logo variants"), default=dict, blank=True, editable=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        logo = self.__dict__.get("logo")
+        self.original_logo = getattr(logo, "name", logo)
 
     class Meta:
         ordering = ("name",)
         verbose_name = _("organisation")
         verbose_name_plural = _("organisations")
+        # For the default ordering, which the admin filters use too
+        indexes = [models.Index(fields=["name"])]
 
     def __str__(self):
         return self.name
 
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        super().save(force_insert, force_update, using, update_fields)
+
+        if self.logo.name != self.original_logo:
+            update_logo_variants(self)
+            self.original_logo = self.logo.name
+
 
 class ContactManager(UserManager):
     def get_queryset(self):
@@ -119,3 +142,107 @@ class Contact(AbstractUser):
     @property
     def is_viewer(self):
         return "viewers" in self.group_names
+
+    def email_user(self, subject, message, from_email=None, html_message=None):
+        # Queued instead of sent, so a slow mail server doesn't hold up the request. The other options of send_mail()
+        # are about the connection, which is the send_queued_email command's.
+        OutgoingEmail.objects.queue(
+            subject=subject,
+            body=message,
+            to=[self.email],
+            from_email=from_email,
+            html_body=html_message or "",
+        )
+
+
+class OutgoingEmailStatus(models.IntegerChoices):
+    QUEUED = 0, _("Queued")
+    SENT = 10, _("Sent")
+    FAILED = 20, _("Failed")
+
+
+class OutgoingEmailManager(models.Manager):
+    def queue(
+        self,
+        subject: str,
+        body: str,
+        to: List[str],
+        from_email: Optional[str] = None,
+        html_body: str = "",
+    ) -> "OutgoingEmail":
+        return self.create(
+            subject=subject,
+            body=body,
+            html_body=html_body,
+            to=to,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        )
+
+    def queue_many(self, emails: List["OutgoingEmail"]) -> List["OutgoingEmail"]:
+        for email in emails:
+            email.from_email = email.from_email or settings.DEFAULT_FROM_EMAIL
+        return self.bulk_create(emails)
+
+    def mail_admins(self, subject: str, message: str) -> Optional["OutgoingEmail"]:
+        if not settings.ADMINS:
+            return None
+
+        return self.queue(
+            subject=f"{settings.EMAIL_SUBJECT_PREFIX}{subject}",
+            body=message,
+            to=[email for name, email in settings.ADMINS],
+            from_email=settings.SERVER_EMAIL,
+        )
+
+
+class OutgoingEmail(models.Model):
+    """
+    An email waiting to be sent by the send_queued_email command. Written in the same transaction as the change
+    that caused it, so nothing is sent for changes that are rolled back.
+    """
+
+    created = models.DateTimeField(verbose_name=_("created"), auto_now_add=True)
+    from_email = models.CharField(verbose_name=_("from"), max_length=254)
+    to = models.JSONField(verbose_name=_("to"), default=list)
+    subject = models.CharField(verbose_name=_("subject"), max_length=255)
+    body = models.TextField(verbose_name=_("body"))
+    html_body = models.TextField(verbose_name=_("HTML body"), blank=True)
+
+    status = models.PositiveSmallIntegerField(
+        verbose_name=_("status"),
+        choices=OutgoingEmailStatus.choices,
+        default=OutgoingEmailStatus.QUEUED,
+    )
+    attempts = models.PositiveIntegerField(verbose_name=_("attempts"), default=0)
+    next_attempt = models.DateTimeField(verbose_name=_("next attempt"), default=timezone.now)
+    sent = models.DateTimeField(verbose_name=_("sent"), blank=True, null=True)
+    last_error = models.TextField(verbose_name=_("last error"), blank=True)
+
+    objects = OutgoingEmailManager()
+
+    class Meta:
+        ordering = ("-created",)
+        verbose_name = _("outgoing email")
+        verbose_name_plural = _("outgoing emails")
+        indexes = [
+            models.Index(fields=["status", "next_attempt"]),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.to)}"
+
+    def get_message(self, connection=None) -> EmailMessage:
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to,
+            connection=connection,
+        )
+        if self.html_body:
+            message.attach_alternative(self.html_body, "text/html")
+        return message
+
+
+# The cached duplicates and API responses depend on these
+track_models(Organisation, Contact, Contact.groups.through, Group)
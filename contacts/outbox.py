@@ -0,0 +1,80 @@
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from contacts.models import OutgoingEmail, OutgoingEmailStatus
+
+# How long a worker may take to send a batch before another worker is allowed to pick the same emails up
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def claim_batch(batch_size: int) -> List[OutgoingEmail]:
+    """
+    Take the emails that are due, and move their next attempt forward so other workers leave them alone.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmailStatus.QUEUED, next_attempt__lte=now)
+            .order_by("next_attempt", "pk")[:batch_size]
+        )
+        OutgoingEmail.objects.filter(pk__in=[email.pk for email in batch]).update(next_attempt=now + CLAIM_TIMEOUT)
+    return batch
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def send_queued_email(
+    batch_size: int = 100,
+    max_attempts: Optional[int] = None,
+    backend: Optional[str] = None,
+) -> Tuple[int, int]:
+    """
+    Send one batch of queued emails over a single connection. Failed emails are retried later with exponential
+    backoff, until they have been tried max_attempts times. Returns the number of sent and failed emails.
+    """
+    max_attempts = max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection(backend)
+    try:
+        connection.open()
+    except Exception as e:
+        errors = {email.pk: e for email in batch}
+    else:
+        errors = {}
+        for email in batch:
+            try:
+                email.get_message(connection).send()
+            except Exception as e:
+                errors[email.pk] = e
+        connection.close()
+
+    now = timezone.now()
+    for email in batch:
+        email.attempts += 1
+        if email.pk in errors:
+            failed += 1
+            email.last_error = f"{type(errors[email.pk]).__name__}: {errors[email.pk]}"
+            if email.attempts >= max_attempts:
+                email.status = OutgoingEmailStatus.FAILED
+            else:
+                email.next_attempt = now + get_retry_delay(email.attempts)
+        else:
+            sent += 1
+            email.status = OutgoingEmailStatus.SENT
+            email.sent = now
+            email.last_error = ""
+
+    OutgoingEmail.objects.bulk_update(batch, ["attempts", "status", "next_attempt", "sent", "last_error"])
+    return sent, failed
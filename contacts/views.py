@@ -1,14 +1,47 @@
+from typing import Iterable, Iterator, List
+
 from django.contrib import messages
-from django.http import HttpResponseRedirect
-from django.template import Template
+from django.db import transaction
+from django.db.models import Count
+from django.http import Http404, HttpRequest, HttpResponseRedirect
+from django.utils.crypto import get_random_string
 from django.utils.decorators import method_decorator
 from django.utils.translation import ngettext
 from jinja2 import Template
 
 from aid_coordinator.decorators import superuser_required
-from aid_coordinator.views import AdminFormView
+from aid_coordinator.views import AdminFormView, AdminTemplateView
 from contacts.forms import EmailForm
-from contacts.models import Contact
+from contacts.matching import DEFAULT_THRESHOLD, find_duplicate_organisations
+from contacts.models import Contact, Organisation, OutgoingEmail
+
+# Selected contacts are kept in the session, a list of thousands of IDs doesn't fit in a URL
+SELECTION_SESSION_KEY = "email-selections"
+MAX_SELECTIONS = 5
+
+# Contacts rendered and queued per query
+CHUNK_SIZE = 500
+
+
+def store_email_selection(request: HttpRequest, contact_ids: Iterable[int]) -> str:
+    """
+    Remember the selected contacts for the email form, and return the key to find them again.
+    """
+    key = get_random_string(16)
+    selections = request.session.get(SELECTION_SESSION_KEY, {})
+
+    # Keep a few, so sending from more than one tab at a time works
+    selections = dict(list(selections.items())[-(MAX_SELECTIONS - 1) :])
+    selections[key] = list(contact_ids)
+
+    request.session[SELECTION_SESSION_KEY] = selections
+    return key
+
+
+def get_contact_chunks(contact_ids: List[int]) -> Iterator[List[Contact]]:
+    # Contact.objects prefetches groups and organisation, which iterator() would skip
+    for start in range(0, len(contact_ids), CHUNK_SIZE):
+        yield list(Contact.objects.filter(pk__in=contact_ids[start : start + CHUNK_SIZE]).order_by("pk"))
 
 
 @method_decorator(superuser_required(), name="dispatch")
@@ -17,27 +50,73 @@ class EmailView(AdminFormView):
     form_class = EmailForm
     admin_model = Contact
 
+    def get_selection(self) -> List[int]:
+        selections = self.request.session.get(SELECTION_SESSION_KEY, {})
+        try:
+            return selections[self.request.GET.get("selection", "")]
+        except KeyError:
+            raise Http404("Selection has expired, please select the contacts again")
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault("recipient_count", len(self.get_selection()))
+        return super().get_context_data(**kwargs)
+
     def form_valid(self, form: EmailForm):
+        contact_ids = self.get_selection()
+        template = Template(form.cleaned_data["content"])
+
         count = 0
-        for contact in Contact.objects.filter(pk__in=self.request.GET["contacts"].split(",")):
-            context = {"contact": contact}
-            text = Template(form.cleaned_data["content"]).render(context)
-            contact.email_user(
-                from_email=form.cleaned_data["sender"],
-                subject=form.cleaned_data["subject"],
-                message=text,
-            )
-            count += 1
+        with transaction.atomic():
+            for contacts in get_contact_chunks(contact_ids):
+                emails = [
+                    OutgoingEmail(
+                        from_email=form.cleaned_data["sender"],
+                        subject=form.cleaned_data["subject"],
+                        body=template.render({"contact": contact}),
+                        to=[contact.email],
+                    )
+                    for contact in contacts
+                ]
+                OutgoingEmail.objects.queue_many(emails)
+                count += len(emails)
+
+        selections = self.request.session[SELECTION_SESSION_KEY]
+        del selections[self.request.GET["selection"]]
+        self.request.session.modified = True
 
         messages.add_message(
             request=self.request,
             level=messages.INFO,
             message=ngettext(
-                "%(count)s message has been sent",
-                "%(count)s messages have been sent",
+                "%(count)s message has been queued",
+                "%(count)s messages have been queued",
                 count,
             )
             % {"count": count},
         )
 
         return HttpResponseRedirect("..")
+
+
+@method_decorator(superuser_required(), name="dispatch")
+class DuplicateOrganisationsView(AdminTemplateView):
+    template_name = "admin/duplicate_organisations.html"
+    admin_model = Organisation
+
+    def get_threshold(self) -> float:
+        try:
+            # Rounded, so there are only a few versions to cache
+            return round(min(max(float(self.request.GET.get("threshold", DEFAULT_THRESHOLD)), 0.1), 1.0), 2)
+        except ValueError:
+            return DEFAULT_THRESHOLD
+
+    def get_context_data(self, **kwargs):
+        threshold = self.get_threshold()
+        clusters = find_duplicate_organisations(threshold)
+
+        organisations = Organisation.objects.annotate(contact_count=Count("contacts")).in_bulk(
+            [pk for cluster in clusters for pk in cluster]
+        )
+        kwargs.setdefault("threshold", threshold)
+        kwargs.setdefault("clusters", [[organisations[pk] for pk in cluster] for cluster in clusters])
+        return super().get_context_data(**kwargs)
@@ -1,19 +1,41 @@
 from admin_wizard.admin import UpdateAction
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
 from django.http import HttpRequest
+from django.template.response import TemplateResponse
 from django.templatetags.static import static
+from django.db import transaction
+from django.db.models import Sum
+from django.urls import path, reverse
+from django.utils.functional import lazy
 from django.utils.html import format_html
-from django.utils.safestring import mark_safe
+from django.utils.safestring import SafeString, mark_safe
 from django.utils.translation import gettext_lazy as _
 from import_export.admin import ExportActionModelAdmin, ImportExportActionModelAdmin
 
+from aid_coordinator.caching import bump_versions
+from aid_coordinator.export import StreamingExportAdminMixin
+from aid_coordinator.filters import (
+    CachedAllValuesFieldListFilter,
+    CachedRelatedFieldListFilter,
+    CachedRelatedOnlyFieldListFilter,
+)
+from logistics.consolidation import apply_consolidation, plan_consolidation
 from logistics.filters import UsedChoicesFieldListFilter
 from logistics.forms import AssignToShipmentForm
-from logistics.models import Claim, EquipmentData, Location, Shipment
-from logistics.resources import ClaimExportResource, EquipmentDataResource
+from logistics.manifest import attach_manifest_totals
+from logistics.models import Claim, EquipmentData, Location, Shipment, ShipmentEvent, StockBalance, StockMovement
+from logistics.resources import ClaimExportResource, EquipmentDataResource, ShipmentEventResource
+from logistics.views import ShipmentManifestView
+from supply_demand.admin.base import ReadOnlyMixin
 
-static_import_icon = static("img/import.png")
-static_export_icon = static("img/export.png")
+
+def icon_header(alt: str, path: str) -> str:
+    return format_html('<img alt="{alt}" style="height: 1.5em; margin: -0.4em" src="{src}">', alt=alt, src=static(path))
+
+
+# Lazy, the names of the static files are only known after collectstatic, which loads the admin too
+icon_header_lazy = lazy(icon_header, SafeString)
 
 
 @admin.register(EquipmentData)
@@ -22,6 +44,15 @@ class EquipmentDataAdmin(ImportExportActionModelAdmin):
     ordering = ("brand", "model")
     resource_class = EquipmentDataResource
 
+    def delete_queryset(self, request: HttpRequest, queryset: EquipmentData.objects):
+        # Like EquipmentData.delete(), there might be other records for the same equipment
+        with transaction.atomic():
+            normalized_keys = set(queryset.values_list("normalized_key", flat=True))
+            super().delete_queryset(request, queryset)
+            EquipmentData.link_items(normalized_keys)
+
+        bump_versions(EquipmentData)
+
     @admin.display(description=_("weight"), ordering="weight")
     def admin_weight(self, item: EquipmentData):
         if item.weight:
@@ -47,6 +78,7 @@ class LocationAdmin(admin.ModelAdmin):
         "admin_is_collection_point",
         "admin_is_distribution_point",
         "managed_by",
+        "admin_stock",
     )
     list_filter = (
         ("country", UsedChoicesFieldListFilter),
@@ -55,6 +87,23 @@ class LocationAdmin(admin.ModelAdmin):
     )
     ordering = ("name",)
 
+    def get_queryset(self, request: HttpRequest):
+        qs = super().get_queryset(request)
+        qs = qs.annotate(stock_amount=Sum("stock__amount"))
+        return qs
+
+    @admin.display(description=_("stock"), ordering="stock_amount")
+    def admin_stock(self, location: Location):
+        if not location.stock_amount:
+            return "-"
+
+        return format_html(
+            '<a href="{url}?location__id__exact={id}">{amount}</a>',
+            url=reverse("admin:logistics_stockbalance_changelist"),
+            id=location.pk,
+            amount=location.stock_amount,
+        )
+
     @admin.display(description=_("contact email"), ordering="email")
     def admin_email(self, location: Location):
         if not location.email:
@@ -72,9 +121,7 @@ class LocationAdmin(admin.ModelAdmin):
     @admin.display(
         boolean=True,
         ordering="is_collection_point",
-        description=mark_safe(
-            '<img alt="Is collection point" style="height: 1.5em; margin: -0.4em" src="' + static_import_icon + '">'
-        ),
+        description=icon_header_lazy("Is collection point", "img/import.png"),
     )
     def admin_is_collection_point(self, location: Location):
         return location.is_collection_point
@@ -82,18 +129,39 @@ class LocationAdmin(admin.ModelAdmin):
     @admin.display(
         boolean=True,
         ordering="is_distribution_point",
-        description=mark_safe(
-            '<img alt="Is distribution point" style="height: 1.5em; margin: -0.4em" src="' + static_export_icon + '">'
-        ),
+        description=icon_header_lazy("Is distribution point", "img/export.png"),
     )
     def admin_is_distribution_point(self, location: Location):
         return location.is_distribution_point
 
 
+class AssignToShipmentAction(UpdateAction):
+    def form_valid(self, form):
+        self.queryset.assign_to_shipment(form.cleaned_data["shipment"])
+        return None
+
+
+class ShipmentEventInline(admin.TabularInline):
+    model = ShipmentEvent
+    fields = ("when", "type", "location", "source", "notes")
+    ordering = ("when", "id")
+    extra = 1
+
+
 @admin.register(Shipment)
 class ShipmentAdmin(admin.ModelAdmin):
-    list_display = ("name", "when", "current_location", "is_delivered")
+    list_display = (
+        "name",
+        "when",
+        "current_location",
+        "is_delivered",
+        "admin_items",
+        "admin_weight",
+        "admin_volume",
+        "admin_manifest",
+    )
     list_filter = ("is_delivered",)
+    list_select_related = ("current_location",)
     date_hierarchy = "when"
     ordering = ("when",)
     search_fields = (
@@ -102,10 +170,68 @@ class ShipmentAdmin(admin.ModelAdmin):
         "current_location__city",
         "current_location__country",
     )
+    inlines = (ShipmentEventInline,)
+
+    def delete_queryset(self, request: HttpRequest, queryset: Shipment.objects):
+        # Like Shipment.delete(), the items of the claims in these shipments are back at their own location
+        with transaction.atomic():
+            claim_ids = list(Claim.objects.filter(shipment__in=queryset).values_list("pk", flat=True))
+            super().delete_queryset(request, queryset)
+            StockMovement.objects.sync_claims(claim_ids)
+
+        bump_versions(ShipmentEvent)
+
+    def get_readonly_fields(self, request: HttpRequest, obj=None):
+        fields = super().get_readonly_fields(request, obj)
+        if obj:
+            # These follow from the events
+            fields = tuple(fields) + ("current_location", "is_delivered")
+        return fields
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:shipment_id>/manifest/",
+                self.admin_site.admin_view(ShipmentManifestView.as_view(model_admin=self)),
+                name="logistics_shipment_manifest",
+            )
+        ] + super().get_urls()
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+
+        # Get the totals of the whole page at once
+        attach_manifest_totals(changelist.result_list)
+
+        return changelist
+
+    @admin.display(description=_("items"))
+    def admin_items(self, shipment: Shipment):
+        return shipment.manifest_totals["items"]
+
+    @admin.display(description=_("weight"))
+    def admin_weight(self, shipment: Shipment):
+        totals = shipment.manifest_totals
+        warning = "⚠️ " if totals["unknown_weight"] else ""
+        return f"{warning}{totals['weight']:.1f} kg"
+
+    @admin.display(description=_("volume"))
+    def admin_volume(self, shipment: Shipment):
+        totals = shipment.manifest_totals
+        warning = "⚠️ " if totals["unknown_size"] else ""
+        return f"{warning}{totals['volume']:.2f} m³"
+
+    @admin.display(description=_("manifest"))
+    def admin_manifest(self, shipment: Shipment):
+        return format_html(
+            '<a href="{url}">{text}</a>',
+            url=reverse("admin:logistics_shipment_manifest", args=(shipment.pk,)),
+            text=_("Manifest"),
+        )
 
 
 @admin.register(Claim)
-class ClaimAdmin(ExportActionModelAdmin):
+class ClaimAdmin(StreamingExportAdminMixin, ExportActionModelAdmin):
     list_display = (
         "amount",
         "admin_offered_item",
@@ -114,15 +240,15 @@ class ClaimAdmin(ExportActionModelAdmin):
         "shipment",
     )
     list_filter = (
-        "shipment",
+        ("shipment", CachedRelatedFieldListFilter),
         "shipment__is_delivered",
         (
             "offered_item__offer__contact__organisation",
-            admin.RelatedOnlyFieldListFilter,
+            CachedRelatedOnlyFieldListFilter,
         ),
         (
             "requested_item__request__contact__organisation",
-            admin.RelatedOnlyFieldListFilter,
+            CachedRelatedOnlyFieldListFilter,
         ),
     )
     search_fields = (
@@ -134,18 +260,67 @@ class ClaimAdmin(ExportActionModelAdmin):
         "requested_item__request__contact__organisation__name",
     )
     ordering = ("shipment",)
-    actions = (UpdateAction(form_class=AssignToShipmentForm, title=_("Assign to shipment")),)
+    actions = (
+        AssignToShipmentAction(form_class=AssignToShipmentForm, title=_("Assign to shipment")),
+        "consolidate_shipments",
+    )
     resource_class = ClaimExportResource
 
     def get_queryset(self, request: HttpRequest):
         qs = super().get_queryset(request)
-        qs = qs.prefetch_related(
+        qs = qs.select_related(
             "offered_item__offer__contact__organisation",
             "requested_item__request__contact__organisation",
             "shipment",
+            "current_location",
         )
         return qs
 
+    # noinspection PyMethodMayBeStatic
+    def has_consolidate_permission(self, request: HttpRequest):
+        return request.user.has_perms(["logistics.change_claim", "logistics.add_shipment"])
+
+    @admin.action(description=_("Consolidate into new shipments"), permissions=["consolidate"])
+    def consolidate_shipments(self, request: HttpRequest, queryset: Claim.objects):
+        plan = plan_consolidation(queryset)
+
+        if request.POST.get("post"):
+            shipments = apply_consolidation(plan)
+            self.message_user(request, _("Created {count} shipments").format(count=len(shipments)))
+            return None
+
+        if plan.oversized:
+            self.message_user(
+                request,
+                _("{count} claims don't fit in a single shipment and should be split").format(
+                    count=len(plan.oversized)
+                ),
+                level=messages.WARNING,
+            )
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": _("Consolidate into new shipments"),
+            "opts": self.model._meta,
+            "plan": plan,
+            "selected": request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            "select_across": request.POST.get("select_across", "0"),
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, "admin/consolidate.html", context)
+
+    def delete_queryset(self, request: HttpRequest, queryset: Claim.objects):
+        with transaction.atomic():
+            claims = queryset.order_by().values_list("pk", "shipment_id")
+            claim_ids = [pk for pk, shipment_id in claims]
+            shipment_ids = {shipment_id for pk, shipment_id in claims}
+
+            super().delete_queryset(request, queryset)
+
+            StockMovement.objects.sync_claims(claim_ids)
+
+        Shipment.invalidate_manifests(shipment_ids)
+
     @admin.display(description=_("offered item"))
     def admin_offered_item(self, claim: Claim):
         return format_html(
@@ -164,3 +339,53 @@ class ClaimAdmin(ExportActionModelAdmin):
             )
         else:
             return mark_safe("<b>Preemptive shipment</b><br>" "Just ship it to a distribution point")
+
+
+@admin.register(ShipmentEvent)
+class ShipmentEventAdmin(ImportExportActionModelAdmin):
+    list_display = ("when", "shipment", "type", "location", "source", "notes")
+    list_filter = (
+        "type",
+        ("shipment", CachedRelatedOnlyFieldListFilter),
+        ("location", CachedRelatedOnlyFieldListFilter),
+    )
+    list_select_related = ("shipment", "location")
+    search_fields = ("shipment__name", "location__name", "source", "notes")
+    autocomplete_fields = ("shipment",)
+    date_hierarchy = "when"
+    ordering = ("-when", "-id")
+    resource_class = ShipmentEventResource
+
+    def delete_queryset(self, request: HttpRequest, queryset: ShipmentEvent.objects):
+        # Like ShipmentEvent.delete(), the shipments follow from the remaining events
+        with transaction.atomic():
+            shipment_ids = set(queryset.values_list("shipment_id", flat=True))
+            super().delete_queryset(request, queryset)
+            Shipment.objects.filter(pk__in=shipment_ids).refresh_from_events()
+
+        bump_versions(ShipmentEvent)
+
+
+@admin.register(StockBalance)
+class StockBalanceAdmin(ReadOnlyMixin, admin.ModelAdmin):
+    list_display = ("location", "type", "brand", "model", "amount", "updated_at")
+    list_filter = (
+        ("location", CachedRelatedOnlyFieldListFilter),
+        ("type", CachedRelatedFieldListFilter),
+        ("brand", CachedAllValuesFieldListFilter),
+    )
+    search_fields = ("brand", "model", "location__name")
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(ReadOnlyMixin, admin.ModelAdmin):
+    list_display = ("when", "location", "type", "brand", "model", "admin_amount", "claim_id")
+    list_filter = (("location", CachedRelatedOnlyFieldListFilter), ("type", CachedRelatedFieldListFilter))
+    list_select_related = ("location", "type")
+    search_fields = ("brand", "model", "location__name")
+    date_hierarchy = "when"
+    ordering = ("-when", "-id")
+
+    @admin.display(description=_("amount"), ordering="amount")
+    def admin_amount(self, movement: StockMovement):
+        return f"{movement.amount:+d}"
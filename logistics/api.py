@@ -0,0 +1,267 @@
+from django.db.models import Manager
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import FloatField, IntegerField, ReadOnlyField, SerializerMethodField
+from rest_framework.mixins import CreateModelMixin
+from rest_framework.permissions import DjangoModelPermissions
+from rest_framework.relations import StringRelatedField
+from rest_framework.response import Response
+from rest_framework.serializers import HyperlinkedModelSerializer, ListSerializer, ModelSerializer
+from rest_framework.viewsets import ReadOnlyModelViewSet
+
+from aid_coordinator.replica import ReplicaReadMixin
+from logistics.manifest import attach_manifest_totals, get_manifest_lines
+from logistics.models import Claim, Location, Shipment, ShipmentEvent, ShipmentEventType
+from logistics.packing import PackingPlan, get_packing_profiles, plan_shipment
+from logistics.tracking import get_transit_times
+
+
+class ViewModelPermissions(DjangoModelPermissions):
+    """
+    Like DjangoModelPermissions, but reading also requires the view permission.
+    """
+
+    perms_map = {
+        **DjangoModelPermissions.perms_map,
+        "GET": ["%(app_label)s.view_%(model_name)s"],
+        "OPTIONS": ["%(app_label)s.view_%(model_name)s"],
+        "HEAD": ["%(app_label)s.view_%(model_name)s"],
+    }
+
+
+# Serializers define the API representation.
+class ManifestLineSerializer(ModelSerializer):
+    type = StringRelatedField(source="offered_item.type")
+    brand = ReadOnlyField(source="offered_item.brand")
+    model = ReadOnlyField(source="offered_item.model")
+    requester = SerializerMethodField()
+    unit_weight = FloatField()
+    unit_volume = IntegerField()
+    line_weight = FloatField()
+    line_volume = IntegerField()
+
+    class Meta:
+        model = Claim
+        fields = [
+            "amount",
+            "type",
+            "brand",
+            "model",
+            "requester",
+            "unit_weight",
+            "unit_volume",
+            "line_weight",
+            "line_volume",
+        ]
+
+    # noinspection PyMethodMayBeStatic
+    def get_requester(self, claim: Claim):
+        if not claim.requested_item_id:
+            return None
+
+        return str(claim.requested_item.request)
+
+
+class ShipmentManifestListSerializer(ListSerializer):
+    def to_representation(self, data):
+        shipments = list(data.all() if isinstance(data, Manager) else data)
+        attach_manifest_totals(shipments)
+        return super().to_representation(shipments)
+
+
+class ShipmentManifestSerializer(HyperlinkedModelSerializer):
+    current_location = StringRelatedField()
+    items = IntegerField(source="manifest_totals.items")
+    weight = FloatField(source="manifest_totals.weight")
+    volume = FloatField(source="manifest_totals.volume")
+    unknown_weight = IntegerField(source="manifest_totals.unknown_weight")
+    unknown_size = IntegerField(source="manifest_totals.unknown_size")
+
+    class Meta:
+        model = Shipment
+        list_serializer_class = ShipmentManifestListSerializer
+        fields = [
+            "id",
+            "name",
+            "when",
+            "current_location",
+            "is_delivered",
+            "items",
+            "weight",
+            "volume",
+            "unknown_weight",
+            "unknown_size",
+        ]
+
+    def to_representation(self, instance: Shipment):
+        if not hasattr(instance, "manifest_totals"):
+            attach_manifest_totals([instance])
+
+        return super().to_representation(instance)
+
+
+class ShipmentManifestDetailSerializer(ShipmentManifestSerializer):
+    lines = SerializerMethodField()
+
+    class Meta(ShipmentManifestSerializer.Meta):
+        fields = ShipmentManifestSerializer.Meta.fields + ["lines"]
+
+    # noinspection PyMethodMayBeStatic
+    def get_lines(self, shipment: Shipment):
+        return ManifestLineSerializer(get_manifest_lines(shipment), many=True).data
+
+
+class ShipmentEventListSerializer(ListSerializer):
+    def validate(self, attrs):
+        check_references(attrs)
+        return attrs
+
+    def create(self, validated_data):
+        events = [ShipmentEvent(**attrs) for attrs in validated_data]
+        ShipmentEvent.objects.ingest(events)
+        return events
+
+
+class ShipmentEventSerializer(ModelSerializer):
+    # Plain IDs, so a batch of events can be checked with one query per model instead of one per event
+    shipment = IntegerField(source="shipment_id")
+    location = IntegerField(source="location_id", allow_null=True, required=False)
+
+    class Meta:
+        model = ShipmentEvent
+        list_serializer_class = ShipmentEventListSerializer
+        fields = ["id", "shipment", "when", "type", "location", "source", "notes"]
+
+    def validate(self, attrs):
+        if self.parent is None:
+            check_references([attrs])
+        return attrs
+
+
+def check_references(events: list):
+    shipment_ids = {event["shipment_id"] for event in events}
+    location_ids = {event["location_id"] for event in events if event.get("location_id")}
+
+    missing_shipments = shipment_ids - set(Shipment.objects.filter(pk__in=shipment_ids).values_list("pk", flat=True))
+    missing_locations = location_ids - set(Location.objects.filter(pk__in=location_ids).values_list("pk", flat=True))
+
+    errors = {}
+    if missing_shipments:
+        errors["shipment"] = f"Unknown shipments: {', '.join(map(str, sorted(missing_shipments)))}"
+    if missing_locations:
+        errors["location"] = f"Unknown locations: {', '.join(map(str, sorted(missing_locations)))}"
+    if errors:
+        raise ValidationError(errors)
+
+
+def packing_plan_data(plan: PackingPlan) -> dict:
+    return {
+        "profile": plan.profile.key,
+        "pallet_count": plan.pallet_count,
+        "pallets": [
+            {
+                "number": pallet.number,
+                "weight": pallet.weight,
+                "height": pallet.used_height,
+                "fill_ratio": plan.fill_ratio(pallet),
+                "contents": [{"item": item, "amount": amount} for item, amount in pallet.contents.items()],
+            }
+            for pallet in plan.pallets
+        ],
+        "unknown_size": [{"item": item, "amount": amount} for item, amount in plan.unknown_size.items()],
+        "unknown_weight": [{"item": item, "amount": amount} for item, amount in plan.unknown_weight.items()],
+        "oversized": [{"item": item, "amount": amount} for item, amount in plan.oversized.items()],
+    }
+
+
+# ViewSets define the view behavior
+class ShipmentManifestViewSet(ReplicaReadMixin, ReadOnlyModelViewSet):
+    queryset = Shipment.objects.select_related("current_location").order_by("when", "name")
+    serializer_class = ShipmentManifestSerializer
+    permission_classes = [ViewModelPermissions]
+    filterset_fields = ["is_delivered", "current_location"]
+    search_fields = ["name"]
+
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return ShipmentManifestDetailSerializer
+
+        return super().get_serializer_class()
+
+    # noinspection PyUnusedLocal
+    @action(detail=True)
+    def packing(self, request, pk=None):
+        profiles = get_packing_profiles()
+        profile_key = request.query_params.get("profile", next(iter(profiles)))
+        if profile_key not in profiles:
+            raise ValidationError({"profile": f"Unknown profile, choose from: {', '.join(profiles)}"})
+
+        plan = plan_shipment(self.get_object(), profiles[profile_key])
+        return Response(packing_plan_data(plan))
+
+
+class ShipmentEventViewSet(ReplicaReadMixin, CreateModelMixin, ReadOnlyModelViewSet):
+    queryset = ShipmentEvent.objects.order_by("when", "id")
+    serializer_class = ShipmentEventSerializer
+    permission_classes = [ViewModelPermissions]
+    filterset_fields = {
+        "shipment": ["exact"],
+        "location": ["exact"],
+        "type": ["exact"],
+        "when": ["gte", "lte"],
+    }
+
+    def get_serializer(self, *args, **kwargs):
+        # Accept a list of events to ingest them in bulk
+        if isinstance(kwargs.get("data"), list):
+            kwargs["many"] = True
+
+        return super().get_serializer(*args, **kwargs)
+
+    # noinspection PyUnusedLocal
+    @action(detail=False)
+    def transit_times(self, request):
+        return Response(
+            [
+                {
+                    **route,
+                    "average": route["average"].total_seconds(),
+                    "shortest": route["shortest"].total_seconds(),
+                    "longest": route["longest"].total_seconds(),
+                }
+                for route in get_transit_times()
+            ]
+        )
+
+    @action(detail=False)
+    def position(self, request):
+        """
+        Where a shipment was at a given time: ?shipment=<id>&at=<ISO date and time>
+        """
+        try:
+            shipment = Shipment.objects.get(pk=int(request.query_params.get("shipment", "")))
+        except (ValueError, Shipment.DoesNotExist):
+            raise ValidationError({"shipment": "Unknown shipment"})
+
+        try:
+            # None when malformed, ValueError when well-formed but not a real date and time
+            when = parse_datetime(request.query_params.get("at", ""))
+        except ValueError:
+            when = None
+        if when is None:
+            raise ValidationError({"at": "Expected a date and time like 2022-05-01T12:00:00Z"})
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when)
+
+        event = shipment.get_event_at(when)
+        return Response(
+            {
+                "shipment": shipment.pk,
+                "at": when,
+                "location": str(event.location) if event and event.location else None,
+                "in_transit": bool(event and event.type == ShipmentEventType.DEPARTED),
+                "event": ShipmentEventSerializer(event).data if event else None,
+            }
+        )
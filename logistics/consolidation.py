@@ -0,0 +1,154 @@
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from contacts.models import Organisation
+from logistics.models import Claim, Location, Shipment
+
+# (origin location, destination organisation)
+GroupKey = Tuple[Optional[int], Optional[int]]
+
+
+@dataclass
+class ProposedShipment:
+    origin: Optional[Location]
+    destination: Optional[Organisation]
+    claim_ids: List[int] = field(default_factory=list)
+    items: int = 0
+    weight: float = 0.0
+    volume: float = 0.0
+    unknown: int = 0
+
+    def fits(self, weight: float, volume: float, max_weight: float, max_volume: float) -> bool:
+        return self.weight + weight <= max_weight and self.volume + volume <= max_volume
+
+    def add(self, claim_id: int, amount: int, weight: float, volume: float, known: bool):
+        self.claim_ids.append(claim_id)
+        self.items += amount
+        self.weight += weight
+        self.volume += volume
+        if not known:
+            self.unknown += amount
+
+    def get_name(self, when: date, number: int) -> str:
+        origin = self.origin or "?"
+        destination = self.destination or "distribution"
+        return f"{origin} → {destination} {when:%Y-%m-%d} #{number}"[-100:]
+
+
+@dataclass
+class ConsolidationPlan:
+    max_weight: float
+    max_volume: float
+    shipments: List[ProposedShipment] = field(default_factory=list)
+    oversized: List[int] = field(default_factory=list)
+
+    @property
+    def claim_count(self) -> int:
+        return sum(len(shipment.claim_ids) for shipment in self.shipments)
+
+
+def plan_consolidation(
+    claims: QuerySet,
+    max_weight: Optional[float] = None,
+    max_volume: Optional[float] = None,
+) -> ConsolidationPlan:
+    """
+    Group the unshipped claims by their current location and the organisation that requested them, and divide
+    each group over as few shipments as possible without exceeding the weight (in kg) or volume (in m³) limits.
+    Items with unknown weight or size count as SHIPMENT_UNKNOWN_ITEM_WEIGHT and SHIPMENT_UNKNOWN_ITEM_VOLUME, so
+    they can't fill a shipment beyond its limits, and are counted in the unknown items of their shipment.
+    """
+    plan = ConsolidationPlan(
+        max_weight=max_weight or settings.SHIPMENT_MAX_WEIGHT,
+        max_volume=max_volume or settings.SHIPMENT_MAX_VOLUME,
+    )
+    rows = (
+        claims.filter(shipment__isnull=True)
+        .with_equipment_data()
+        .order_by()
+        .values_list(
+            "pk",
+            "amount",
+            "current_location_id",
+            "requested_item__request__contact__organisation_id",
+            "unit_weight",
+            "unit_volume",
+        )
+    )
+
+    groups: Dict[GroupKey, list] = {}
+    for pk, amount, origin_id, destination_id, unit_weight, unit_volume in rows.iterator():
+        known = unit_weight is not None and unit_volume is not None
+        if unit_weight is None:
+            unit_weight = settings.SHIPMENT_UNKNOWN_ITEM_WEIGHT
+        if unit_volume is None:
+            unit_volume = settings.SHIPMENT_UNKNOWN_ITEM_VOLUME * 1_000_000
+        weight = amount * unit_weight
+        volume = amount * unit_volume / 1_000_000
+
+        if weight > plan.max_weight or volume > plan.max_volume:
+            plan.oversized.append(pk)
+            continue
+
+        groups.setdefault((origin_id, destination_id), []).append((pk, amount, weight, volume, known))
+
+    locations = Location.objects.in_bulk({origin_id for origin_id, _ in groups if origin_id})
+    organisations = Organisation.objects.in_bulk({destination_id for _, destination_id in groups if destination_id})
+
+    for (origin_id, destination_id), lines in groups.items():
+        # First fit decreasing, on whichever limit the claim uses most of
+        lines.sort(key=lambda line: max(line[2] / plan.max_weight, line[3] / plan.max_volume), reverse=True)
+
+        shipments = []
+        for pk, amount, weight, volume, known in lines:
+            for shipment in shipments:
+                if shipment.fits(weight, volume, plan.max_weight, plan.max_volume):
+                    break
+            else:
+                shipment = ProposedShipment(
+                    origin=locations.get(origin_id),
+                    destination=organisations.get(destination_id),
+                )
+                shipments.append(shipment)
+
+            shipment.add(pk, amount, weight, volume, known)
+
+        plan.shipments.extend(shipments)
+
+    return plan
+
+
+def apply_consolidation(plan: ConsolidationPlan, when: Optional[date] = None) -> List[Shipment]:
+    """
+    Create the proposed shipments and assign the claims to them. Claims that have been assigned to a shipment
+    in the meantime are left alone, and proposals of which all claims have been are skipped.
+    """
+    when = when or timezone.localdate()
+    existing = set(Shipment.objects.filter(name__contains=f" {when:%Y-%m-%d} #").values_list("name", flat=True))
+
+    created = []
+    with transaction.atomic():
+        number = 0
+        for proposal in plan.shipments:
+            claims = Claim.objects.filter(pk__in=proposal.claim_ids, shipment__isnull=True)
+            if not claims.exists():
+                continue
+
+            number += 1
+            while (name := proposal.get_name(when, number)) in existing:
+                number += 1
+
+            shipment = Shipment.objects.create(name=name, when=when, current_location=proposal.origin)
+            if not claims.assign_to_shipment(shipment):
+                # Assigned by someone else since the check
+                shipment.delete()
+                continue
+            created.append(shipment)
+
+    return created
@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management import BaseCommand, CommandError, CommandParser
+from django.utils.translation import gettext as _
+
+from logistics.packing import PackingItem, get_packing_profiles, pack
+
+
+def typical_shipment(rng: random.Random):
+    # A few dozen models of routers, switches and optics, usually several of each
+    return [
+        PackingItem(
+            description=f"Model {i}",
+            width=rng.choice([44, 48]),
+            depth=rng.randint(20, 60),
+            height=rng.choice([4, 9, 18]),
+            weight=rng.uniform(2, 25),
+            amount=rng.randint(1, 40),
+        )
+        for i in range(30)
+    ]
+
+
+def worst_case_shipment(rng: random.Random):
+    # Thousands of units that are all different, so nothing can be packed as a group
+    return [
+        PackingItem(
+            description=f"Model {i}",
+            width=rng.randint(5, 80),
+            depth=rng.randint(5, 60),
+            height=rng.randint(2, 50),
+            weight=rng.uniform(0.1, 40),
+            amount=1,
+        )
+        for i in range(5000)
+    ]
+
+
+class Command(BaseCommand):
+    help = _("Time the packing planner on typical and worst-case shipments")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--profile", default="euro_pallet", help=_("packing profile to use"))
+        parser.add_argument("--rounds", type=int, default=5, help=_("number of times to run each shipment"))
+        parser.add_argument("--seed", type=int, default=42, help=_("seed for the random shipments"))
+
+    def handle(self, *args, **options):
+        profiles = get_packing_profiles()
+        if options["profile"] not in profiles:
+            raise CommandError(_("Unknown profile, choose from: {profiles}").format(profiles=", ".join(profiles)))
+        profile = profiles[options["profile"]]
+
+        rng = random.Random(options["seed"])
+        for name, items in (
+            ("typical", typical_shipment(rng)),
+            ("worst case", worst_case_shipment(rng)),
+        ):
+            units = sum(item.amount for item in items)
+
+            timings = []
+            for _round in range(options["rounds"]):
+                start = time.perf_counter()
+                plan = pack(items, profile)
+                timings.append(time.perf_counter() - start)
+
+            self.stdout.write(
+                f"{name}: {units} units on {plan.pallet_count} x {profile.name}, "
+                f"best {min(timings) * 1000:.1f} ms, worst {max(timings) * 1000:.1f} ms"
+            )
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management import BaseCommand, CommandParser
+from django.utils.translation import gettext as _
+
+from logistics.consolidation import apply_consolidation, plan_consolidation
+from logistics.models import Claim
+
+
+class Command(BaseCommand):
+    help = _("Propose shipments for all unshipped claims, grouped by origin and destination")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--max-weight", type=float, help=_("maximum weight of a shipment in kg"))
+        parser.add_argument("--max-volume", type=float, help=_("maximum volume of a shipment in m³"))
+        parser.add_argument("--apply", action="store_true", help=_("create the proposed shipments"))
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        plan = plan_consolidation(Claim.objects.all(), options["max_weight"], options["max_volume"])
+        duration = time.perf_counter() - start
+
+        for proposal in plan.shipments:
+            warning = f" ({proposal.unknown} items without equipment data, estimated)" if proposal.unknown else ""
+            self.stdout.write(
+                f"{proposal.origin or '?'} → {proposal.destination or 'distribution'}: "
+                f"{len(proposal.claim_ids)} claims, {proposal.items} items, "
+                f"{proposal.weight:.1f} kg, {proposal.volume:.2f} m³{warning}"
+            )
+
+        if plan.oversized:
+            self.stderr.write(
+                f"{len(plan.oversized)} claims don't fit in a single shipment and should be split: "
+                + ", ".join(str(pk) for pk in plan.oversized)
+            )
+
+        self.stdout.write(
+            f"{plan.claim_count} claims in {len(plan.shipments)} shipments "
+            f"of at most {plan.max_weight:g} kg and {plan.max_volume:g} m³, planned in {duration * 1000:.0f} ms"
+        )
+
+        if options["apply"]:
+            shipments = apply_consolidation(plan)
+            self.stdout.write(self.style.SUCCESS(f"Created {len(shipments)} shipments"))
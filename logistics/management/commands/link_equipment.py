@@ -0,0 +1,41 @@
+import time
+
+from django.core.management import BaseCommand, CommandParser
+from django.db import transaction
+from django.utils.translation import gettext as _
+
+from aid_coordinator.caching import bump_versions
+from logistics.models import EquipmentData
+from supply_demand.models import OfferItem, RequestItem, link_equipment
+
+
+class Command(BaseCommand):
+    help = _("Normalize the brand and model of all equipment data and items and link the items to equipment data")
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        with transaction.atomic():
+            for model in (EquipmentData, OfferItem, RequestItem):
+                changed = []
+                for obj in model.objects.only("pk", "brand", "model", "normalized_key").iterator(options["batch_size"]):
+                    old_key = obj.normalized_key
+                    obj.update_normalized_key()
+                    if obj.normalized_key != old_key:
+                        changed.append(obj)
+
+                model.objects.bulk_update(changed, ["normalized_key"], batch_size=options["batch_size"])
+                self.stdout.write(f"{model._meta.verbose_name_plural}: {len(changed)} keys changed")
+
+            offered = link_equipment(OfferItem.objects.all())
+            requested = link_equipment(RequestItem.objects.all())
+
+        bump_versions(EquipmentData)
+        self.stdout.write(
+            f"Linked {OfferItem.objects.filter(equipment__isnull=False).count()} of {offered} offered items and "
+            f"{RequestItem.objects.filter(equipment__isnull=False).count()} of {requested} requested items "
+            f"in {time.perf_counter() - start:.1f} s"
+        )
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management import BaseCommand
+from django.utils.translation import gettext as _
+
+from logistics.models import Claim, StockBalance, StockMovement
+
+
+class Command(BaseCommand):
+    help = _("Bring the stock ledger in line with the current claims and recalculate all stock balances")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        before = StockMovement.objects.count()
+        claim_ids = set(Claim.objects.values_list("pk", flat=True))
+        claim_ids |= set(StockMovement.objects.values_list("claim_id", flat=True).distinct())
+        StockMovement.objects.sync_claims(claim_ids)
+        StockBalance.objects.rebuild()
+
+        self.stdout.write(
+            f"Recorded {StockMovement.objects.count() - before} movements for {len(claim_ids)} claims, "
+            f"{StockBalance.objects.count()} balances in {time.perf_counter() - start:.1f} s"
+        )
@@ -0,0 +1,87 @@
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+from django.db.models import Case, F, Sum, When
+
+from aid_coordinator.caching import stats
+from aid_coordinator.replica import read_from_replica
+from logistics.models import Claim, Shipment
+
+MANIFEST_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def get_manifest_lines(shipment: Shipment):
+    """
+    The claims in a shipment with the weight and volume of each line. Lines without equipment data have None.
+    """
+    return (
+        Claim.objects.filter(shipment=shipment)
+        .with_equipment_data()
+        .select_related("offered_item__type", "requested_item__request__contact__organisation")
+        .annotate(line_weight=F("amount") * F("unit_weight"), line_volume=F("amount") * F("unit_volume"))
+        .order_by("offered_item__type", "offered_item__brand", "offered_item__model")
+    )
+
+
+def get_manifest_totals(shipment_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    The total number of items, weight (in kg) and volume (in m³) of the given shipments, together with the number
+    of items of which the weight or size is unknown. Totals are cached until the claims of a shipment change.
+    """
+    keys = Shipment.manifest_cache_keys(shipment_ids)
+    cached = cache.get_many(keys.values())
+
+    totals = {}
+    missing = []
+    for shipment_id, key in keys.items():
+        stats.add("shipment-manifest", key in cached)
+        if key in cached:
+            totals[shipment_id] = cached[key]
+        else:
+            missing.append(shipment_id)
+
+    if missing:
+        computed = {
+            shipment_id: {"items": 0, "weight": 0.0, "volume": 0.0, "unknown_weight": 0, "unknown_size": 0}
+            for shipment_id in missing
+        }
+
+        # Cached totals are kept until something changes, so they must not come from a replica that is behind
+        with read_from_replica(False):
+            rows = list(
+                Claim.objects.filter(shipment_id__in=missing)
+                .with_equipment_data()
+                .order_by()
+                .values("shipment_id")
+                .annotate(
+                    items=Sum("amount"),
+                    weight=Sum(F("amount") * F("unit_weight")),
+                    volume=Sum(F("amount") * F("unit_volume")),
+                    unknown_weight=Sum(Case(When(unit_weight__isnull=True, then=F("amount")), default=0)),
+                    unknown_size=Sum(Case(When(unit_volume__isnull=True, then=F("amount")), default=0)),
+                )
+            )
+
+        for row in rows:
+            computed[row["shipment_id"]].update(
+                items=row["items"] or 0,
+                weight=row["weight"] or 0.0,
+                volume=(row["volume"] or 0) / 1_000_000,
+                unknown_weight=row["unknown_weight"] or 0,
+                unknown_size=row["unknown_size"] or 0,
+            )
+
+        cache.set_many({keys[shipment_id]: value for shipment_id, value in computed.items()}, MANIFEST_CACHE_TIMEOUT)
+        totals.update(computed)
+
+    return totals
+
+
+def attach_manifest_totals(shipments: Iterable[Shipment]):
+    """
+    Set the manifest_totals attribute on each of the given shipments, with one cache lookup for all of them.
+    """
+    shipments = list(shipments)
+    totals = get_manifest_totals([shipment.pk for shipment in shipments])
+    for shipment in shipments:
+        shipment.manifest_totals = totals[shipment.pk]
@@ -0,0 +1,58 @@
+# Generated by Django 4.0.10 on 2026-10-18 22:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supply_demand', '0033_alter_itemtype_order'),
+        ('logistics', '0019_alter_equipmentdata_weight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('when', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='when')),
+                ('brand', models.CharField(blank=True, max_length=50, verbose_name='brand')),
+                ('model', models.CharField(max_length=100, verbose_name='model')),
+                ('amount', models.IntegerField(help_text='negative when items leave the location', verbose_name='amount')),
+                ('claim', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='stock_movements', to='logistics.claim', verbose_name='claim')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='logistics.location', verbose_name='location')),
+                ('type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='supply_demand.itemtype', verbose_name='type')),
+            ],
+            options={
+                'verbose_name': 'stock movement',
+                'verbose_name_plural': 'stock movements',
+            },
+        ),
+        migrations.CreateModel(
+            name='StockBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('brand', models.CharField(blank=True, max_length=50, verbose_name='brand')),
+                ('model', models.CharField(max_length=100, verbose_name='model')),
+                ('amount', models.IntegerField(default=0, verbose_name='amount')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='updated at')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock', to='logistics.location', verbose_name='location')),
+                ('type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='supply_demand.itemtype', verbose_name='type')),
+            ],
+            options={
+                'verbose_name': 'stock balance',
+                'verbose_name_plural': 'stock balances',
+                'ordering': ('location__name', 'type', 'brand', 'model'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['claim', 'location'], name='logistics_s_claim_i_573e04_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='stockbalance',
+            unique_together={('location', 'type', 'brand', 'model')},
+        ),
+    ]
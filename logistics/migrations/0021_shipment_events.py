@@ -0,0 +1,50 @@
+# Generated by Django 4.0.10 on 2026-10-18 22:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0020_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shipment',
+            name='current_location',
+            field=models.ForeignKey(blank=True, help_text='derived from the latest event', null=True, on_delete=django.db.models.deletion.RESTRICT, to='logistics.location', verbose_name='current location'),
+        ),
+        migrations.AlterField(
+            model_name='shipment',
+            name='is_delivered',
+            field=models.BooleanField(default=False, help_text='derived from the events', verbose_name='is delivered'),
+        ),
+        migrations.CreateModel(
+            name='ShipmentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('when', models.DateTimeField(default=django.utils.timezone.now, verbose_name='when')),
+                ('type', models.PositiveIntegerField(choices=[(10, 'Departed'), (20, 'Arrived'), (30, 'Delivered')], verbose_name='type')),
+                ('source', models.CharField(blank=True, help_text='who reported this, for example the carrier', max_length=100, verbose_name='source')),
+                ('notes', models.CharField(blank=True, max_length=250, verbose_name='notes')),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, to='logistics.location', verbose_name='location')),
+                ('shipment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='logistics.shipment', verbose_name='shipment')),
+            ],
+            options={
+                'verbose_name': 'shipment event',
+                'verbose_name_plural': 'shipment events',
+                'ordering': ('shipment', 'when'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='shipmentevent',
+            index=models.Index(fields=['shipment', 'when'], name='logistics_s_shipmen_6f152e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipmentevent',
+            index=models.Index(fields=['type', 'when'], name='logistics_s_type_21c92c_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def create_initial_events(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+
+    # noinspection PyPep8Naming
+    Shipment = apps.get_model("logistics", "Shipment")
+    # noinspection PyPep8Naming
+    ShipmentEvent = apps.get_model("logistics", "ShipmentEvent")
+
+    # Start the history of existing shipments with where they are now
+    now = timezone.now()
+    events = []
+    for shipment in Shipment.objects.using(db_alias).all():
+        if shipment.current_location_id:
+            events.append(ShipmentEvent(shipment=shipment, when=now, type=20, location_id=shipment.current_location_id))
+        if shipment.is_delivered:
+            events.append(ShipmentEvent(shipment=shipment, when=now, type=30, location_id=shipment.current_location_id))
+
+    ShipmentEvent.objects.using(db_alias).bulk_create(events, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logistics", "0021_shipment_events"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_initial_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-18 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0022_initial_shipment_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdata',
+            name='normalized_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=160, verbose_name='normalized brand and model'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-18 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0023_equipmentdata_normalized_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['offered_item', 'amount'], name='logistics_c_offered_966dbb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['requested_item', 'shipment'], name='logistics_c_request_e82245_idx'),
+        ),
+    ]
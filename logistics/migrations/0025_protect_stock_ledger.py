@@ -0,0 +1,35 @@
+# Generated by Django 4.0.10 on 2026-10-19 00:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supply_demand', '0036_item_and_change_indexes'),
+        ('logistics', '0024_claim_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockbalance',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='stock', to='logistics.location', verbose_name='location'),
+        ),
+        migrations.AlterField(
+            model_name='stockbalance',
+            name='type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to='supply_demand.itemtype', verbose_name='type'),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to='logistics.location', verbose_name='location'),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to='supply_demand.itemtype', verbose_name='type'),
+        ),
+    ]
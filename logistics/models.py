@@ -1,10 +1,28 @@
-from django.db import models
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Exists, F, OuterRef, Subquery, Sum
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_countries.fields import CountryField
 from phonenumber_field.modelfields import PhoneNumberField
 
+from aid_coordinator.caching import bump_versions, get_versions, track_models
 from contacts.models import Organisation
-from supply_demand.models import OfferItem, RequestItem
+from supply_demand.catalogue import normalize_key
+from supply_demand.models import ItemType, OfferItem, RequestItem, link_equipment
+
+# (location, item type, brand, model)
+StockKey = Tuple[int, int, str, str]
+
+
+class ShipmentEventType(models.IntegerChoices):
+    DEPARTED = 10, _("Departed")
+    ARRIVED = 20, _("Arrived")
+    DELIVERED = 30, _("Delivered")
 
 
 class EquipmentData(models.Model):
@@ -17,6 +35,18 @@ class EquipmentData(models.Model):
 
     weight = models.FloatField(verbose_name=_("weight"), blank=True, null=True, help_text=_("in kg"))
 
+    normalized_key = models.CharField(
+        verbose_name=_("normalized brand and model"),
+        max_length=160,
+        blank=True,
+        db_index=True,
+        editable=False,
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.original_normalized_key = self.__dict__.get("normalized_key")
+
     class Meta:
         unique_together = (("brand", "model"),)
         verbose_name = _("equipment data")
@@ -25,6 +55,41 @@ class EquipmentData(models.Model):
     def __str__(self):
         return f"{self.brand} {self.model}"
 
+    def update_normalized_key(self):
+        self.normalized_key = normalize_key(self.brand, self.model)
+
+    def save(self, *args, **kwargs):
+        self.update_normalized_key()
+        new = self._state.adding
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if new or self.normalized_key != self.original_normalized_key:
+                self.link_items([self.original_normalized_key, self.normalized_key])
+
+        self.original_normalized_key = self.normalized_key
+        bump_versions(EquipmentData)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+
+            # There might be another record for the same equipment
+            self.link_items([self.normalized_key])
+
+        bump_versions(EquipmentData)
+        return result
+
+    @staticmethod
+    def link_items(normalized_keys: Iterable[str]):
+        """
+        Point the offered and requested items with these keys at the right equipment data.
+        """
+        normalized_keys = {key for key in normalized_keys if key}
+        if normalized_keys:
+            link_equipment(OfferItem.objects.filter(normalized_key__in=normalized_keys))
+            link_equipment(RequestItem.objects.filter(normalized_key__in=normalized_keys))
+
 
 class Location(models.Model):
     name = models.CharField(verbose_name=_("name"), max_length=100)
@@ -63,6 +128,50 @@ class Location(models.Model):
         return self.name
 
 
+class ShipmentQuerySet(models.QuerySet):
+    def refresh_from_events(self) -> int:
+        """
+        Derive the current location and delivery status of the shipments from their latest events, with one
+        UPDATE per distinct outcome. Shipments without events are left alone. Returns the number of shipments
+        that changed.
+        """
+        events = ShipmentEvent.objects.filter(shipment=OuterRef("pk")).order_by("-when", "-pk")
+        rows = (
+            self.order_by()
+            .annotate(
+                last_type=Subquery(events.values("type")[:1]),
+                last_location_id=Subquery(events.values("location_id")[:1]),
+                delivered=Exists(events.filter(type=ShipmentEventType.DELIVERED)),
+            )
+            .filter(last_type__isnull=False)
+            .values_list("pk", "current_location_id", "is_delivered", "last_type", "last_location_id", "delivered")
+        )
+
+        changes = {}
+        moved = []
+        for pk, location_id, is_delivered, last_type, last_location_id, delivered in rows:
+            # After departure a shipment is in transit
+            new_location_id = None if last_type == ShipmentEventType.DEPARTED else last_location_id
+            if (new_location_id, delivered) != (location_id, is_delivered):
+                changes.setdefault((new_location_id, delivered), []).append(pk)
+            if new_location_id != location_id:
+                moved.append(pk)
+
+        with transaction.atomic():
+            for (location_id, delivered), shipment_ids in changes.items():
+                Shipment.objects.filter(pk__in=shipment_ids).update(
+                    current_location_id=location_id,
+                    is_delivered=delivered,
+                )
+
+            # The items on board moved along
+            if moved:
+                claim_ids = Claim.objects.filter(shipment_id__in=moved).values_list("pk", flat=True)
+                StockMovement.objects.sync_claims(claim_ids)
+
+        return sum(len(shipment_ids) for shipment_ids in changes.values())
+
+
 class Shipment(models.Model):
     name = models.CharField(verbose_name=_("name"), max_length=100, unique=True)
     when = models.DateField(verbose_name=_("when"), blank=True, null=True)
@@ -72,8 +181,20 @@ class Shipment(models.Model):
         on_delete=models.RESTRICT,
         blank=True,
         null=True,
+        help_text=_("derived from the latest event"),
+    )
+    is_delivered = models.BooleanField(
+        verbose_name=_("is delivered"),
+        default=False,
+        help_text=_("derived from the events"),
     )
-    is_delivered = models.BooleanField(verbose_name=_("is delivered"), default=False)
+
+    objects = ShipmentQuerySet.as_manager()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.original_location_id = self.__dict__.get("current_location_id")
+        self.original_is_delivered = self.__dict__.get("is_delivered")
 
     class Meta:
         verbose_name = _("shipment")
@@ -82,6 +203,190 @@ class Shipment(models.Model):
     def __str__(self):
         return self.name
 
+    def get_changed_events(self) -> List["ShipmentEvent"]:
+        """
+        Events that record changes made directly to the current location or delivery status, so the history
+        stays complete.
+        """
+        if self._state.adding:
+            original_location_id, original_is_delivered = None, False
+        else:
+            original_location_id, original_is_delivered = self.original_location_id, self.original_is_delivered
+
+        events = []
+        if self.current_location_id != original_location_id:
+            if self.current_location_id:
+                events.append(ShipmentEvent(type=ShipmentEventType.ARRIVED, location_id=self.current_location_id))
+            else:
+                events.append(ShipmentEvent(type=ShipmentEventType.DEPARTED, location_id=original_location_id))
+
+        if self.is_delivered and not original_is_delivered:
+            events.append(ShipmentEvent(type=ShipmentEventType.DELIVERED, location_id=self.current_location_id))
+
+        return events
+
+    def save(self, *args, **kwargs):
+        events = self.get_changed_events()
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            if events:
+                now = timezone.now()
+                for event in events:
+                    event.shipment = self
+                    event.when = now
+                ShipmentEvent.objects.ingest(events, refresh=False)
+
+            # The items on board moved along
+            if self.current_location_id != self.original_location_id:
+                StockMovement.objects.sync_claims(self.claim_set.values_list("pk", flat=True))
+
+        self.original_location_id = self.current_location_id
+        self.original_is_delivered = self.is_delivered
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            claim_ids = list(self.claim_set.values_list("pk", flat=True))
+            result = super().delete(*args, **kwargs)
+            StockMovement.objects.sync_claims(claim_ids)
+
+        # Its events are gone too
+        bump_versions(ShipmentEvent)
+        return result
+
+    def get_event_at(self, when: datetime) -> Optional["ShipmentEvent"]:
+        """
+        The last event at or before the given time, which tells where the shipment was.
+        """
+        return self.events.filter(when__lte=when).select_related("location").order_by("-when", "-pk").first()
+
+    @staticmethod
+    def manifest_cache_keys(shipment_ids: Iterable[Optional[int]]) -> Dict[int, str]:
+        # The weights and sizes come from the equipment data
+        versions = get_versions([EquipmentData])
+        return {
+            shipment_id: f"shipment-manifest:{versions}:{shipment_id}" for shipment_id in shipment_ids if shipment_id
+        }
+
+    @staticmethod
+    def invalidate_manifests(shipment_ids: Iterable[Optional[int]]):
+        cache.delete_many(list(Shipment.manifest_cache_keys(shipment_ids).values()))
+
+
+class ShipmentEventManager(models.Manager):
+    def ingest(self, events: List["ShipmentEvent"], refresh: bool = True, batch_size: int = 1000):
+        """
+        Store a batch of events, for example from a carrier, and update the shipments they are about.
+        """
+        with transaction.atomic():
+            self.bulk_create(events, batch_size=batch_size)
+            if refresh:
+                Shipment.objects.filter(pk__in={event.shipment_id for event in events}).refresh_from_events()
+
+        bump_versions(ShipmentEvent)
+
+
+class ShipmentEvent(models.Model):
+    """
+    An append-only log of where shipments have been.
+    """
+
+    shipment = models.ForeignKey(
+        verbose_name=_("shipment"),
+        to=Shipment,
+        related_name="events",
+        on_delete=models.CASCADE,
+    )
+    when = models.DateTimeField(verbose_name=_("when"), default=timezone.now)
+    type = models.PositiveIntegerField(verbose_name=_("type"), choices=ShipmentEventType.choices)
+    location = models.ForeignKey(
+        verbose_name=_("location"),
+        to=Location,
+        on_delete=models.RESTRICT,
+        blank=True,
+        null=True,
+    )
+    source = models.CharField(
+        verbose_name=_("source"),
+        max_length=100,
+        blank=True,
+        help_text=_("who reported this, for example the carrier"),
+    )
+    notes = models.CharField(verbose_name=_("notes"), max_length=250, blank=True)
+
+    objects = ShipmentEventManager()
+
+    class Meta:
+        ordering = ("shipment", "when")
+        verbose_name = _("shipment event")
+        verbose_name_plural = _("shipment events")
+        indexes = [
+            models.Index(fields=["shipment", "when"]),
+            models.Index(fields=["type", "when"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_type_display()} {self.location or ''} {self.when:%Y-%m-%d %H:%M}".replace("  ", " ")
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Shipment.objects.filter(pk=self.shipment_id).refresh_from_events()
+
+        bump_versions(ShipmentEvent)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Shipment.objects.filter(pk=self.shipment_id).refresh_from_events()
+
+        bump_versions(ShipmentEvent)
+        return result
+
+
+class ClaimQuerySet(models.QuerySet):
+    def with_equipment_data(self):
+        """
+        Annotate the unit weight (in kg) and volume (in cm³) of the claimed items from the equipment data they
+        are linked to. Unknown values are NULL.
+        """
+        return self.annotate(
+            unit_weight=F("offered_item__equipment__weight"),
+            unit_volume=(
+                F("offered_item__equipment__width")
+                * F("offered_item__equipment__height")
+                * F("offered_item__equipment__depth")
+            ),
+        )
+
+    def with_equipment_size(self):
+        """
+        Annotate the unit width, height and depth (in cm) of the claimed items, like with_equipment_data().
+        """
+        return self.annotate(
+            unit_width=F("offered_item__equipment__width"),
+            unit_height=F("offered_item__equipment__height"),
+            unit_depth=F("offered_item__equipment__depth"),
+        )
+
+    def assign_to_shipment(self, shipment: Optional[Shipment]) -> int:
+        """
+        Move the claims to the given shipment (or none) with a single UPDATE, and do what Claim.save() would do
+        for all of them at once.
+        """
+        claims = self.order_by().values_list("pk", "shipment_id")
+        claim_ids = [pk for pk, shipment_id in claims]
+        old_shipment_ids = {shipment_id for pk, shipment_id in claims}
+
+        with transaction.atomic():
+            OfferItem.objects.filter(rejected=True, claim__in=claim_ids).update(rejected=False)
+            count = Claim.objects.filter(pk__in=claim_ids).update(shipment=shipment)
+            StockMovement.objects.sync_claims(claim_ids)
+
+        Shipment.invalidate_manifests(old_shipment_ids | {shipment.pk if shipment else None})
+        return count
+
 
 class Claim(models.Model):
     offered_item = models.ForeignKey(verbose_name=_("offered item"), to=OfferItem, on_delete=models.RESTRICT)
@@ -111,17 +416,277 @@ class Claim(models.Model):
         on_delete=models.SET_NULL,
     )
 
+    objects = ClaimQuerySet.as_manager()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.original_shipment_id = self.__dict__.get("shipment_id")
+        self.original_stock_fields = self.get_stock_fields()
+
     class Meta:
         verbose_name = _("claim")
         verbose_name_plural = _("claims")
+        indexes = [
+            # Enough to sum the claimed amount of offered items and to find delivered requested items
+            models.Index(fields=["offered_item", "amount"]),
+            models.Index(fields=["requested_item", "shipment"]),
+        ]
 
     def __str__(self):
         return f"{self.amount}x {self.offered_item} for request {self.requested_item}"
 
+    def get_stock_fields(self):
+        fields = ("offered_item_id", "amount", "shipment_id", "current_location_id")
+        return tuple(self.__dict__.get(field) for field in fields)
+
     def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
-        super().save(force_insert, force_update, using, update_fields)
+        new = self._state.adding
+
+        with transaction.atomic():
+            super().save(force_insert, force_update, using, update_fields)
+
+            stock_fields = self.get_stock_fields()
+            if new or stock_fields != self.original_stock_fields:
+                StockMovement.objects.sync_claims([self.pk])
+                self.original_stock_fields = stock_fields
+
+        Shipment.invalidate_manifests([self.original_shipment_id, self.shipment_id])
+        self.original_shipment_id = self.shipment_id
+
+        # If someone claims this, we don't need to reject it anymore. Only touch the rejected flag, a full save
+        # of the offered item would also update its timestamp and the change log of the offer.
+        OfferItem.objects.filter(pk=self.offered_item_id, rejected=True).update(rejected=False)
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            StockMovement.objects.sync_claims([pk])
+
+        Shipment.invalidate_manifests([self.shipment_id])
+        return result
+
+
+class StockMovementManager(models.Manager):
+    def get_stock_positions(self, claim_ids) -> Dict[int, Dict[StockKey, int]]:
+        """
+        Where the items of the given claims are now: at the current location of their shipment if they have one,
+        otherwise at their own current location. Items that haven't been received yet aren't anywhere.
+        """
+        claims = Claim.objects.filter(pk__in=claim_ids, offered_item__received=True).values_list(
+            "pk",
+            "amount",
+            "shipment_id",
+            "shipment__current_location_id",
+            "current_location_id",
+            "offered_item__type_id",
+            "offered_item__brand",
+            "offered_item__model",
+        )
+
+        positions = {}
+        for pk, amount, shipment_id, shipment_location_id, location_id, type_id, brand, model in claims:
+            location_id = shipment_location_id if shipment_id else location_id
+            if location_id and amount:
+                positions[pk] = {(location_id, type_id, brand, model): amount}
+
+        return positions
+
+    def get_recorded_positions(self, claim_ids) -> Dict[int, Dict[StockKey, int]]:
+        """
+        Where the ledger says the items of the given claims are.
+        """
+        rows = (
+            self.filter(claim_id__in=claim_ids)
+            .order_by()
+            .values_list("claim_id", "location_id", "type_id", "brand", "model")
+            .annotate(total=Sum("amount"))
+            .exclude(total=0)
+        )
+
+        positions = {}
+        for claim_id, location_id, type_id, brand, model, total in rows:
+            positions.setdefault(claim_id, {})[(location_id, type_id, brand, model)] = total
+
+        return positions
+
+    def sync_claims(self, claim_ids: Iterable[int], batch_size: int = 500):
+        """
+        Record the movements needed to bring the ledger in line with where the items of the given claims are now,
+        and apply them to the stock balances. Claims that have been deleted are moved out of stock.
+        """
+        claim_ids = sorted(set(claim_ids))
+
+        with transaction.atomic():
+            for start in range(0, len(claim_ids), batch_size):
+                batch = claim_ids[start : start + batch_size]
+                wanted = self.get_stock_positions(batch)
+                recorded = self.get_recorded_positions(batch)
+
+                movements = []
+                deltas = Counter()
+                for claim_id in batch:
+                    want = wanted.get(claim_id, {})
+                    have = recorded.get(claim_id, {})
+
+                    # Take items out of their old location before putting them in the new one
+                    for key in sorted(want.keys() | have.keys(), key=lambda key: want.get(key, 0) - have.get(key, 0)):
+                        delta = want.get(key, 0) - have.get(key, 0)
+                        if delta:
+                            location_id, type_id, brand, model = key
+                            movements.append(
+                                StockMovement(
+                                    claim_id=claim_id,
+                                    location_id=location_id,
+                                    type_id=type_id,
+                                    brand=brand,
+                                    model=model,
+                                    amount=delta,
+                                )
+                            )
+                            deltas[key] += delta
+
+                if movements:
+                    self.bulk_create(movements)
+                    StockBalance.objects.apply_deltas(deltas)
+
+
+class StockMovement(models.Model):
+    """
+    An append-only ledger of items moving in and out of locations. Never update or delete these, record a
+    movement in the opposite direction instead.
+    """
+
+    when = models.DateTimeField(verbose_name=_("when"), auto_now_add=True, db_index=True)
+    # No constraint, the ledger keeps the history of claims that have been deleted
+    claim = models.ForeignKey(
+        verbose_name=_("claim"),
+        to=Claim,
+        related_name="stock_movements",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    # Locations and types with a history can't be deleted
+    location = models.ForeignKey(verbose_name=_("location"), to=Location, on_delete=models.RESTRICT)
+    type = models.ForeignKey(verbose_name=_("type"), to=ItemType, on_delete=models.RESTRICT)
+    brand = models.CharField(verbose_name=_("brand"), max_length=50, blank=True)
+    model = models.CharField(verbose_name=_("model"), max_length=100)
+    amount = models.IntegerField(verbose_name=_("amount"), help_text=_("negative when items leave the location"))
+
+    objects = StockMovementManager()
+
+    class Meta:
+        verbose_name = _("stock movement")
+        verbose_name_plural = _("stock movements")
+        indexes = [models.Index(fields=["claim", "location"])]
+
+    def __str__(self):
+        return f"{self.amount:+d}x {self.brand} {self.model} at {self.location_id}".replace("  ", " ")
+
+
+class StockBalanceManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().select_related("location", "type")
+
+    def apply_deltas(self, deltas: Dict[StockKey, int]):
+        """
+        Add the given changes to the balances, creating and removing balance rows as needed.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        with transaction.atomic():
+            candidates = self.select_for_update().filter(
+                location_id__in={key[0] for key in deltas},
+                type_id__in={key[1] for key in deltas},
+                model__in={key[3] for key in deltas},
+            )
+            balances = {
+                (balance.location_id, balance.type_id, balance.brand, balance.model): balance
+                for balance in candidates.select_related(None)
+            }
+
+            now = timezone.now()
+            to_create, to_update, to_delete = [], [], []
+            for key, delta in deltas.items():
+                balance = balances.get(key)
+                if balance is None:
+                    location_id, type_id, brand, model = key
+                    balance = StockBalance(location_id=location_id, type_id=type_id, brand=brand, model=model)
+                    to_create.append(balance)
+                elif balance.amount + delta == 0:
+                    to_delete.append(balance.pk)
+                else:
+                    to_update.append(balance)
+
+                balance.amount += delta
+                balance.updated_at = now
+
+            self.bulk_create(to_create)
+            self.bulk_update(to_update, ["amount", "updated_at"])
+            self.filter(pk__in=to_delete).delete()
+
+    def rebuild(self):
+        """
+        Recalculate all balances from the ledger.
+        """
+        totals = (
+            StockMovement.objects.order_by()
+            .values_list("location_id", "type_id", "brand", "model")
+            .annotate(total=Sum("amount"))
+            .exclude(total=0)
+        )
+
+        now = timezone.now()
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                [
+                    StockBalance(
+                        location_id=location_id,
+                        type_id=type_id,
+                        brand=brand,
+                        model=model,
+                        amount=total,
+                        updated_at=now,
+                    )
+                    for location_id, type_id, brand, model, total in totals
+                ],
+                batch_size=1000,
+            )
+
+
+class StockBalance(models.Model):
+    """
+    The number of items of each kind at each location, kept up to date from the stock movements.
+    """
+
+    location = models.ForeignKey(
+        verbose_name=_("location"),
+        to=Location,
+        related_name="stock",
+        on_delete=models.RESTRICT,
+    )
+    type = models.ForeignKey(verbose_name=_("type"), to=ItemType, on_delete=models.RESTRICT)
+    brand = models.CharField(verbose_name=_("brand"), max_length=50, blank=True)
+    model = models.CharField(verbose_name=_("model"), max_length=100)
+    amount = models.IntegerField(verbose_name=_("amount"), default=0)
+    updated_at = models.DateTimeField(verbose_name=_("updated at"), default=timezone.now)
+
+    objects = StockBalanceManager()
+
+    class Meta:
+        unique_together = (("location", "type", "brand", "model"),)
+        ordering = ("location__name", "type", "brand", "model")
+        verbose_name = _("stock balance")
+        verbose_name_plural = _("stock balances")
+
+    def __str__(self):
+        return f"{self.amount}x {self.brand} {self.model} at {self.location}".replace("  ", " ")
+
 
-        # If someone claims this, we don't need to reject it anymore
-        if self.offered_item.rejected:
-            self.offered_item.rejected = False
-            self.offered_item.save()
+# The cached API responses depend on these. Equipment data and shipment events change their versions themselves,
+# once the items and shipments that they change are saved too.
+track_models(Claim)
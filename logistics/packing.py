@@ -0,0 +1,204 @@
+from dataclasses import dataclass, field
+from itertools import permutations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from logistics.models import Claim, Shipment
+
+# Only try to place items on the last few pallets, the earlier ones are nearly always full anyway
+LOOKBACK = 10
+
+Dimensions = Tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class PackingProfile:
+    key: str
+    name: str
+    width: int
+    depth: int
+    height: int
+    max_weight: float
+
+    @property
+    def volume(self) -> int:
+        return self.width * self.depth * self.height
+
+
+@dataclass
+class PackingItem:
+    description: str
+    width: Optional[int]
+    depth: Optional[int]
+    height: Optional[int]
+    weight: Optional[float]
+    amount: int
+
+    @property
+    def has_size(self) -> bool:
+        return bool(self.width and self.depth and self.height)
+
+
+@dataclass
+class Shelf:
+    depth: int
+    used_width: int = 0
+
+
+@dataclass
+class Layer:
+    height: int
+    used_depth: int = 0
+    shelves: List[Shelf] = field(default_factory=list)
+
+
+@dataclass
+class Pallet:
+    number: int
+    layers: List[Layer] = field(default_factory=list)
+    used_height: int = 0
+    weight: float = 0.0
+    volume: int = 0
+    contents: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class PackingPlan:
+    profile: PackingProfile
+    pallets: List[Pallet] = field(default_factory=list)
+    unknown_size: Dict[str, int] = field(default_factory=dict)
+    unknown_weight: Dict[str, int] = field(default_factory=dict)
+    oversized: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def pallet_count(self) -> int:
+        return len(self.pallets)
+
+    def fill_ratio(self, pallet: Pallet) -> float:
+        return pallet.volume / self.profile.volume
+
+
+def add_amount(amounts: Dict[str, int], description: str, amount: int):
+    # Plain dicts instead of Counters, because templates would look up .items as a key of a Counter
+    amounts[description] = amounts.get(description, 0) + amount
+
+
+def get_packing_profiles() -> Dict[str, PackingProfile]:
+    return {key: PackingProfile(key=key, **values) for key, values in settings.PACKING_PROFILES.items()}
+
+
+def get_orientations(item: PackingItem, profile: PackingProfile) -> List[Dimensions]:
+    """
+    All ways to turn the item that fit the profile as (width, depth, height), the flattest first.
+    """
+    orientations = {
+        (width, depth, height)
+        for width, depth, height in permutations((item.width, item.depth, item.height))
+        if width <= profile.width and depth <= profile.depth and height <= profile.height
+    }
+    return sorted(orientations, key=lambda dims: (dims[2], -dims[0] * dims[1]))
+
+
+def place(pallet: Pallet, orientations: List[Dimensions], profile: PackingProfile) -> bool:
+    """
+    Place an item on the pallet: next to others on a shelf, on a new shelf behind those or on a new layer on top.
+    """
+    if pallet.layers:
+        layer = pallet.layers[-1]
+
+        for shelf in layer.shelves:
+            for width, depth, height in orientations:
+                if shelf.used_width + width <= profile.width and depth <= shelf.depth and height <= layer.height:
+                    shelf.used_width += width
+                    return True
+
+        for width, depth, height in orientations:
+            if layer.used_depth + depth <= profile.depth and height <= layer.height:
+                layer.shelves.append(Shelf(depth=depth, used_width=width))
+                layer.used_depth += depth
+                return True
+
+    for width, depth, height in orientations:
+        if pallet.used_height + height <= profile.height:
+            shelf = Shelf(depth=depth, used_width=width)
+            pallet.layers.append(Layer(height=height, used_depth=depth, shelves=[shelf]))
+            pallet.used_height += height
+            return True
+
+    return False
+
+
+def pack(items: Iterable[PackingItem], profile: PackingProfile) -> PackingPlan:
+    """
+    Pack the items on as few pallets (or boxes) as possible, using a layer and shelf first-fit decreasing heuristic.
+    """
+    plan = PackingPlan(profile=profile)
+
+    packable = []
+    for item in items:
+        if not item.has_size:
+            add_amount(plan.unknown_size, item.description, item.amount)
+            continue
+
+        orientations = get_orientations(item, profile)
+        if not orientations or (item.weight or 0) > profile.max_weight:
+            add_amount(plan.oversized, item.description, item.amount)
+            continue
+
+        if item.weight is None:
+            add_amount(plan.unknown_weight, item.description, item.amount)
+
+        packable.append((item, orientations))
+
+    # Biggest items first, so the small ones can fill up the gaps
+    packable.sort(key=lambda entry: (entry[1][0][2], entry[1][0][0] * entry[1][0][1]), reverse=True)
+
+    for item, orientations in packable:
+        weight = item.weight or 0.0
+        volume = item.width * item.depth * item.height
+
+        # Pallets that didn't fit one of these items won't fit the next one either
+        first = max(0, len(plan.pallets) - LOOKBACK)
+
+        for _ in range(item.amount):
+            first = max(first, len(plan.pallets) - LOOKBACK)
+            for pallet in plan.pallets[first:]:
+                if pallet.weight + weight <= profile.max_weight and place(pallet, orientations, profile):
+                    break
+                first += 1
+            else:
+                pallet = Pallet(number=len(plan.pallets) + 1)
+                place(pallet, orientations, profile)
+                plan.pallets.append(pallet)
+
+            pallet.weight += weight
+            pallet.volume += volume
+            add_amount(pallet.contents, item.description, 1)
+
+    return plan
+
+
+def get_shipment_items(shipment: Shipment) -> List[PackingItem]:
+    claims = (
+        Claim.objects.filter(shipment=shipment)
+        .with_equipment_data()
+        .with_equipment_size()
+        .select_related("offered_item")
+    )
+
+    return [
+        PackingItem(
+            description=str(claim.offered_item),
+            width=claim.unit_width,
+            depth=claim.unit_depth,
+            height=claim.unit_height,
+            weight=claim.unit_weight,
+            amount=claim.amount,
+        )
+        for claim in claims
+    ]
+
+
+def plan_shipment(shipment: Shipment, profile: PackingProfile) -> PackingPlan:
+    return pack(get_shipment_items(shipment), profile)
@@ -1,7 +1,41 @@
+import hashlib
+
 from import_export import fields, resources
-from import_export.widgets import IntegerWidget
+from import_export.instance_loaders import ModelInstanceLoader
+from import_export.widgets import IntegerWidget, Widget
+
+from aid_coordinator.caching import bump_versions
+from aid_coordinator.export import StreamingExportMixin
+from aid_coordinator.widgets import CachedForeignKeyWidget
+from logistics.models import Claim, EquipmentData, Location, Shipment, ShipmentEvent, ShipmentEventType
+
+
+class EquipmentDataInstanceLoader(ModelInstanceLoader):
+    """
+    Loads all existing equipment data of the brands in the dataset with one query, instead of one query per row.
+    """
 
-from logistics.models import Claim, EquipmentData
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Without the column EquipmentDataResource.before_import() reports an error, and no rows are matched
+        brand_field = self.resource.fields["brand"]
+        if brand_field.column_name in self.dataset.headers:
+            brands = {brand_field.clean(row) for row in self.dataset.dict}
+        else:
+            brands = set()
+
+        self.all_instances = {
+            (instance.brand, instance.model): instance
+            for instance in self.get_queryset().filter(brand__in=brands)
+        }
+        self.resource.original_hashes = {
+            key: self.resource.get_content_hash(instance) for key, instance in self.all_instances.items()
+        }
+
+    def get_instance(self, row):
+        key = (self.resource.fields["brand"].clean(row), self.resource.fields["model"].clean(row))
+        return self.all_instances.get(key)
 
 
 class EquipmentDataResource(resources.ModelResource):
@@ -9,15 +43,62 @@ class EquipmentDataResource(resources.ModelResource):
         model = EquipmentData
         fields = ("brand", "model", "width", "height", "depth", "weight")
         import_id_fields = ("brand", "model")
+        instance_loader_class = EquipmentDataInstanceLoader
+        use_bulk = True
+        batch_size = 1000
+        skip_diff = True
+        report_skipped = False
+
+    def __init__(self):
+        super().__init__()
+        self.original_hashes = {}
+        self.imported_keys = set()
+        self.saved_keys = set()
+
+    def get_content_hash(self, instance: EquipmentData) -> str:
+        values = tuple(getattr(instance, field) for field in self.get_bulk_update_fields())
+        return hashlib.sha1(repr(values).encode()).hexdigest()
+
+    def before_import(self, dataset, using_transactions, dry_run, **kwargs):
+        self.imported_keys = set()
+        self.saved_keys = set()
+
+        missing = [
+            self.fields[name].column_name
+            for name in self.get_import_id_fields()
+            if self.fields[name].column_name not in dataset.headers
+        ]
+        if missing:
+            raise ValueError(f"The file has no {' or '.join(missing)} column")
+
+    def before_save_instance(self, instance, using_transactions, dry_run):
+        # Bulk creates skip EquipmentData.save()
+        instance.update_normalized_key()
+        self.saved_keys.add(instance.normalized_key)
+
+    def after_import(self, dataset, result, using_transactions, dry_run, **kwargs):
+        if not dry_run:
+            EquipmentData.link_items(self.saved_keys)
+            bump_versions(EquipmentData)
+
+    def skip_row(self, instance, original):
+        key = (instance.brand, instance.model)
+
+        # Only the first row of the same equipment counts
+        if key in self.imported_keys:
+            return True
+        self.imported_keys.add(key)
 
+        return self.original_hashes.get(key) == self.get_content_hash(instance)
 
-class ClaimExportResource(resources.ModelResource):
+
+class ClaimExportResource(StreamingExportMixin, resources.ModelResource):
     amount = fields.Field(attribute="amount", widget=IntegerWidget())
     type = fields.Field(attribute="offered_item__type__name")
     brand = fields.Field(attribute="offered_item__brand")
     model = fields.Field(attribute="offered_item__model")
 
-    shipment = fields.Field(attribute="shipment")
+    shipment = fields.Field(attribute="shipment__name")
 
     donor_first_name = fields.Field(attribute="offered_item__offer__contact__first_name")
     donor_last_name = fields.Field(attribute="offered_item__offer__contact__last_name")
@@ -46,3 +127,61 @@ class ClaimExportResource(resources.ModelResource):
             "requester_email",
             "requester_organisation",
         )
+
+
+class ChoicesWidget(Widget):
+    """
+    Accepts the value or the label of a choice, ignoring case.
+    """
+
+    def __init__(self, choices):
+        self.choices = choices
+        self.lookup = {str(label).lower(): value for value, label in choices.choices}
+        self.lookup.update({str(value): value for value in choices.values})
+
+    def clean(self, value, row=None, *args, **kwargs):
+        try:
+            return self.lookup[str(value).strip().lower()]
+        except KeyError:
+            raise ValueError(f"Unknown value {value!r}, choose from: {', '.join(self.choices.labels)}")
+
+    def render(self, value, obj=None):
+        return self.choices(value).label if value is not None else ""
+
+
+class ShipmentEventResource(resources.ModelResource):
+    shipment = fields.Field(
+        column_name="shipment",
+        attribute="shipment",
+        widget=CachedForeignKeyWidget(Shipment, "name"),
+    )
+    type = fields.Field(column_name="type", attribute="type", widget=ChoicesWidget(ShipmentEventType))
+    location = fields.Field(
+        column_name="location",
+        attribute="location",
+        widget=CachedForeignKeyWidget(Location, "name"),
+    )
+
+    class Meta:
+        model = ShipmentEvent
+        fields = ("shipment", "when", "type", "location", "source", "notes")
+        # Events are only ever added
+        force_init_instance = True
+        use_bulk = True
+        batch_size = 1000
+        skip_diff = True
+
+    def __init__(self):
+        super().__init__()
+        self.shipment_ids = set()
+
+    def before_import(self, dataset, using_transactions, dry_run, **kwargs):
+        self.shipment_ids = set()
+
+    def before_save_instance(self, instance, using_transactions, dry_run):
+        self.shipment_ids.add(instance.shipment_id)
+
+    def after_import(self, dataset, result, using_transactions, dry_run, **kwargs):
+        if not dry_run and not result.has_errors() and not result.has_validation_errors():
+            Shipment.objects.filter(pk__in=self.shipment_ids).refresh_from_events()
+            bump_versions(ShipmentEvent)
@@ -0,0 +1,75 @@
+from typing import List
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Min, OuterRef, Subquery
+
+from aid_coordinator.caching import cached
+from aid_coordinator.replica import read_from_replica
+from logistics.models import Location, ShipmentEvent, ShipmentEventType
+
+TRANSIT_TIMES_CACHE_TIMEOUT = 60 * 60
+
+
+def get_trips():
+    """
+    Every departure, with the time and place of the next arrival or delivery of the same shipment.
+    """
+    next_arrival = ShipmentEvent.objects.filter(
+        shipment=OuterRef("shipment"),
+        when__gt=OuterRef("when"),
+        type__in=(ShipmentEventType.ARRIVED, ShipmentEventType.DELIVERED),
+    ).order_by("when", "pk")
+
+    return (
+        ShipmentEvent.objects.filter(type=ShipmentEventType.DEPARTED, location__isnull=False)
+        .annotate(
+            arrival_when=Subquery(next_arrival.values("when")[:1]),
+            arrival_location_id=Subquery(next_arrival.values("location_id")[:1]),
+        )
+        .filter(arrival_when__isnull=False, arrival_location_id__isnull=False)
+        .annotate(duration=ExpressionWrapper(F("arrival_when") - F("when"), output_field=DurationField()))
+    )
+
+
+def get_transit_times() -> List[dict]:
+    """
+    The number of trips and the average, shortest and longest transit time of each route between two locations.
+    Calculated by the database and cached until new events come in.
+    """
+    return cached("transit-times", "all", calculate_transit_times, [ShipmentEvent], TRANSIT_TIMES_CACHE_TIMEOUT)
+
+
+def calculate_transit_times() -> List[dict]:
+    rows = (
+        get_trips()
+        .order_by()
+        .values("location_id", "arrival_location_id")
+        .annotate(
+            trips=Count("pk"),
+            average=Avg("duration", output_field=DurationField()),
+            shortest=Min("duration"),
+            longest=Max("duration"),
+        )
+    )
+    # Cached until new events come in, so this must not come from a replica that doesn't have them yet
+    with read_from_replica(False):
+        rows = list(rows)
+
+    names = dict(
+        Location.objects.filter(
+            pk__in={row["location_id"] for row in rows} | {row["arrival_location_id"] for row in rows}
+        ).values_list("pk", "name")
+    )
+
+    routes = [
+        {
+            "from": names.get(row["location_id"]),
+            "to": names.get(row["arrival_location_id"]),
+            "trips": row["trips"],
+            "average": row["average"],
+            "shortest": row["shortest"],
+            "longest": row["longest"],
+        }
+        for row in rows
+    ]
+    routes.sort(key=lambda route: (route["from"] or "", route["to"] or ""))
+    return routes
@@ -1,13 +1,16 @@
 from django import forms
 from django.contrib import messages
+from django.core.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from aid_coordinator.views import AdminFormView
+from aid_coordinator.views import AdminFormView, AdminTemplateView
 from logistics.forms import RequestForm
-from logistics.models import Claim
+from logistics.manifest import attach_manifest_totals, get_manifest_lines
+from logistics.models import Claim, Shipment
+from logistics.packing import get_packing_profiles, plan_shipment
 from supply_demand.models import OfferItem, Request, RequestItem
 
 
@@ -70,3 +73,29 @@ class RequestView(AdminFormView):
 
     def get_success_url(self):
         return reverse("admin:supply_demand_offeritem_changelist")
+
+
+class ShipmentManifestView(AdminTemplateView):
+    template_name = "admin/manifest.html"
+    admin_model = Shipment
+    model_admin = None
+
+    def get(self, request, *args, **kwargs):
+        if not self.model_admin.has_view_permission(request):
+            raise PermissionDenied
+
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        shipment = get_object_or_404(Shipment.objects.select_related("current_location"), pk=kwargs["shipment_id"])
+        attach_manifest_totals([shipment])
+
+        data = super().get_context_data(**kwargs)
+        data["shipment"] = shipment
+        data["lines"] = get_manifest_lines(shipment)
+
+        profiles = get_packing_profiles()
+        profile = profiles.get(self.request.GET.get("profile")) or next(iter(profiles.values()))
+        data["profiles"] = profiles.values()
+        data["plan"] = plan_shipment(shipment, profile)
+        return data
@@ -1,19 +1,31 @@
-from typing import Iterable
+import os
+from typing import Dict, Iterable, List
 
 from admin_wizard.admin import UpdateAction
 from django.contrib import admin, messages
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.db.models import Exists, OuterRef, Sum
 from django.forms import forms
 from django.http import HttpRequest
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.utils.html import format_html, format_html_join
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import require_POST
 from import_export.admin import ExportActionModelAdmin, ImportExportActionModelAdmin
 
+from aid_coordinator.export import StreamingExportAdminMixin
+from aid_coordinator.filters import (
+    CachedAllValuesFieldListFilter,
+    CachedRelatedFieldListFilter,
+    CachedRelatedOnlyFieldListFilter,
+)
 from aid_coordinator.widgets import ClaimAutocompleteSelect
-from logistics.models import Claim
+from logistics.models import Claim, StockMovement
 from supply_demand.admin.base import CompactInline, ContactOnlyAdmin, ReadOnlyMixin
 from supply_demand.admin.filters import LocationFilter, OverclaimedListFilter
 from supply_demand.admin.forms import MoveToOfferForm, MoveToRequestForm, change_type_form_factory
@@ -56,6 +68,9 @@ class RequestItemInline(CompactInline):
     )
     readonly_fields = ("assigned",)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("claim_set__offered_item")
+
     @admin.display(description=_("assigned"))
     def assigned(self, item: RequestItem):
         if not item.pk:
@@ -87,7 +102,7 @@ class RequestItemInline(CompactInline):
 @admin.register(Request)
 class RequestAdmin(ContactOnlyAdmin):
     list_display = ("contact", "goal", "admin_items")
-    list_filter = ("contact__organisation",)
+    list_filter = (("contact__organisation", CachedRelatedFieldListFilter),)
     autocomplete_fields = ("contact",)
     inlines = (RequestItemInline,)
     search_fields = (
@@ -114,21 +129,32 @@ class RequestAdmin(ContactOnlyAdmin):
             else:
                 return ""
 
+        # Alternatives are items of the same request, so look them up in the prefetched items instead of following
+        # item.alternatives, which only has the claims prefetched for the first level
+        all_items = request.items.all()
+        alternatives: Dict[int, List[RequestItem]] = {}
+        for item in all_items:
+            if item.alternative_for_id:
+                alternatives.setdefault(item.alternative_for_id, []).append(item)
+
         def alts(alt_items: Iterable[RequestItem]) -> str:
             alt_out = " or ".join(
-                [prefix(alt_item) + alt_item.counted_name + alts(alt_item.alternatives.all()) for alt_item in alt_items]
+                [
+                    prefix(alt_item) + alt_item.counted_name + alts(alternatives.get(alt_item.pk, []))
+                    for alt_item in alt_items
+                ]
             )
             if not alt_out:
                 return ""
             return " or " + alt_out
 
         items = []
-        for item in request.items.all():
+        for item in all_items:
             # Don't filter the query, it will ruin the prefetch_related we already did, this is much faster
             if item.alternative_for_id:
                 continue
 
-            out = prefix(item) + item.counted_name + alts(item.alternatives.all())
+            out = prefix(item) + item.counted_name + alts(alternatives.get(item.pk, []))
             items.append((out,))
 
         return format_html_join(mark_safe("<br>"), "{}", items)
@@ -206,7 +232,7 @@ class ClaimInlineAdmin(CompactInline):
 
 
 @admin.register(RequestItem)
-class RequestItemAdmin(ExportActionModelAdmin):
+class RequestItemAdmin(StreamingExportAdminMixin, ExportActionModelAdmin):
     list_display = (
         "type",
         "brand",
@@ -218,7 +244,11 @@ class RequestItemAdmin(ExportActionModelAdmin):
         "created_at",
         "item_of",
     )
-    list_filter = ("type", "brand", "request__contact__organisation")
+    list_filter = (
+        ("type", CachedRelatedFieldListFilter),
+        ("brand", CachedAllValuesFieldListFilter),
+        ("request__contact__organisation", CachedRelatedFieldListFilter),
+    )
     autocomplete_fields = ("request",)
     ordering = ("brand", "model")
     resource_class = RequestItemResource
@@ -422,7 +452,7 @@ class OfferItemInline(CompactInline):
 @admin.register(Offer)
 class OfferAdmin(ContactOnlyAdmin):
     list_display = ("description", "admin_organisation", "admin_contact", "admin_items")
-    list_filter = (LocationFilter, "contact__organisation")
+    list_filter = (LocationFilter, ("contact__organisation", CachedRelatedFieldListFilter))
     autocomplete_fields = ("contact",)
     inlines = (OfferItemInline,)
     search_fields = (
@@ -539,7 +569,7 @@ class OfferAdmin(ContactOnlyAdmin):
 
 
 @admin.register(OfferItem)
-class OfferItemAdmin(ImportExportActionModelAdmin):
+class OfferItemAdmin(StreamingExportAdminMixin, ImportExportActionModelAdmin):
     list_display = (
         "type",
         "brand",
@@ -553,13 +583,13 @@ class OfferItemAdmin(ImportExportActionModelAdmin):
         "item_of",
     )
     list_filter = (
-        "type",
+        ("type", CachedRelatedFieldListFilter),
         "rejected",
         "received",
         OverclaimedListFilter,
-        "brand",
-        ("offer__contact__organisation", admin.RelatedOnlyFieldListFilter),
-        "offer",
+        ("brand", CachedAllValuesFieldListFilter),
+        ("offer__contact__organisation", CachedRelatedOnlyFieldListFilter),
+        ("offer", CachedRelatedFieldListFilter),
     )
     autocomplete_fields = ("offer",)
     ordering = ("brand", "model")
@@ -584,6 +614,7 @@ class OfferItemAdmin(ImportExportActionModelAdmin):
         "new_type_admin_action",
     )
     inlines = (ClaimInlineAdmin,)
+    import_template_name = "admin/supply_demand/offeritem/import.html"
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -609,7 +640,10 @@ class OfferItemAdmin(ImportExportActionModelAdmin):
             return
 
         new_type = ItemType.objects.get(pk=new_type_id)
-        count = queryset.update(type=new_type)
+        with transaction.atomic():
+            claim_ids = list(Claim.objects.filter(offered_item__in=queryset).values_list("pk", flat=True))
+            count = queryset.update(type=new_type)
+            StockMovement.objects.sync_claims(claim_ids)
         messages.info(request, f"{count} item(s) updated")
 
     def get_queryset(self, request):
@@ -626,12 +660,18 @@ class OfferItemAdmin(ImportExportActionModelAdmin):
         queryset.update(rejected=False)
 
     @admin.action(description=_("Set to received"))
-    def set_received(self, _request: HttpRequest, queryset: RequestItem.objects):
-        queryset.update(received=True)
+    def set_received(self, _request: HttpRequest, queryset: OfferItem.objects):
+        with transaction.atomic():
+            claim_ids = list(Claim.objects.filter(offered_item__in=queryset).values_list("pk", flat=True))
+            queryset.update(received=True)
+            StockMovement.objects.sync_claims(claim_ids)
 
     @admin.action(description=_("Set to NOT received"))
-    def set_not_received(self, _request: HttpRequest, queryset: RequestItem.objects):
-        queryset.update(received=False)
+    def set_not_received(self, _request: HttpRequest, queryset: OfferItem.objects):
+        with transaction.atomic():
+            claim_ids = list(Claim.objects.filter(offered_item__in=queryset).values_list("pk", flat=True))
+            queryset.update(received=False)
+            StockMovement.objects.sync_claims(claim_ids)
 
     def get_import_resource_class(self):
         """
@@ -668,6 +708,47 @@ class OfferItemAdmin(ImportExportActionModelAdmin):
         """
         return kwargs
 
+    # noinspection PyMethodMayBeStatic
+    def get_import_cache_key(self, request: HttpRequest, import_file_name: str, offer: Offer):
+        # The confirm form only keeps the base name of the temporary file
+        return f"offeritem-import:{request.user.pk}:{os.path.basename(import_file_name)}:{offer.pk}"
+
+    def import_action(self, request, *args, **kwargs):
+        response = super().import_action(request, *args, **kwargs)
+
+        # Remember the validated rows of a successful dry run, so confirming doesn't have to do it all again
+        context = getattr(response, "context_data", None) or {}
+        if "confirm_form" in context and context["result"].validated_rows:
+            initial = context["confirm_form"].initial
+            offer = Offer.objects.get(pk=initial["offer"])
+            key = self.get_import_cache_key(request, initial["import_file_name"], offer)
+            cache.set(key, context["result"].validated_rows, timeout=3600)
+
+        return response
+
+    @method_decorator(require_POST)
+    def process_import(self, request, *args, **kwargs):
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+
+        confirm_form = self.get_confirm_import_form()(request.POST)
+        if confirm_form.is_valid():
+            import_file_name = confirm_form.cleaned_data["import_file_name"]
+            offer = confirm_form.cleaned_data["offer"]
+            key = self.get_import_cache_key(request, import_file_name, offer)
+            rows = cache.get(key)
+            if rows is not None:
+                cache.delete(key)
+
+                resource = self.get_import_resource_class()(**self.get_import_resource_kwargs(request))
+                result = resource.import_validated_rows(rows, offer)
+
+                self.get_tmp_storage_class()(name=import_file_name).remove()
+                return self.process_result(result, request)
+
+        # Not in the cache (anymore), so do a normal import
+        return super().process_import(request, *args, **kwargs)
+
     def has_add_permission(self, request):
         return request.user.is_superuser
 
@@ -768,7 +849,7 @@ class OfferItemAdmin(ImportExportActionModelAdmin):
 
     def get_list_filter(self, request):
         if not request.user.is_superuser:
-            return ["type", "brand"]
+            return [("type", CachedRelatedFieldListFilter), ("brand", CachedAllValuesFieldListFilter)]
 
         return super().get_list_filter(request)
 
@@ -816,7 +897,7 @@ class ChangeAdmin(ReadOnlyMixin, admin.ModelAdmin):
     list_filter = (
         "action",
         "type",
-        ("who", admin.RelatedOnlyFieldListFilter),
+        ("who", CachedRelatedOnlyFieldListFilter),
     )
     date_hierarchy = "when"
     ordering = ("-when", "who")
@@ -1,27 +1,32 @@
 from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 
-from supply_demand.models import ItemType, Offer, OfferItem, RequestItem
+from supply_demand.models import ItemType, OfferItem, RequestItem
 
 
 class MoveToOfferForm(forms.ModelForm):
-    offer = forms.ModelChoiceField(
-        queryset=Offer.objects.order_by(
-            "contact__organisation",
-            "contact__last_name",
-            "contact__first_name",
-            "description",
-        )
-    )
-
     class Meta:
         model = OfferItem
         fields = ("offer",)
+        widgets = {
+            # Only render the selected offer, the rest is fetched page by page
+            "offer": AutocompleteSelect(OfferItem._meta.get_field("offer"), admin.site),
+        }
 
 
 class MoveToRequestForm(forms.ModelForm):
     class Meta:
         model = RequestItem
         fields = ("request",)
+        widgets = {
+            # Only render the selected request, the rest is fetched page by page
+            "request": AutocompleteSelect(RequestItem._meta.get_field("request"), admin.site),
+        }
+
+
+def get_item_type_choices():
+    return [("", "---------")] + [(item_type.pk, item_type.name) for item_type in ItemType.objects.get_cached()]
 
 
 def change_type_form_factory(old_class):
@@ -31,9 +36,9 @@ def change_type_form_factory(old_class):
     """
     class _NewTypeActionForm(old_class):
         """
-        Action form with new type ChoiceField.
+        Action form with new type ChoiceField, with the cached item types.
         """
-        new_type = forms.ModelChoiceField(ItemType.objects.all(), required=False)
+        new_type = forms.TypedChoiceField(choices=get_item_type_choices, coerce=int, required=False)
     _NewTypeActionForm.__name__ = str('NewTypeActionForm')
 
     return _NewTypeActionForm
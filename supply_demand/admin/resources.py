@@ -1,11 +1,19 @@
 import sys
 
 from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.http import HttpRequest
 from import_export import fields, resources
 from import_export.forms import ConfirmImportForm, ImportForm
-from import_export.widgets import ForeignKeyWidget
-from supply_demand.models import ItemType, Offer, OfferItem, RequestItem
+from import_export.results import Result, RowResult
+
+from aid_coordinator.caching import bump_versions
+from aid_coordinator.export import StreamingExportMixin
+from aid_coordinator.widgets import CachedForeignKeyWidget
+from supply_demand.models import ItemType, Offer, OfferItem, RequestItem, link_equipment
 
 
 class MyModelResource(resources.ModelResource):
@@ -14,7 +22,7 @@ class MyModelResource(resources.ModelResource):
         self.request = request
 
 
-class RequestItemResource(MyModelResource):
+class RequestItemResource(StreamingExportMixin, MyModelResource):
     class Meta:
         model = RequestItem
         fields = [
@@ -41,33 +49,126 @@ class RequestItemResource(MyModelResource):
 
 class CustomImportForm(ImportForm):
     offer = forms.ModelChoiceField(
-        queryset=Offer.objects.order_by("contact__organisation__name", "contact__last_name", "description"),
+        queryset=Offer.objects.select_related("contact__organisation"),
+        widget=AutocompleteSelect(OfferItem._meta.get_field("offer"), admin.site),
         required=True,
     )
 
+    @property
+    def media(self):
+        # ImportForm only provides its own scripts, so add the ones for the autocomplete widget
+        return super().media + self.fields["offer"].widget.media
+
+
+class ItemTypeWidget(CachedForeignKeyWidget):
+    def get_queryset(self, value, row, *args, **kwargs):
+        return ItemType.objects.get_cached()
+
 
 class CustomConfirmImportForm(ConfirmImportForm):
+    # The offer has already been chosen in the import form, so just pass it along
     offer = forms.ModelChoiceField(
-        queryset=Offer.objects.order_by("contact__organisation__name", "contact__last_name", "description"),
+        queryset=Offer.objects.select_related("contact__organisation"),
+        widget=forms.HiddenInput,
         required=True,
     )
 
 
+class OfferItemImportResult(Result):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # The field values of all rows that passed a dry run, so they can be saved without importing again
+        self.validated_rows = []
+
+
 class OfferItemImportResource(MyModelResource):
-    type = fields.Field(column_name="type", attribute="type", widget=ForeignKeyWidget(ItemType, "name"))
+    type = fields.Field(column_name="type", attribute="type", widget=ItemTypeWidget(ItemType, "name"))
     notes = fields.Field(column_name="notes", attribute="notes", saves_null_values=False)
 
     class Meta:
         model = OfferItem
         fields = ("brand", "model", "amount", "notes", "type")
         force_init_instance = True
+        use_bulk = True
+        batch_size = 1000
+
+    def __init__(self, request: HttpRequest = None):
+        super().__init__(request)
+        self.validated_rows = []
+
+    @classmethod
+    def get_result_class(cls):
+        return OfferItemImportResult
+
+    def get_validated_row_fields(self):
+        opts = self._meta.model._meta
+        return ["offer_id"] + [opts.get_field(field.attribute).attname for field in self.get_import_fields()]
+
+    def before_import(self, dataset, using_transactions, dry_run, **kwargs):
+        self.validated_rows = []
 
     def after_import_instance(self, instance, new, row_number=None, **kwargs):
         if "form" in kwargs and "offer" in kwargs["form"].cleaned_data:
             instance.offer_id = kwargs["form"].cleaned_data["offer"].id
 
+    def validate_instance(self, instance, import_validation_errors=None, validate_unique=True):
+        errors = dict(import_validation_errors or {})
+
+        # Check lengths, choices etc. without a query per row for the foreign keys, the offer comes from
+        # the form and the types have already been looked up in bulk
+        try:
+            instance.clean_fields(exclude=list(errors) + ["offer", "type"])
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+
+        # The widget returns None for an empty type, which clean_fields() would have rejected
+        if "type" not in errors and instance.type_id is None:
+            errors["type"] = ValidationError(instance._meta.get_field("type").error_messages["null"], code="null")
+
+        if errors:
+            raise ValidationError(errors)
+
+    def save_instance(self, instance, using_transactions=True, dry_run=False):
+        # Bulk creates skip OfferItem.save()
+        instance.update_normalized_key()
+        super().save_instance(instance, using_transactions, dry_run)
+
+        if dry_run:
+            self.validated_rows.append({field: getattr(instance, field) for field in self.get_validated_row_fields()})
+
+    def after_import(self, dataset, result, using_transactions, dry_run, **kwargs):
+        if dry_run and not result.has_errors() and not result.has_validation_errors():
+            result.validated_rows = self.validated_rows
+
+        if not dry_run and "form" in kwargs and "offer" in kwargs["form"].cleaned_data:
+            link_equipment(OfferItem.objects.filter(offer=kwargs["form"].cleaned_data["offer"]))
+
+        if not dry_run:
+            # Bulk creates don't send the signals that expire cached data
+            bump_versions(OfferItem)
+
+    def import_validated_rows(self, rows, offer: Offer) -> Result:
+        """
+        Save the rows of an earlier dry run, skipping parsing and validation.
+        """
+        result = self.get_result_class()()
+        result.total_rows = len(rows)
+
+        items = [OfferItem(**dict(row, offer_id=offer.id)) for row in rows]
+        for item in items:
+            item.update_normalized_key()
+
+        with transaction.atomic():
+            OfferItem.objects.bulk_create(items, batch_size=self._meta.batch_size)
+            link_equipment(OfferItem.objects.filter(offer=offer))
+        bump_versions(OfferItem)
+
+        result.totals[RowResult.IMPORT_TYPE_NEW] = len(rows)
+        return result
+
 
-class OfferItemExportResource(MyModelResource):
+class OfferItemExportResource(StreamingExportMixin, MyModelResource):
     class Meta:
         model = OfferItem
         fields = [
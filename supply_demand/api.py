@@ -3,11 +3,13 @@ from django.db.models.functions import Coalesce
 from django_filters import CharFilter, NumberFilter
 from django_filters.rest_framework import FilterSet
 from rest_framework.fields import CharField, IntegerField, ReadOnlyField
-from rest_framework.relations import StringRelatedField
 from rest_framework.serializers import HyperlinkedModelSerializer
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
-from supply_demand.models import OfferItem, RequestItem
+from aid_coordinator.caching import AnonymousCacheMixin
+from aid_coordinator.replica import ReplicaReadMixin
+from logistics.models import Claim
+from supply_demand.models import ItemType, OfferItem, RequestItem
 
 
 class OfferItemFilterSet(FilterSet):
@@ -37,9 +39,24 @@ class RequestItemFilterSet(FilterSet):
         }
 
 
+class ItemTypeField(ReadOnlyField):
+    """
+    The name of an item type by its id, from the cached item types instead of a query for each page.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.names = None
+
+    def to_representation(self, value):
+        if self.names is None:
+            self.names = ItemType.objects.get_cached_names()
+        return self.names.get(value)
+
+
 # Serializers define the API representation.
 class OfferItemSerializer(HyperlinkedModelSerializer):
-    type = StringRelatedField()
+    type = ItemTypeField(source="type_id")
     line = CharField(source="counted_name")
 
     class Meta:
@@ -48,7 +65,7 @@ class OfferItemSerializer(HyperlinkedModelSerializer):
 
 
 class RequestItemSerializer(HyperlinkedModelSerializer):
-    type = StringRelatedField()
+    type = ItemTypeField(source="type_id")
     amount = IntegerField(source='max_amount')
 
     class Meta:
@@ -57,19 +74,17 @@ class RequestItemSerializer(HyperlinkedModelSerializer):
 
 
 # ViewSets define the view behavior
-class OfferItemViewSet(ReadOnlyModelViewSet):
-    queryset = OfferItem.objects.filter(claim=None).prefetch_related('type')
+class OfferItemViewSet(AnonymousCacheMixin, ReplicaReadMixin, ReadOnlyModelViewSet):
+    queryset = OfferItem.objects.filter(claim=None)
+    cache_models = (OfferItem, Claim, ItemType)
     serializer_class = OfferItemSerializer
     filterset_class = OfferItemFilterSet
     search_fields = ["brand", "model", "notes"]
 
 
-class RequestItemViewSet(ReadOnlyModelViewSet):
-    queryset = (
-        RequestItem.objects.filter(claim=None)
-        .prefetch_related('type')
-        .annotate(max_amount=Sum(Coalesce("up_to", "amount")))
-    )
+class RequestItemViewSet(AnonymousCacheMixin, ReplicaReadMixin, ReadOnlyModelViewSet):
+    queryset = RequestItem.objects.filter(claim=None).annotate(max_amount=Sum(Coalesce("up_to", "amount")))
+    cache_models = (RequestItem, Claim, ItemType)
     serializer_class = RequestItemSerializer
     filterset_class = RequestItemFilterSet
     search_fields = ["brand", "model"]
@@ -0,0 +1,39 @@
+import re
+from functools import lru_cache
+from typing import Dict
+
+from django.conf import settings
+
+# Everything that isn't a letter or digit, so "ASR-9001", "asr 9001" and "ASR9001" are the same model
+IGNORED_CHARACTERS = re.compile(r"[\W_]+")
+
+
+def normalize(value: str) -> str:
+    return IGNORED_CHARACTERS.sub("", (value or "").casefold())
+
+
+@lru_cache(maxsize=None)
+def get_brand_aliases() -> Dict[str, str]:
+    return {normalize(alias): normalize(brand) for alias, brand in settings.EQUIPMENT_BRAND_ALIASES.items()}
+
+
+def normalize_brand(brand: str) -> str:
+    brand = normalize(brand)
+    return get_brand_aliases().get(brand, brand)
+
+
+def normalize_key(brand: str, model: str) -> str:
+    """
+    The key that items and equipment data are matched on. Empty if there is no model to match.
+    """
+    brand = normalize_brand(brand)
+    model = normalize(model)
+
+    # People often repeat the brand in the model, like "Cisco Catalyst 2960"
+    if brand and model.startswith(brand) and model != brand:
+        model = model[len(brand) :]
+
+    if not model:
+        return ""
+
+    return f"{brand}:{model}"
@@ -1,10 +1,12 @@
 import difflib
-from datetime import timedelta
+from datetime import time, timedelta
 
 from django.core.management import BaseCommand, CommandParser
+from django.utils import timezone
 from django.utils.datetime_safe import date, datetime
 from django.utils.translation import gettext as _
 
+from aid_coordinator.replica import read_from_replica
 from supply_demand.models import Change
 
 
@@ -26,12 +28,17 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        when = options["date"]
+        with read_from_replica():
+            self.show_changes(options["date"])
+
+    def show_changes(self, when: date):
 
         self.stdout.write(f"Donation/request changes of {when}:")
         self.stdout.write("")
 
-        items = Change.objects.filter(when__year=when.year, when__month=when.month, when__day=when.day).order_by("when")
+        # A range instead of when__date, so the index on when can be used
+        start = timezone.make_aware(datetime.combine(when, time.min))
+        items = Change.objects.filter(when__gte=start, when__lt=start + timedelta(days=1)).order_by("when")
         if not items:
             self.stdout.write("- no changes")
             return
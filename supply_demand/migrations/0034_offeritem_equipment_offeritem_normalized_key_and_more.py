@@ -0,0 +1,35 @@
+# Generated by Django 4.0.10 on 2026-10-18 22:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0023_equipmentdata_normalized_key'),
+        ('supply_demand', '0033_alter_itemtype_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offeritem',
+            name='equipment',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='offered_items', to='logistics.equipmentdata', verbose_name='equipment data'),
+        ),
+        migrations.AddField(
+            model_name='offeritem',
+            name='normalized_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=160, verbose_name='normalized brand and model'),
+        ),
+        migrations.AddField(
+            model_name='requestitem',
+            name='equipment',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='requested_items', to='logistics.equipmentdata', verbose_name='equipment data'),
+        ),
+        migrations.AddField(
+            model_name='requestitem',
+            name='normalized_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=160, verbose_name='normalized brand and model'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+import re
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+# A copy of supply_demand.catalogue and EQUIPMENT_BRAND_ALIASES as they were when this migration was written, so
+# later changes don't change what it does. The link_equipment command links the items again with the current rules.
+IGNORED_CHARACTERS = re.compile(r"[\W_]+")
+
+BRAND_ALIASES = {
+    "Cisco Systems": "Cisco",
+    "Juniper Networks": "Juniper",
+    "Arista Networks": "Arista",
+    "Extreme Networks": "Extreme",
+    "Ubiquiti Networks": "Ubiquiti",
+    "UBNT": "Ubiquiti",
+    "Dell EMC": "Dell",
+    "Hewlett Packard Enterprise": "HPE",
+}
+
+
+def normalize(value: str) -> str:
+    return IGNORED_CHARACTERS.sub("", (value or "").casefold())
+
+
+NORMALIZED_BRAND_ALIASES = {normalize(alias): normalize(brand) for alias, brand in BRAND_ALIASES.items()}
+
+
+def normalize_key(brand: str, model: str) -> str:
+    brand = normalize(brand)
+    brand = NORMALIZED_BRAND_ALIASES.get(brand, brand)
+    model = normalize(model)
+
+    if brand and model.startswith(brand) and model != brand:
+        model = model[len(brand) :]
+
+    if not model:
+        return ""
+
+    return f"{brand}:{model}"
+
+
+def link_equipment(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+
+    # noinspection PyPep8Naming
+    EquipmentData = apps.get_model("logistics", "EquipmentData")
+
+    # noinspection PyPep8Naming
+    OfferItem = apps.get_model("supply_demand", "OfferItem")
+    # noinspection PyPep8Naming
+    RequestItem = apps.get_model("supply_demand", "RequestItem")
+
+    for model in (EquipmentData, OfferItem, RequestItem):
+        objects = list(model.objects.using(db_alias).only("pk", "brand", "model"))
+        for obj in objects:
+            obj.normalized_key = normalize_key(obj.brand, obj.model)
+        model.objects.using(db_alias).bulk_update(objects, ["normalized_key"], batch_size=1000)
+
+    canonical = EquipmentData.objects.using(db_alias).filter(normalized_key=OuterRef("normalized_key")).order_by("pk")
+    for model in (OfferItem, RequestItem):
+        model.objects.using(db_alias).update(equipment=Subquery(canonical.values("pk")[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("supply_demand", "0034_offeritem_equipment_offeritem_normalized_key_and_more"),
+        ("logistics", "0023_equipmentdata_normalized_key"),
+    ]
+
+    operations = [
+        migrations.RunPython(link_equipment, migrations.RunPython.noop),
+    ]
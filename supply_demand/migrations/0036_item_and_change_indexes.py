@@ -0,0 +1,33 @@
+# Generated by Django 4.0.10 on 2026-10-18 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supply_demand', '0035_link_equipment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['when', 'who'], name='supply_dema_when_fe407b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offeritem',
+            index=models.Index(fields=['type', 'brand', 'model'], name='supply_dema_type_id_028932_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offeritem',
+            index=models.Index(fields=['brand', 'model'], name='supply_dema_brand_d391b4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestitem',
+            index=models.Index(fields=['type', 'brand', 'model'], name='supply_dema_type_id_50577d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestitem',
+            index=models.Index(fields=['brand', 'model'], name='supply_dema_brand_f0ac65_idx'),
+        ),
+    ]
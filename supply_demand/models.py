@@ -1,9 +1,13 @@
+from typing import Dict, List
+
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import Sum
+from django.db.models import OuterRef, QuerySet, Subquery, Sum
 from django.utils.translation import gettext_lazy as _
 
+from aid_coordinator.caching import cached, track_models
 from contacts.models import Contact, Organisation
+from supply_demand.catalogue import normalize_key
 
 
 class DeliveryMethod(models.IntegerChoices):
@@ -32,10 +36,51 @@ class ChangeType(models.IntegerChoices):
     REQUEST = 2, _("Request")
 
 
+def link_equipment(queryset: QuerySet) -> int:
+    """
+    Point the items at the equipment data with the same normalized key, with a single UPDATE.
+    """
+    equipment_data = queryset.model._meta.get_field("equipment").related_model
+    canonical = equipment_data.objects.filter(normalized_key=OuterRef("normalized_key")).order_by("pk")
+    return queryset.update(equipment=Subquery(canonical.values("pk")[:1]))
+
+
+class EquipmentItemMixin:
+    """
+    Keeps the normalized key and the link to the equipment data of an item in sync with its brand and model.
+    """
+
+    def update_normalized_key(self) -> bool:
+        key = normalize_key(self.brand, self.model)
+        changed = key != self.normalized_key
+        self.normalized_key = key
+        return changed
+
+    def save(self, *args, **kwargs):
+        if self.update_normalized_key() or self._state.adding:
+            equipment_data = self._meta.get_field("equipment").related_model
+            self.equipment = equipment_data.objects.filter(normalized_key=self.normalized_key).order_by("pk").first()
+
+        super().save(*args, **kwargs)
+
+
+class ItemTypeManager(models.Manager):
+    def get_cached(self) -> List["ItemType"]:
+        """
+        All item types, from the cache until one of them changes. Used for choices and for showing the names.
+        """
+        return cached("item-types", "all", lambda: list(self.order_by("order", "name")), [ItemType])
+
+    def get_cached_names(self) -> Dict[int, str]:
+        return {item_type.pk: item_type.name for item_type in self.get_cached()}
+
+
 class ItemType(models.Model):
     name = models.CharField(verbose_name=_('name'), max_length=50, unique=True)
     order = models.PositiveIntegerField(verbose_name=_('order'), default=50)
 
+    objects = ItemTypeManager()
+
     class Meta:
         verbose_name = _('item type')
         verbose_name_plural = _('item types')
@@ -122,7 +167,7 @@ class RequestItemManager(models.Manager):
         return super().get_queryset().prefetch_related("request__contact__organisation")
 
 
-class RequestItem(models.Model):
+class RequestItem(EquipmentItemMixin, models.Model):
     request = models.ForeignKey(
         verbose_name=_("request"),
         to=Request,
@@ -170,6 +215,23 @@ class RequestItem(models.Model):
         help_text=_("In case there are multiple options to solve your problem"),
     )
 
+    equipment = models.ForeignKey(
+        verbose_name=_("equipment data"),
+        to="logistics.EquipmentData",
+        related_name="requested_items",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    normalized_key = models.CharField(
+        verbose_name=_("normalized brand and model"),
+        max_length=160,
+        blank=True,
+        db_index=True,
+        editable=False,
+    )
+
     created_at = models.DateTimeField(verbose_name=_("created at"), auto_now_add=True)
     updated_at = models.DateTimeField(verbose_name=_("updated at"), auto_now=True)
 
@@ -181,6 +243,11 @@ class RequestItem(models.Model):
         ordering = ("type", "brand", "model")
         verbose_name = _("requested item")
         verbose_name_plural = _("requested items")
+        indexes = [
+            # The default ordering and the one in the admin
+            models.Index(fields=["type", "brand", "model"]),
+            models.Index(fields=["brand", "model"]),
+        ]
 
     def __str__(self):
         return f"{self.brand} {self.model}".strip()
@@ -313,7 +380,7 @@ class OfferItemManager(models.Manager):
         return super().get_queryset().prefetch_related("offer__contact__organisation")
 
 
-class OfferItem(models.Model):
+class OfferItem(EquipmentItemMixin, models.Model):
     offer = models.ForeignKey(
         verbose_name=_("offer"),
         to=Offer,
@@ -334,6 +401,23 @@ class OfferItem(models.Model):
     rejected = models.BooleanField(verbose_name=_("rejected"), default=False)
     received = models.BooleanField(verbose_name=_("received"), default=False)
 
+    equipment = models.ForeignKey(
+        verbose_name=_("equipment data"),
+        to="logistics.EquipmentData",
+        related_name="offered_items",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    normalized_key = models.CharField(
+        verbose_name=_("normalized brand and model"),
+        max_length=160,
+        blank=True,
+        db_index=True,
+        editable=False,
+    )
+
     created_at = models.DateTimeField(verbose_name=_("created at"), auto_now_add=True)
     updated_at = models.DateTimeField(verbose_name=_("updated at"), auto_now=True)
 
@@ -341,14 +425,43 @@ class OfferItem(models.Model):
 
     _claimed = None
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.original_stock_fields = self.get_stock_fields()
+        self.original_equipment_id = self.__dict__.get("equipment_id")
+
     class Meta:
         ordering = ("type", "brand", "model")
         verbose_name = _("offered item")
         verbose_name_plural = _("offered items")
+        indexes = [
+            # The default ordering and the one in the admin
+            models.Index(fields=["type", "brand", "model"]),
+            models.Index(fields=["brand", "model"]),
+        ]
 
     def __str__(self):
         return f"{self.brand} {self.model}".strip()
 
+    def get_stock_fields(self):
+        return tuple(self.__dict__.get(field) for field in ("type_id", "brand", "model", "received"))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        # Imported here because logistics depends on this module
+        from logistics.models import Shipment, StockMovement
+
+        stock_fields = self.get_stock_fields()
+        if stock_fields != self.original_stock_fields:
+            StockMovement.objects.sync_claims(self.claim_set.values_list("pk", flat=True))
+            self.original_stock_fields = stock_fields
+
+        # A new brand or model can link the item to other equipment data, with another weight and size
+        if self.equipment_id != self.original_equipment_id:
+            Shipment.invalidate_manifests(self.claim_set.values_list("shipment_id", flat=True).distinct())
+            self.original_equipment_id = self.equipment_id
+
     @property
     def counted_name(self):
         if self.amount:
@@ -400,6 +513,7 @@ class Change(models.Model):
         ordering = ("when", "who")
         verbose_name = _("change")
         verbose_name_plural = _("changes")
+        indexes = [models.Index(fields=["when", "who"])]
 
     def __str__(self):
         if self.action == ChangeAction.ADD:
@@ -412,3 +526,7 @@ class Change(models.Model):
             action = _("did something to")
 
         return f"{self.who.display_name()} {action} {self.get_type_display().lower()} {_('of')} {self.what}"
+
+
+# The cached item types and API responses depend on these
+track_models(ItemType, OfferItem, RequestItem)
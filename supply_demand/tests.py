@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import tablib
+from django.test import TestCase
+
+from contacts.models import Contact
+from supply_demand.admin.resources import OfferItemImportResource
+from supply_demand.models import ItemType, Offer, OfferItem
+
+
+class OfferItemImportTests(TestCase):
+    def setUp(self):
+        self.user = Contact.objects.create_superuser(username="importer", email="", password=None)
+        self.offer = Offer.objects.create(contact=self.user)
+        ItemType.objects.create(name="Switch")
+
+    def import_rows(self, *rows):
+        dataset = tablib.Dataset(*rows, headers=["type", "brand", "model", "amount", "notes"])
+        form = SimpleNamespace(cleaned_data={"offer": self.offer})
+        return OfferItemImportResource().import_data(dataset, dry_run=True, form=form)
+
+    def test_valid_rows_are_validated(self):
+        result = self.import_rows(["Switch", "Cisco", "C9300", 2, ""])
+
+        self.assertFalse(result.has_errors())
+        self.assertFalse(result.has_validation_errors())
+        self.assertEqual(len(result.validated_rows), 1)
+
+    def test_empty_type_is_a_validation_error(self):
+        result = self.import_rows(["Switch", "Cisco", "C9300", 2, ""], ["", "Cisco", "C9200", 1, ""])
+
+        self.assertFalse(result.has_errors())
+        self.assertTrue(result.has_validation_errors())
+        self.assertEqual([row.number for row in result.invalid_rows], [2])
+        self.assertIn("type", result.invalid_rows[0].field_specific_errors)
+        self.assertFalse(OfferItem.objects.exists())